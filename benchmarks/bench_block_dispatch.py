@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for md_to_pdf's block dispatch (parse_md_blocks).
+
+Compares the leading-character rule table against the original chain of
+startswith checks on the repo's documents and a synthetic corpus, checks
+that both produce identical block events, and prints the speedup.  The
+table is then timed again with three extra block types registered
+(ordered lists, images, admonitions) to show that types which do not
+match a line's first character cost nothing on the common path.
+
+Usage:
+    python benchmarks/bench_block_dispatch.py [--repeat N] [--scale N]
+"""
+
+import argparse
+import os
+import re
+import sys
+import timeit
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import md_to_pdf  # noqa: E402
+from bench_md_to_pdf import REPO_DOCUMENTS, corpus_text  # noqa: E402
+
+
+def legacy_parse_md_blocks(lines):
+    """The original if-chain parser, kept here as the reference."""
+    first_line = True
+    in_section = False
+    await_title = False
+    in_code = False
+    code_lang = ""
+    code_lines = []
+    table_rows = None
+
+    for line in lines:
+        if line.startswith("## ") and not first_line:
+            if await_title:
+                yield ("section", "")
+            if table_rows:
+                yield ("table", table_rows)
+            in_section = False
+            in_code = False
+            code_lines = []
+            table_rows = None
+            line = line[3:]
+            await_title = True
+        first_line = False
+
+        stripped = line.strip()
+
+        if await_title:
+            if not stripped:
+                continue
+            await_title = False
+            title = stripped.lstrip("#").strip()
+            in_section = not title.lower().startswith("table of contents")
+            if in_section:
+                yield ("section", title)
+            continue
+
+        if not in_section:
+            continue
+
+        if in_code:
+            if stripped.startswith("```"):
+                yield ("code", (code_lang, code_lines))
+                code_lines = []
+                in_code = False
+            else:
+                code_lines.append(line.rstrip())
+            continue
+
+        if table_rows is not None:
+            if stripped.startswith("|"):
+                if stripped.startswith("|---") or (
+                    stripped.replace("|", "").replace("-", "").replace(" ", "")
+                    == ""
+                ):
+                    continue
+                table_rows.append(
+                    [c.strip() for c in stripped.split("|") if c.strip()]
+                )
+                continue
+            yield ("table", table_rows)
+            table_rows = None
+        elif stripped.startswith("|") and not stripped.startswith("|---"):
+            table_rows = [[c.strip() for c in stripped.split("|") if c.strip()]]
+            continue
+
+        if not stripped:
+            continue
+        if stripped.startswith("```"):
+            in_code = True
+            info = stripped[3:].split()
+            code_lang = info[0].lower() if info else ""
+            continue
+        if stripped.startswith("|---") or stripped == "---":
+            continue
+        if stripped.startswith("### "):
+            yield ("subsection", stripped[4:].strip())
+            continue
+        if stripped.startswith("**") and stripped.endswith("**"):
+            yield ("bold", stripped.strip("*").strip())
+            continue
+        if stripped.startswith("- "):
+            yield ("bullet", stripped[2:])
+            continue
+        if stripped.startswith("> "):
+            yield ("quote", stripped[2:].strip())
+            continue
+        if not stripped.startswith("#"):
+            yield ("paragraph", stripped)
+
+    if await_title:
+        yield ("section", "")
+    if table_rows:
+        yield ("table", table_rows)
+
+
+_ORDERED_RE = re.compile(r"\d+[.)] ")
+_IMAGE_RE = re.compile(r"!\[([^\]]*)\]\(([^)]+)\)$")
+
+
+def register_extensions():
+    """Register three example block types (their rendering is a no-op)."""
+
+    def skip(_pdf, _data):
+        pass
+
+    md_to_pdf.register_block(
+        "ordered",
+        skip,
+        leads="0123456789",
+        match=lambda s, _line: s if _ORDERED_RE.match(s) else None,
+    )
+    md_to_pdf.register_block(
+        "image",
+        skip,
+        leads="!",
+        match=lambda s, _line: _IMAGE_RE.match(s) and s,
+    )
+    md_to_pdf.register_block(
+        "admonition",
+        skip,
+        leads=">",
+        match=lambda s, _line: s[4:] if s.startswith("> [!") else None,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument(
+        "--scale",
+        type=int,
+        default=100,
+        help="Sections in the synthetic corpus (default: 100).",
+    )
+    args = parser.parse_args()
+
+    corpora = list(REPO_DOCUMENTS) + [f"synthetic-{args.scale}x"]
+    texts = {name: corpus_text(name).split("\n") for name in corpora}
+
+    for name, lines in texts.items():
+        new = list(md_to_pdf.parse_md_blocks(lines))
+        old = list(legacy_parse_md_blocks(lines))
+        if new != old:
+            print(f"MISMATCH on {name}")
+            sys.exit(1)
+
+    def best(parsers, lines):
+        """Best time of each parser, runs interleaved against CPU drift."""
+        times = [float("inf")] * len(parsers)
+        for _ in range(args.repeat):
+            for i, parse in enumerate(parsers):
+                elapsed = timeit.timeit(lambda: list(parse(lines)), number=1)
+                times[i] = min(times[i], elapsed)
+        return times
+
+    parsers = (legacy_parse_md_blocks, md_to_pdf.parse_md_blocks)
+    legacy, table = {}, {}
+    for name, lines in texts.items():
+        legacy[name], table[name] = best(parsers, lines)
+    register_extensions()
+    extended = {
+        name: best((md_to_pdf.parse_md_blocks,), lines)[0]
+        for name, lines in texts.items()
+    }
+
+    print(
+        f"{'corpus':<50} {'lines':>6} {'chain ms':>9} {'table ms':>9} "
+        f"{'speedup':>8} {'+3 types':>9}"
+    )
+    print("-" * 96)
+    for name, lines in texts.items():
+        print(
+            f"{name:<50} {len(lines):>6} {legacy[name] * 1e3:>9.3f} "
+            f"{table[name] * 1e3:>9.3f} {legacy[name] / table[name]:>7.2f}x "
+            f"{extended[name] * 1e3:>9.3f}"
+        )
+    print("\nblock events identical to the if-chain parser on every corpus")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the md_to_pdf converter with regression gating.
+
+Times the hot paths (reading the input with iter_md_lines, sanitize_text,
+_clean_inline_md, parsing, _parse_and_render) and the end-to-end
+convert_md_to_pdf on the repo's own documents plus synthetic corpora scaled
+10x and 100x (tables, code blocks and bullets), and reports the output size
+and serialization time of every --optimize preset.  Each corpus runs in a fresh
+process so its peak RSS is meaningful.  Results are printed and can be
+stored as JSON; when a baseline JSON is given, any timing that regressed by
+more than --threshold, and by more than --min-delta milliseconds, makes the
+run exit with status 1.  Timings are the median of --repeat runs.
+
+Usage:
+    python benchmarks/bench_md_to_pdf.py --output bench.json
+    python benchmarks/bench_md_to_pdf.py --baseline bench.json --threshold 0.15
+    python benchmarks/bench_md_to_pdf.py --corpus DOCUMENTATION --repeat 5
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import md_to_pdf  # noqa: E402
+
+REPO_DOCUMENTS = (
+    "DOCUMENTATION",
+    "Ubuntu_Basic_Commands_Documentation",
+    "Ansible_Architecture_Commands_Python_Comparison",
+)
+SYNTHETIC_SCALES = (10, 100)
+TIMED_PHASES = (
+    "read",
+    "sanitize",
+    "clean_inline",
+    "parse",
+    "render",
+    "end_to_end",
+)
+OUTPUT_PRESETS = ("default",) + tuple(md_to_pdf.OPTIMIZE_PRESETS)
+
+
+# ---------------------------------------------------------------------------
+# Corpora
+# ---------------------------------------------------------------------------
+
+def _synthetic_unit(n):
+    """One synthetic section: a table, a code block, bullets and prose."""
+    lines = [f"## Device group {n}", "", "### Interfaces", ""]
+    lines.append("| Interface | Status | Description |")
+    lines.append("|-----------|--------|-------------|")
+    for i in range(20):
+        lines.append(
+            f"| ge-0/0/{i} | {'up' if i % 3 else 'down'} | "
+            f"Uplink {i} to `core-{n}` — rack {i % 8} |"
+        )
+    lines += ["", "### Configuration", "", "```"]
+    for i in range(30):
+        lines.append(f"set interfaces ge-0/0/{i} unit 0 family ethernet-switching")
+    lines += ["```", "", "### Notes", ""]
+    for i in range(20):
+        lines.append(f"- Check **link {i}** with `show interfaces ge-0/0/{i}`")
+    lines += [
+        "",
+        "> **Note:** generated from the [inventory](https://example.com) export.",
+        "",
+        "Each switch in this group is managed through NETCONF over SSH and "
+        "its configuration is rendered from the shared Jinja2 templates.",
+        "",
+    ]
+    return lines
+
+
+def corpus_text(name):
+    """Return the Markdown text of a repo document or ``synthetic-<N>x``."""
+    if name.startswith("synthetic-"):
+        scale = int(name[len("synthetic-"):].rstrip("x"))
+        lines = ["# Synthetic corpus", ""]
+        for n in range(scale):
+            lines += _synthetic_unit(n)
+        return "\n".join(lines)
+    with open(os.path.join(REPO_ROOT, name + ".md"), "r", encoding="utf-8") as fh:
+        return fh.read()
+
+
+def default_corpora():
+    return list(REPO_DOCUMENTS) + [f"synthetic-{s}x" for s in SYNTHETIC_SCALES]
+
+
+# ---------------------------------------------------------------------------
+# Measurement (runs in a fresh worker process per corpus)
+# ---------------------------------------------------------------------------
+
+def _median_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def _new_pdf(optimize=None):
+    pdf = md_to_pdf.MarkdownPDF(header_title="Benchmark", optimize=optimize)
+    pdf.alias_nb_pages()
+    pdf.set_auto_page_break(auto=True, margin=20)
+    return pdf
+
+
+def run_corpus(name, repeat):
+    """Benchmark one corpus and return its result dict."""
+    md_to_pdf._load_fpdf()  # import time is measured by bench_startup.py
+    text = corpus_text(name)
+    lines = text.split("\n")
+
+    def sanitize():
+        md_to_pdf._sanitize_non_ascii.cache_clear()
+        for line in lines:
+            md_to_pdf.sanitize_text(line)
+
+    def clean_inline():
+        for line in lines:
+            md_to_pdf._clean_inline_md(line)
+
+    def parse():
+        return md_to_pdf.parse_md_document(md_to_pdf.iter_text_lines(text))
+
+    document = parse()
+    pages = []
+
+    def render():
+        pdf = _new_pdf()
+        md_to_pdf._add_cover_page(pdf, "Benchmark", "", "Author")
+        md_to_pdf._parse_and_render(pdf, document)
+        pages.append(pdf.pages_count)
+
+    def serialize(preset):
+        """Lay out under *preset*; return (pdf.output seconds, bytes)."""
+        times = []
+        for _ in range(repeat):
+            pdf = _new_pdf(None if preset == "default" else preset)
+            md_to_pdf._add_cover_page(pdf, "Benchmark", "", "Author")
+            md_to_pdf._parse_and_render(pdf, document)
+            start = time.perf_counter()
+            buf = pdf.output()
+            times.append(time.perf_counter() - start)
+        return {
+            "serialize_seconds": statistics.median(times),
+            "output_bytes": len(buf),
+        }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "input.md")
+        with open(src, "w", encoding="utf-8") as fh:
+            fh.write(text)
+        out = os.path.join(tmp, "output.pdf")
+
+        def read():
+            for _line in md_to_pdf.iter_md_lines(src):
+                pass
+
+        def end_to_end():
+            with contextlib.redirect_stdout(io.StringIO()):
+                md_to_pdf.convert_md_to_pdf(src, out, title="Benchmark")
+
+        seconds = {
+            "read": _median_of(read, repeat),
+            "sanitize": _median_of(sanitize, repeat),
+            "clean_inline": _median_of(clean_inline, repeat),
+            "parse": _median_of(parse, repeat),
+            "render": _median_of(render, repeat),
+            "end_to_end": _median_of(end_to_end, repeat),
+        }
+        output_bytes = os.path.getsize(out)
+    presets = {preset: serialize(preset) for preset in OUTPUT_PRESETS}
+
+    page_count = pages[-1]
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != "darwin":
+        rss *= 1024
+    return {
+        "lines": len(lines),
+        "bytes": len(text.encode("utf-8")),
+        "pages": page_count,
+        "output_bytes": output_bytes,
+        "seconds": seconds,
+        "presets": presets,
+        "lines_per_s": len(lines) / seconds["end_to_end"],
+        "pages_per_s": page_count / seconds["end_to_end"],
+        "peak_rss_bytes": rss,
+    }
+
+
+def run_suite(corpora, repeat):
+    """Run every corpus in its own process; return the full results dict."""
+    ctx = multiprocessing.get_context("spawn")
+    results = {}
+    for name in corpora:
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+            results[name] = pool.submit(run_corpus, name, repeat).result()
+    return {
+        "md_to_pdf_version": md_to_pdf.__version__,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "repeat": repeat,
+        "corpora": results,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Reporting and regression gating
+# ---------------------------------------------------------------------------
+
+def print_report(suite):
+    header = (
+        f"{'corpus':<48} {'lines':>7} {'pages':>5} {'e2e s':>8} "
+        f"{'lines/s':>9} {'pages/s':>8} {'RSS MiB':>8}"
+    )
+    print(header)
+    print("-" * len(header))
+    for name, r in suite["corpora"].items():
+        print(
+            f"{name:<48} {r['lines']:>7} {r['pages']:>5} "
+            f"{r['seconds']['end_to_end']:>8.3f} {r['lines_per_s']:>9.0f} "
+            f"{r['pages_per_s']:>8.1f} {r['peak_rss_bytes'] / 2**20:>8.1f}"
+        )
+        phases = "  ".join(
+            f"{phase}={r['seconds'][phase] * 1e3:.2f}ms" for phase in TIMED_PHASES
+        )
+        print(f"    {phases}")
+        presets = "  ".join(
+            f"{preset}={p['output_bytes'] / 1024:.1f}KiB/"
+            f"{p['serialize_seconds'] * 1e3:.2f}ms"
+            for preset, p in r.get("presets", {}).items()
+        )
+        if presets:
+            print(f"    output: {presets}")
+
+
+def find_regressions(suite, baseline, threshold, min_delta=0.005):
+    """Return ``(corpus, phase, old, new)`` for timings slower than allowed.
+
+    A timing regresses when it is more than *threshold* (a fraction) and
+    more than *min_delta* seconds slower than the baseline: sub-millisecond
+    phases jitter by far more than 10% between runs.
+    """
+    regressions = []
+    for name, r in suite["corpora"].items():
+        old = baseline.get("corpora", {}).get(name)
+        if old is None:
+            continue
+        for phase in TIMED_PHASES:
+            before = old["seconds"].get(phase)
+            after = r["seconds"][phase]
+            if (
+                before
+                and after > before * (1 + threshold)
+                and after - before > min_delta
+            ):
+                regressions.append((name, phase, before, after))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark md_to_pdf and gate on regressions.",
+    )
+    parser.add_argument(
+        "--corpus",
+        action="append",
+        help="Corpus to run (repo document name or synthetic-<N>x); "
+        "repeatable. Default: the repo documents plus synthetic-10x/100x.",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=7,
+        help="Runs per measurement; the median is kept (default: 7).",
+    )
+    parser.add_argument(
+        "--output",
+        help="Write the results to this JSON file.",
+    )
+    parser.add_argument(
+        "--baseline",
+        help="Compare against a previous results JSON file.",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="Allowed slowdown vs. the baseline as a fraction (default: 0.10).",
+    )
+    parser.add_argument(
+        "--min-delta",
+        type=float,
+        default=5.0,
+        help="Slowdowns of at most this many milliseconds never count as "
+        "regressions (default: 5).",
+    )
+    args = parser.parse_args()
+
+    suite = run_suite(args.corpus or default_corpora(), args.repeat)
+    print_report(suite)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(suite, fh, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        regressions = find_regressions(
+            suite, baseline, args.threshold, args.min_delta / 1e3
+        )
+        if regressions:
+            print(
+                f"\nRegressions beyond {args.threshold:.0%} "
+                f"and {args.min_delta:g}ms:"
+            )
+            for name, phase, before, after in regressions:
+                print(
+                    f"  {name} {phase}: {before * 1e3:.2f}ms -> "
+                    f"{after * 1e3:.2f}ms (+{after / before - 1:.0%})"
+                )
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.threshold:.0%} vs. {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for md_to_pdf.sanitize_text.
+
+Compares the translation-table sanitizer against the original
+replace-then-encode-per-character loop on every line of a Markdown file,
+checks that both produce identical output, and prints the speedup.
+
+Usage:
+    python benchmarks/bench_sanitize.py [FILE.md] [--repeat N]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import md_to_pdf  # noqa: E402
+
+
+def legacy_sanitize_text(text):
+    """The original implementation, kept here as the reference."""
+    for char, replacement in md_to_pdf.UNICODE_REPLACEMENTS.items():
+        text = text.replace(char, replacement)
+    result = []
+    for ch in text:
+        try:
+            ch.encode("latin-1")
+            result.append(ch)
+        except UnicodeEncodeError:
+            result.append("?")
+    return "".join(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "input",
+        nargs="?",
+        default=os.path.join(REPO_ROOT, "Ubuntu_Basic_Commands_Documentation.md"),
+        help="Markdown file whose lines are sanitized.",
+    )
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with open(args.input, "r", encoding="utf-8") as fh:
+        lines = fh.read().split("\n")
+
+    mismatches = [
+        line
+        for line in lines
+        if md_to_pdf.sanitize_text(line) != legacy_sanitize_text(line)
+    ]
+    if mismatches:
+        print(f"MISMATCH on {len(mismatches)} lines, e.g. {mismatches[0]!r}")
+        sys.exit(1)
+
+    def run(fn):
+        for line in lines:
+            fn(line)
+
+    legacy = min(
+        timeit.repeat(lambda: run(legacy_sanitize_text), number=1, repeat=args.repeat)
+    )
+    md_to_pdf._sanitize_non_ascii.cache_clear()
+    cold = timeit.timeit(lambda: run(md_to_pdf.sanitize_text), number=1)
+    warm = min(
+        timeit.repeat(
+            lambda: run(md_to_pdf.sanitize_text), number=1, repeat=args.repeat
+        )
+    )
+
+    print(f"{os.path.basename(args.input)}: {len(lines)} lines, output identical")
+    print(f"  legacy loop      : {legacy * 1e3:8.3f} ms")
+    print(f"  table (cold LRU) : {cold * 1e3:8.3f} ms  ({legacy / cold:5.1f}x)")
+    print(f"  table (warm LRU) : {warm * 1e3:8.3f} ms  ({legacy / warm:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
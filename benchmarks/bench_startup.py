@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Startup-time benchmark for the md_to_pdf CLI with regression gating.
+
+Times fresh interpreter runs of the invocations that should not pay for
+importing fpdf (``import md_to_pdf``, ``--help``, a usage error and a build
+cache hit) next to a full render for reference, and breaks the module
+import down with ``python -X importtime``.  Results are printed and can be
+stored as JSON; when a baseline JSON is given, any invocation that got
+slower by more than --threshold makes the run exit with status 1.
+
+Usage:
+    python benchmarks/bench_startup.py --output startup.json
+    python benchmarks/bench_startup.py --baseline startup.json --threshold 0.2
+    python benchmarks/bench_startup.py --repeat 20 --top 15
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(REPO_ROOT, "md_to_pdf.py")
+DOCUMENT = os.path.join(REPO_ROOT, "DOCUMENTATION.md")
+
+
+def invocations(tmp):
+    """``{name: (argv, expected exit status)}`` of the timed commands."""
+    output = os.path.join(tmp, "out.pdf")
+    cache = os.path.join(tmp, "cache")
+    convert = [SCRIPT, "--input", DOCUMENT, "--output", output]
+    return {
+        "import": (["-c", "import md_to_pdf"], 0),
+        "help": ([SCRIPT, "--help"], 0),
+        "usage_error": ([SCRIPT, "--input", DOCUMENT], 2),
+        "cache_hit": (convert + ["--cache-dir", cache], 0),
+        "render": (convert + ["--no-cache"], 0),
+    }
+
+
+def _run(args, expected):
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable] + args,
+        cwd=REPO_ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    elapsed = time.perf_counter() - start
+    if proc.returncode != expected:
+        sys.exit(
+            f"{' '.join(args)} exited with {proc.returncode}:\n"
+            + proc.stderr.decode(errors="replace")
+        )
+    return elapsed
+
+
+def time_invocations(repeat):
+    """Median and best wall time of every invocation over *repeat* runs."""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, (args, expected) in invocations(tmp).items():
+            _run(args, expected)  # warm the OS page cache (and build cache)
+            runs = [_run(args, expected) for _ in range(repeat)]
+            results[name] = {
+                "median": statistics.median(runs),
+                "best": min(runs),
+            }
+    return results
+
+
+def import_profile(top):
+    """The *top* modules by cumulative ``-X importtime`` for md_to_pdf."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import md_to_pdf"],
+        cwd=REPO_ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+    modules = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _self, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            modules.append((name.strip(), int(cumulative) / 1e6))
+    loaded = {name for name, _seconds in modules}
+    modules.sort(key=lambda m: m[1], reverse=True)
+    return {
+        "total": dict(modules).get("md_to_pdf", 0.0),
+        "fpdf_imported": "fpdf" in loaded,
+        "top": modules[:top],
+    }
+
+
+def print_report(suite):
+    print(f"{'invocation':<14} {'median ms':>10} {'best ms':>9}")
+    print("-" * 35)
+    for name, r in suite["invocations"].items():
+        print(f"{name:<14} {r['median'] * 1e3:>10.1f} {r['best'] * 1e3:>9.1f}")
+    profile = suite["import_profile"]
+    print(
+        f"\nimport md_to_pdf: {profile['total'] * 1e3:.1f} ms cumulative, "
+        f"fpdf {'imported' if profile['fpdf_imported'] else 'not imported'}"
+    )
+    for name, seconds in profile["top"]:
+        print(f"    {seconds * 1e3:8.2f} ms  {name}")
+
+
+def find_regressions(suite, baseline, threshold):
+    """Return ``(invocation, old, new)`` for medians slower than allowed."""
+    regressions = []
+    for name, r in suite["invocations"].items():
+        before = baseline.get("invocations", {}).get(name, {}).get("median")
+        if before and r["median"] > before * (1 + threshold):
+            regressions.append((name, before, r["median"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark md_to_pdf CLI startup and gate on regressions.",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=10,
+        help="Fresh-process runs per invocation; the median is kept "
+        "(default: 10).",
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=10,
+        help="Modules listed in the import breakdown (default: 10).",
+    )
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    parser.add_argument(
+        "--baseline",
+        help="Compare against a previous results JSON file.",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.20,
+        help="Allowed slowdown vs. the baseline as a fraction (default: 0.20).",
+    )
+    args = parser.parse_args()
+
+    suite = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "repeat": args.repeat,
+        "invocations": time_invocations(args.repeat),
+        "import_profile": import_profile(args.top),
+    }
+    print_report(suite)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(suite, fh, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        regressions = find_regressions(suite, baseline, args.threshold)
+        if regressions:
+            print(f"\nRegressions beyond {args.threshold:.0%}:")
+            for name, before, after in regressions:
+                print(
+                    f"  {name}: {before * 1e3:.1f}ms -> {after * 1e3:.1f}ms "
+                    f"(+{after / before - 1:.0%})"
+                )
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.threshold:.0%} vs. {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,23 +4,176 @@ Reusable Markdown-to-PDF converter using fpdf2.
 
 Converts any Markdown file into a professionally formatted PDF with:
   - Cover page (title, subtitle, author, version, year)
-  - Auto-generated Table of Contents from ## headers
+  - Auto-generated Table of Contents from ## headers, with page numbers
+  - PDF outline (bookmarks) for every ## and ### header
   - Color-coded section headers (## -> blue, ### -> dark gray)
   - Gray-background code blocks with Courier font
-  - Styled tables with blue headers and alternating row shading
-  - Bullet points, bold text, and regular paragraphs
+  - Styled tables with blue headers, measured column widths and wrapped cells
+  - Bullet points, bold text, and regular paragraphs, with inline
+    bold / italic / code spans / links rendered in the matching font
   - Page headers and footers with page numbers
-  - Unicode sanitization for Latin-1 compatibility
+  - Unicode sanitization for Latin-1 compatibility, or embedded (subset)
+    TrueType/OpenType fonts for full Unicode text
 
 Usage:
     python md_to_pdf.py --input FILE.md --output FILE.pdf \
         --title "Title" --subtitle "Subtitle" --author "Author"
+
+    # Batch mode: convert a directory tree (or glob) in parallel
+    python md_to_pdf.py --batch --input docs/ --output build/pdf/ --jobs 8
+
+    # Guide described by a document profile (cover, ToC style, appendix)
+    python md_to_pdf.py --doc-profile Ubuntu_Basic_Commands_Documentation.toml
+
+    # Re-render on every save, reusing the layout of unchanged sections
+    python md_to_pdf.py --input FILE.md --output FILE.pdf --watch
+
+    # Embed Unicode fonts (box drawing, non-Latin hostnames) instead of Latin-1
+    python md_to_pdf.py --input FILE.md --output FILE.pdf \
+        --font DejaVuSans.ttf --font-bold DejaVuSans-Bold.ttf \
+        --mono-font DejaVuSansMono.ttf
+
+    # Lay out a very large document as ~200-page volumes on every core
+    python md_to_pdf.py --input FILE.md --output FILE.pdf \
+        --volume-pages 200 --merge-volumes
+
+    # Smallest PDF for the release archive (see also --optimize speed)
+    python md_to_pdf.py --input FILE.md --output FILE.pdf --optimize size
+
+    # Thousands of pages with flat memory: pages spooled, PDF streamed out
+    python md_to_pdf.py --input FILE.md --output FILE.pdf --low-memory
+
+    # Page count and section pages only (JSON), without writing the PDF
+    python md_to_pdf.py --input FILE.md --dry-run
+
+    # PDF, HTML and plain text from a single parse (FILE.pdf/.html/.txt)
+    python md_to_pdf.py --input FILE.md --output FILE.pdf --format pdf,html,txt
+
+Unchanged inputs are served from an on-disk build cache (see --cache-dir,
+--no-cache and --force).  Output is reproducible: identical inputs and
+options give byte-identical PDFs (the creation date comes from
+$SOURCE_DATE_EPOCH or the cover year, not the clock).
+
+asyncio services (e.g. aiohttp) should use AsyncConverter, which renders in
+a pool of worker processes with bounded concurrency, per-job timeouts and
+cancellation, instead of blocking the event loop.
+
+Further single-line block types (ordered lists, admonitions, images ...) are
+added with register_block() without slowing down the built-in ones.
 """
 
 import argparse
+import contextlib
+import contextvars
+import copy
+import filecmp
+import functools
+import glob
+import hashlib
+import html
+import importlib.util
+import io
+import json
+import mmap
+import os
+import pickle
 import re
-from datetime import datetime
-from fpdf import FPDF
+import select
+import shutil
+import struct
+import sys
+import tempfile
+import textwrap
+import time
+import zlib
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timezone
+
+# Bump whenever a change alters the rendered output so cached PDFs built by
+# an older converter are not reused.
+__version__ = "1.9"
+
+# ---------------------------------------------------------------------------
+# fpdf, imported on first use
+# ---------------------------------------------------------------------------
+# Importing fpdf (and the fontTools it pulls in) takes a few hundred ms, so
+# it only happens on the render path: --help, usage errors and build-cache
+# hits never pay for it.  _load_fpdf() binds these names and imports the
+# classes derived from fpdf's from md_to_pdf_fpdf; asyncio and
+# concurrent.futures are likewise imported where they are used.
+fpdf = FPDF = ftsubset = ttLib = None
+PDFResourceType = TextEmphasis = get_color_font_object = None
+SubsetMap = TTFFont = Name = PDFContentStream = None
+
+_FPDF_CLASSES = (
+    "MarkdownPDF",
+    "_SubsetCachingProducer",
+    "_StreamingProducer",
+)
+_FPDF_VERSION_RE = re.compile(r'^FPDF_VERSION = "([^"]+)"', re.MULTILINE)
+
+# md_to_pdf_fpdf imports this module by name, also when it runs as a script
+sys.modules.setdefault("md_to_pdf", sys.modules[__name__])
+
+
+def _load_fpdf():
+    """Import fpdf, fontTools and :class:`MarkdownPDF` (once)."""
+    global fpdf, FPDF, ftsubset, ttLib, PDFResourceType, TextEmphasis
+    global get_color_font_object, SubsetMap, TTFFont, Name, PDFContentStream
+    global MarkdownPDF, _SubsetCachingProducer, _StreamingProducer
+    if fpdf is not None:
+        return
+    from fontTools import subset as ftsubset
+    from fontTools import ttLib
+    from fpdf import FPDF
+    from fpdf.enums import PDFResourceType, TextEmphasis
+    from fpdf.font_type_3 import get_color_font_object
+    from fpdf.fonts import SubsetMap, TTFFont
+    from fpdf.syntax import Name, PDFContentStream
+
+    from md_to_pdf_fpdf import (
+        MarkdownPDF,
+        _StreamingProducer,
+        _SubsetCachingProducer,
+    )
+
+    PDFContentStream._COMPRESSION_LEVEL = _CompressionLevel()
+    import fpdf  # last: marks the names above as loaded
+
+
+def __getattr__(name):
+    # PEP 562: md_to_pdf.MarkdownPDF imports fpdf on first access
+    if name in _FPDF_CLASSES:
+        _load_fpdf()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+@functools.lru_cache(maxsize=None)
+def _fpdf_version():
+    """fpdf's version (part of cache keys), read without importing fpdf."""
+    spec = importlib.util.find_spec("fpdf")
+    if spec is not None and spec.submodule_search_locations:
+        path = os.path.join(spec.submodule_search_locations[0], "fpdf.py")
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                match = _FPDF_VERSION_RE.search(fh.read())
+        except OSError:
+            match = None
+        if match:
+            return match.group(1)
+    _load_fpdf()
+    return fpdf.__version__
+
+# ---------------------------------------------------------------------------
+# Build cache defaults
+# ---------------------------------------------------------------------------
+DEFAULT_CACHE_DIR = os.environ.get(
+    "MD_TO_PDF_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "md_to_pdf"),
+)
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+CACHE_MAX_AGE_DAYS = 30
 
 # ---------------------------------------------------------------------------
 # Unicode -> Latin-1 safe replacements
@@ -59,58 +212,520 @@ UNICODE_REPLACEMENTS = {
 }
 
 
+# Every key is non-ASCII and every replacement is ASCII, so a single
+# str.translate pass is equivalent to applying the replacements in turn.
+_SANITIZE_TABLE = str.maketrans(UNICODE_REPLACEMENTS)
+
+
+@functools.lru_cache(maxsize=4096)
+def _sanitize_non_ascii(text):
+    text = text.translate(_SANITIZE_TABLE)
+    # "replace" maps each unencodable code point to "?"
+    return text.encode("latin-1", "replace").decode("latin-1")
+
+
 def sanitize_text(text):
     """Replace known Unicode characters and drop any remaining non-Latin-1 chars."""
-    for char, replacement in UNICODE_REPLACEMENTS.items():
-        text = text.replace(char, replacement)
-    result = []
-    for ch in text:
+    if text.isascii():
+        return text
+    return _sanitize_non_ascii(text)
+
+
+# ---------------------------------------------------------------------------
+# Unicode fonts (embedded TTF/OTF, subset to the glyphs used)
+# ---------------------------------------------------------------------------
+
+# TTFFont attributes that belong to one document rather than the font file.
+_FONT_DOCUMENT_SLOTS = {
+    "i",
+    "fontkey",
+    "emphasis",
+    "cw",
+    "ttfont",
+    "_hbfont",
+    "subset",
+    "missing_glyphs",
+    "biggest_size_pt",
+    "color_font",
+}
+_font_metrics = {}  # (path, mtime_ns, size) -> parsed metrics, per process
+_font_subsets = OrderedDict()  # (path, mtime_ns, size, glyphs) -> font bytes
+FONT_SUBSET_CACHE_SIZE = 64
+
+
+class UnicodeFonts:
+    """TrueType/OpenType files embedded in place of the core fonts.
+
+    *regular* (and optionally *bold*, *italic* and *bold_italic*) replaces
+    Helvetica; *mono* replaces Courier in code blocks and code spans.  Either
+    may be left out to keep that core font.  A style without a file of its
+    own falls back to the closest one given.  Only the faces and glyphs a
+    document uses are embedded.  The parsed font metrics are cached for the
+    life of the process and, with *cache_dir*, on disk next to the build
+    cache; font subsets are cached per process by glyph set.
+    """
+
+    __slots__ = ("regular", "bold", "italic", "bold_italic", "mono", "cache_dir")
+
+    def __init__(
+        self,
+        regular=None,
+        bold=None,
+        italic=None,
+        bold_italic=None,
+        mono=None,
+        cache_dir=None,
+    ):
+        self.regular = regular
+        self.bold = bold
+        self.italic = italic
+        self.bold_italic = bold_italic
+        self.mono = mono
+        self.cache_dir = cache_dir
+
+    def faces(self):
+        """``(family, style, path)`` of every face, in registration order."""
+        faces = []
+        if self.regular:
+            bold = self.bold or self.regular
+            italic = self.italic or self.regular
+            faces += [
+                ("mdsans", "", self.regular),
+                ("mdsans", "B", bold),
+                ("mdsans", "I", italic),
+                ("mdsans", "BI", self.bold_italic or self.bold or italic),
+            ]
+        if self.mono:
+            faces.append(("mdmono", "", self.mono))
+        return faces
+
+    def aliases(self):
+        """Core font family -> embedded family it is drawn with."""
+        aliases = {}
+        if self.regular:
+            aliases["helvetica"] = "mdsans"
+        if self.mono:
+            aliases["courier"] = "mdmono"
+        return aliases
+
+    def cache_args(self):
+        """Font file digests as a JSON-able dict (part of the cache key)."""
+        return {
+            f"{family}{style}": _file_digest(path)
+            for family, style, path in self.faces()
+        }
+
+    def __repr__(self):
+        return f"UnicodeFonts({self.regular!r}, mono={self.mono!r})"
+
+
+def _parse_font_metrics(path):
+    """Parse the font at *path* with fpdf; return its document-independent state."""
+    pdf = FPDF()
+    pdf.add_font("font", "", path)
+    font = pdf.fonts["font"]
+    return {
+        "slots": {
+            name: getattr(font, name)
+            for name in TTFFont.__slots__
+            if name not in _FONT_DOCUMENT_SLOTS and hasattr(font, name)
+        },
+        "cw": dict(font.cw),
+        "missing_width": font.desc.missing_width,
+        "color": font.color_font is not None,
+    }
+
+
+def _load_font_metrics(path, cache_dir=None):
+    """Return the parsed metrics of *path*, from memory or disk when possible."""
+    st = os.stat(path)
+    memo_key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    metrics = _font_metrics.get(memo_key)
+    if metrics is not None:
+        return metrics
+
+    entry = None
+    if cache_dir:
+        salt = f"font {__version__} fpdf {_fpdf_version()}"
+        key = hashlib.sha256(f"{salt} {_file_digest(path)}".encode()).hexdigest()
+        entry = os.path.join(cache_dir, key + ".pickle")
         try:
-            ch.encode("latin-1")
-            result.append(ch)
-        except UnicodeEncodeError:
-            result.append("?")
-    return "".join(result)
+            with open(entry, "rb") as fh:
+                metrics = pickle.load(fh)
+            os.utime(entry)  # refresh for LRU eviction
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            metrics = None
+    if metrics is None:
+        metrics = _parse_font_metrics(path)
+        if entry is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = f"{entry}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as fh:
+                pickle.dump(metrics, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, entry)
+    _font_metrics[memo_key] = metrics
+    return metrics
+
+
+def _add_cached_font(pdf, family, style, metrics):
+    """Register a :class:`TTFFont` built from cached *metrics* with *pdf*.
+
+    Equivalent to ``pdf.add_font`` without parsing the font again.  The
+    fontTools object used for subsetting at output time is opened lazily
+    and per document, because subsetting modifies it.
+    """
+    font = object.__new__(TTFFont)
+    for name, value in metrics["slots"].items():
+        setattr(font, name, value)
+    font.desc = copy.copy(font.desc)  # a PDF object: numbered at output time
+    missing_width = metrics["missing_width"]
+    font.cw = defaultdict(lambda: missing_width, metrics["cw"])
+    font.i = len(pdf.fonts) + 1
+    font.fontkey = f"{family}{style}"
+    font.emphasis = TextEmphasis.coerce(style)
+    font.ttfont = ttLib.TTFont(
+        font.ttffile,
+        recalcTimestamp=False,
+        fontNumber=font.collection_font_number,
+        lazy=True,
+    )
+    if font.is_compressed:
+        font.ttfont.flavor = None
+    font._hbfont = None
+    font.biggest_size_pt = 0
+    font.missing_glyphs = []
+    font.subset = SubsetMap(font)
+    font.color_font = (
+        get_color_font_object(pdf, font, font.palette_index)
+        if metrics["color"] and pdf.render_color_fonts
+        else None
+    )
+    pdf.fonts[font.fontkey] = font
+
+
+def _presubset_font(font):
+    """Swap *font*'s fontTools object for one holding only the glyphs used.
+
+    fpdf subsets every embedded font while writing the PDF, decompiling its
+    large tables again for each document.  Handing it a font already cut
+    down to the same glyphs (cached per process by glyph set) gives the
+    same bytes at a fraction of the cost.
+    """
+    glyph_names = font.subset.get_all_glyph_names()
+    st = os.stat(font.ttffile)
+    key = (str(font.ttffile), st.st_mtime_ns, st.st_size, frozenset(glyph_names))
+    data = _font_subsets.get(key)
+    if data is None:
+        # keep glyph names, so fpdf can select the same glyphs again
+        options = ftsubset.Options(
+            notdef_outline=True, recommended_glyphs=True, glyph_names=True
+        )
+        # tables fpdf drops from embedded fonts anyway
+        options.drop_tables += ["FFTM", "GDEF", "GPOS", "GSUB", "MATH", "hdmx"]
+        subsetter = ftsubset.Subsetter(options)
+        subsetter.populate(glyphs=glyph_names)
+        subsetter.subset(font.ttfont)
+        buf = io.BytesIO()
+        font.ttfont.save(buf)
+        data = _font_subsets[key] = buf.getvalue()
+        while len(_font_subsets) > FONT_SUBSET_CACHE_SIZE:
+            _font_subsets.popitem(last=False)
+    else:
+        _font_subsets.move_to_end(key)
+    font.ttfont = ttLib.TTFont(io.BytesIO(data), recalcTimestamp=False, lazy=True)
+
+
+def _fit_to_font(text, font):
+    """Replace the characters *font* has no glyph for (see UNICODE_REPLACEMENTS)."""
+    if text.isascii():
+        return text
+    cmap = font.cmap
+    missing = {c for c in text if ord(c) not in cmap}
+    if not missing:
+        return text
+    return text.translate(
+        {ord(c): UNICODE_REPLACEMENTS.get(c, "?") for c in missing}
+    )
 
 
 # ---------------------------------------------------------------------------
-# Custom PDF class with header / footer
+# Output presets (stream compression, shared page content, reproducibility)
 # ---------------------------------------------------------------------------
-class MarkdownPDF(FPDF):
-    """FPDF subclass that renders a header banner and page-number footer."""
 
-    def __init__(self, header_title="", *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self._header_title = header_title
+# --optimize presets: the zlib level of every stream (fpdf's default is -1,
+# i.e. zlib's 6), whether content repeated verbatim on every page (the
+# running header) is drawn from one shared form XObject, and whether all
+# pages share one /Resources dictionary instead of one object per page.
+OPTIMIZE_PRESETS = {
+    "speed": {
+        "compress_level": 1,
+        "share_forms": False,
+        "shared_resources": False,
+    },
+    "size": {
+        "compress_level": 9,
+        "share_forms": True,
+        "shared_resources": True,
+    },
+}
+
+# fpdf reads the level from the class attribute
+# PDFContentStream._COMPRESSION_LEVEL.  _load_fpdf replaces it with a
+# _CompressionLevel, which reads this variable, so every output (and every
+# thread) sees its own preset instead of whichever render set it last.
+_compression = contextvars.ContextVar("compression", default=-1)
+
+_FONT_REF_RE = re.compile(rb"/F(\d+) [\d.]+ Tf")
+
+
+class _CompressionLevel:
+    """``PDFContentStream._COMPRESSION_LEVEL`` of the current output."""
+
+    def __get__(self, obj, owner=None):
+        return _compression.get()
+
+
+@contextlib.contextmanager
+def _compression_level(level):
+    """Make fpdf compress the streams created in this block at zlib *level*.
+
+    ``None`` is fpdf's default level (-1).
+    """
+    token = _compression.set(-1 if level is None else level)
+    try:
+        yield
+    finally:
+        _compression.reset(token)
+
+
+def _optimize_preset(optimize):
+    """Return the :data:`OPTIMIZE_PRESETS` entry for *optimize* (or ``{}``)."""
+    if optimize is None:
+        return {}
+    try:
+        return OPTIMIZE_PRESETS[optimize]
+    except KeyError:
+        choices = ", ".join(OPTIMIZE_PRESETS)
+        raise ValueError(
+            f"unknown optimize preset {optimize!r} (choose from {choices})"
+        ) from None
+
+
+def _creation_date(year):
+    """Creation date stamped into the PDF (and hashed into its file /ID).
+
+    ``$SOURCE_DATE_EPOCH`` wins (reproducible-builds convention); otherwise
+    it is 1 January of the cover *year*, never the wall clock, so identical
+    inputs give byte-identical PDFs.
+    """
+    epoch = os.environ.get("SOURCE_DATE_EPOCH")
+    if epoch and epoch.isdigit():
+        return datetime.fromtimestamp(int(epoch), tz=timezone.utc)
+    try:
+        return datetime(int(year), 1, 1, tzinfo=timezone.utc)
+    except (TypeError, ValueError):
+        return datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _form_xobject(contents, font_ids, width, height, compress):
+    """A form XObject drawing *contents* (page operators) on a full page."""
+    xobject = PDFContentStream(contents=contents, compress=compress)
+    xobject.type = Name("XObject")
+    xobject.subtype = Name("Form")
+    xobject.b_box = f"[0 0 {width:.2f} {height:.2f}]"
+    xobject._font_ids = font_ids
+    xobject._registered = False
+    return xobject
+
+
+# ---------------------------------------------------------------------------
+# Low-memory output (page spool, incremental serialization)
+# ---------------------------------------------------------------------------
+# fpdf keeps every page's operators in memory until output() and then builds
+# the whole file in one bytearray.  In low-memory mode MarkdownPDF moves each
+# page to a temporary spool file as soon as the next one starts (it can no
+# longer change; only the reserved ToC pages are filled in at the end), and
+# _StreamingProducer writes the PDF straight to the destination, reading the
+# spooled pages back one at a time.  The "{nb}" total in the footer is still
+# a placeholder in the spool: each page keeps fpdf's substitution fragments
+# and they are resolved as the page is serialized.  Footer fragments differ
+# only by placeholder, so the spool rewrites them to one shared fragment.
+
+
+class _PageSpool:
+    """Contents of finished pages, kept in a temporary file by page index."""
+
+    def __init__(self):
+        self._file = tempfile.TemporaryFile()
+        self._extents = {}  # page index -> (offset, size)
+        self._substitutions = {}  # page index -> shared fpdf {nb} fragments
+        self._fragments = {}  # rendering state -> fragments (see _shared)
+        self._end = 0
+
+    def __contains__(self, index):
+        return index in self._extents
+
+    def write(self, index, contents, substitutions):
+        shared = []
+        for item in substitutions:
+            other = self._shared(item)
+            if other is not item:
+                contents = contents.replace(
+                    item.get_placeholder_string().encode("latin-1"),
+                    other.get_placeholder_string().encode("latin-1"),
+                )
+            if not any(other is seen for seen in shared):
+                shared.append(other)
+        self._file.seek(self._end)
+        self._file.write(contents)
+        self._extents[index] = (self._end, len(contents))
+        if shared:
+            self._substitutions[index] = tuple(shared)
+        self._end += len(contents)
+
+    def _shared(self, fragment):
+        """An earlier fragment rendering the same as *fragment*, or itself."""
+        key = (
+            tuple(fragment.characters),
+            fragment.k,
+            getattr(fragment, "_render_args", ()),
+            tuple(sorted(getattr(fragment, "_render_kwargs", {}).items())),
+            fragment.dummy_width_string,
+            fragment.align,
+        )
+        alike = self._fragments.setdefault(key, [])
+        for other in alike:
+            if other.graphics_state == fragment.graphics_state:
+                return other
+        alike.append(fragment)
+        return fragment
+
+    def read(self, index):
+        offset, size = self._extents[index]
+        self._file.seek(offset)
+        return self._file.read(size)
+
+    def substitutions(self, index):
+        return self._substitutions.get(index, ())
+
+    def close(self):
+        self._file.close()
+
+
+class _StreamWriter:
+    """Stand-in for the producer's output ``bytearray`` that writes through.
+
+    Offsets only need the length written so far; the MD5 the file /ID is
+    derived from is kept as a running hash (see MarkdownPDF._default_file_id).
+    """
+
+    def __init__(self, fh):
+        self._fh = fh
+        self._size = 0
+        self.md5 = hashlib.md5(usedforsecurity=False)
+
+    def __len__(self):
+        return self._size
+
+    def __iadd__(self, data):
+        self._fh.write(data)
+        self.md5.update(data)
+        self._size += len(data)
+        return self
+
+
+class _ResourceLookup(dict):
+    """Per-page resources whose missing entries read as empty, unstored."""
+
+    def __missing__(self, key):
+        return frozenset()
+
+
+# ---------------------------------------------------------------------------
+# Dry-run layout helpers (MarkdownPDF itself is in md_to_pdf_fpdf)
+# ---------------------------------------------------------------------------
+def _discard_content(_ops):
+    """Stand-in for ``FPDF._out`` on dry-run instances."""
+
+
+def _discard_drawing(*_args, **_kwargs):
+    """Stand-in for ``text`` / ``line`` / ``rect`` on dry-run instances."""
 
-    def header(self):
-        if self.page_no() > 1:
-            self.set_font("Helvetica", "I", 8)
-            self.set_text_color(128, 128, 128)
-            self.cell(
-                0,
-                10,
-                sanitize_text(self._header_title),
-                align="C",
-            )
-            self.ln(5)
-            self.set_draw_color(200, 200, 200)
-            self.line(10, self.get_y(), 200, self.get_y())
-            self.ln(5)
 
-    def footer(self):
-        self.set_y(-15)
-        self.set_font("Helvetica", "I", 8)
-        self.set_text_color(128, 128, 128)
-        self.cell(0, 10, f"Page {self.page_no()}/{{nb}}", align="C")
+# Text fpdf's line breaker treats specially (newlines, soft hyphens, spaces
+# other than " " -- fpdf.line_break.BREAKING_SPACE_SYMBOLS_STR -- and no-break
+# spaces, drawn as " "): a dry run leaves measuring it to fpdf.
+_MEASURE_BY_FPDF_RE = re.compile(
+    "[\n\f\t\xa0\xad\u200b\u2000-\u2006\u2008-\u200a\u205f\u3000]"
+)
+_WRAP_TOLERANCE = 1e-9  # fpdf.util.FloatTolerance
+
+
+def _wrap_lines(width, text, first, rest):
+    """Break *text* into lines the way fpdf's word wrap does.
+
+    *width* measures a string; *first* and *rest* are the widths available
+    to the first and to the following lines.  Returns ``(start, end,
+    width)`` per line, or ``None`` where fpdf would raise because a single
+    character is wider than a line.
+    """
+    lines = []
+    limit = first
+    start = 0  # where the current line starts in *text*
+    line_w = 0.0
+    hint = None  # (index, line width before it) of the line's last space
+    space_w = width(" ")
+    pos, n = 0, len(text)
+    while pos < n:
+        if text[pos] == " ":
+            if line_w + space_w - limit > _WRAP_TOLERANCE:
+                # a space that does not fit ends the line and is dropped
+                lines.append((start, pos, line_w))
+                start, line_w, hint, limit = pos + 1, 0.0, None, rest
+            else:
+                hint = (pos, line_w)
+                line_w += space_w
+            pos += 1
+            continue
+        end = text.find(" ", pos)
+        if end < 0:
+            end = n
+        word_w = width(text[pos:end])
+        if line_w + word_w - limit <= _WRAP_TOLERANCE:
+            line_w += word_w
+            pos = end
+            continue
+        if hint is not None:
+            # break at the last space; the word starts the next line
+            space, before = hint
+            lines.append((start, space, before))
+            start, line_w, hint, limit = space + 1, 0.0, None, rest
+            continue
+        for i in range(pos, end):  # no space to break at: split the word
+            char_w = width(text[i])
+            if line_w + char_w - limit > _WRAP_TOLERANCE:
+                lines.append((start, i, line_w))
+                start, line_w, limit = i, 0.0, rest
+                if char_w - limit > _WRAP_TOLERANCE:
+                    return None
+            line_w += char_w
+        pos = end
+    if line_w:
+        lines.append((start, n, line_w))
+    return lines
 
 
 # ---------------------------------------------------------------------------
 # PDF-building helpers (operate on a given *pdf* instance)
 # ---------------------------------------------------------------------------
 
-def _add_cover_page(pdf, title, subtitle, author, version="1.0", year=None):
-    """Render a centred cover page."""
+def _add_cover_page(
+    pdf, title, subtitle, author, version="1.0", year=None, title_lines=None
+):
+    """Render a centred cover page.
+
+    *title_lines*, if given, sets the title's line breaks explicitly.
+    """
     if year is None:
         year = str(datetime.now().year)
 
@@ -121,14 +736,17 @@ def _add_cover_page(pdf, title, subtitle, author, version="1.0", year=None):
     pdf.set_font("Helvetica", "B", 32)
     pdf.set_text_color(41, 128, 185)  # #2980B9
 
-    title_words = sanitize_text(title).split()
-    # Group into lines of ~3 words each for a nice cover look
-    chunk_size = 3
-    title_lines = []
-    for i in range(0, len(title_words), chunk_size):
-        title_lines.append(" ".join(title_words[i : i + chunk_size]))
+    if title_lines is None:
+        title_words = title.split()
+        # Group into lines of ~3 words each for a nice cover look
+        chunk_size = 3
+        title_lines = []
+        for i in range(0, len(title_words), chunk_size):
+            title_lines.append(" ".join(title_words[i : i + chunk_size]))
     for line in title_lines:
-        pdf.cell(0, 15, line, align="C", new_x="LMARGIN", new_y="NEXT")
+        pdf.cell(
+            0, 15, line, align="C", new_x="LMARGIN", new_y="NEXT"
+        )
 
     pdf.ln(10)
     # Decorative line
@@ -140,9 +758,7 @@ def _add_cover_page(pdf, title, subtitle, author, version="1.0", year=None):
     # Subtitle
     pdf.set_font("Helvetica", "", 14)
     pdf.set_text_color(100, 100, 100)
-    pdf.cell(
-        0, 10, sanitize_text(subtitle), align="C", new_x="LMARGIN", new_y="NEXT"
-    )
+    pdf.cell(0, 10, subtitle, align="C", new_x="LMARGIN", new_y="NEXT")
 
     pdf.ln(20)
 
@@ -151,7 +767,7 @@ def _add_cover_page(pdf, title, subtitle, author, version="1.0", year=None):
     pdf.cell(
         0,
         8,
-        f"Author: {sanitize_text(author)}",
+        f"Author: {author}",
         align="C",
         new_x="LMARGIN",
         new_y="NEXT",
@@ -166,33 +782,99 @@ def _add_cover_page(pdf, title, subtitle, author, version="1.0", year=None):
     )
 
 
-def _add_toc(pdf, toc_items):
-    """Render a Table of Contents page from a list of section titles."""
+TOC_LINE_HEIGHT = 8
+
+
+def _toc_heading(pdf):
+    """New page with the "Table of Contents" heading; returns the page top."""
     pdf.add_page()
+    top = pdf.get_y()  # below the page header, same on every page
     pdf.set_font("Helvetica", "B", 22)
     pdf.set_text_color(41, 128, 185)
     pdf.cell(0, 12, "Table of Contents", new_x="LMARGIN", new_y="NEXT")
     pdf.ln(5)
+    return top
+
+
+def _add_toc(pdf, num_items, numbered=True):
+    """Start the Table of Contents page and reserve room for *num_items*.
+
+    Page numbers are not known yet, so the entries are drawn by
+    :func:`_render_toc` into the reserved pages once the whole document has
+    been laid out (fpdf's ToC placeholder).  The placeholder leaves the
+    cursor on a fresh page, so the first section must not add another one.
+    """
+    top = _toc_heading(pdf)
+    if not num_items:
+        return False
+
+    per_first = int((pdf.page_break_trigger - pdf.get_y()) // TOC_LINE_HEIGHT)
+    per_page = int((pdf.page_break_trigger - top) // TOC_LINE_HEIGHT)
+    overflow = max(0, num_items - per_first)
+    pages = 1 + -(-overflow // per_page)
+    pdf.insert_toc_placeholder(
+        functools.partial(_render_toc, top=top, numbered=numbered), pages=pages
+    )
+    return True
+
 
+def _add_static_toc(pdf, entries):
+    """Table of Contents page listing *entries* as written (no page numbers)."""
+    _toc_heading(pdf)
     pdf.set_font("Helvetica", "", 12)
     pdf.set_text_color(50, 50, 50)
-    for idx, item in enumerate(toc_items, start=1):
+    for entry in entries:
         pdf.cell(10)
         pdf.cell(
             0,
-            8,
-            sanitize_text(f"{idx}. {item}"),
+            TOC_LINE_HEIGHT,
+            entry,
             new_x="LMARGIN",
             new_y="NEXT",
         )
 
 
-def _section_title(pdf, title):
-    """New page + large blue header with underline."""
-    pdf.add_page()
+def _render_toc(pdf, outline, top, numbered=True):
+    """Draw numbered, linked ToC entries with page numbers (fpdf callback).
+
+    Page breaks are taken explicitly so continuation entries start below the
+    header that was already drawn on each reserved page.
+    """
+    pdf.set_font("Helvetica", "", 12)
+    pdf.set_text_color(50, 50, 50)
+    pdf.set_x(pdf.l_margin)
+    items = [sec for sec in outline if sec.level == 0]
+    for idx, sec in enumerate(items, start=1):
+        if pdf.will_page_break(TOC_LINE_HEIGHT):
+            pdf.add_page()  # moves to the next reserved page
+            pdf.set_y(top)
+        link = pdf.add_link(page=sec.page_number)
+        pdf.cell(10)
+        pdf.cell(
+            pdf.epw - 30,
+            TOC_LINE_HEIGHT,
+            f"{idx}. {sec.name}" if numbered else sec.name,
+            link=link,
+        )
+        pdf.cell(
+            20,
+            TOC_LINE_HEIGHT,
+            str(sec.page_number),
+            align="R",
+            link=link,
+            new_x="LMARGIN",
+            new_y="NEXT",
+        )
+
+
+def _section_title(pdf, title, new_page=True):
+    """New page + large blue header with underline and outline entry."""
+    if new_page:
+        pdf.add_page()
+    pdf.start_section(title, level=0)
     pdf.set_font("Helvetica", "B", 20)
     pdf.set_text_color(41, 128, 185)
-    pdf.cell(0, 12, sanitize_text(title), new_x="LMARGIN", new_y="NEXT")
+    pdf.cell(0, 12, title, new_x="LMARGIN", new_y="NEXT")
     pdf.set_draw_color(41, 128, 185)
     pdf.set_line_width(0.5)
     pdf.line(10, pdf.get_y() + 2, 200, pdf.get_y() + 2)
@@ -200,265 +882,3281 @@ def _section_title(pdf, title):
 
 
 def _subsection_title(pdf, title):
-    """Dark-grey bold subsection heading."""
+    """Dark-grey bold subsection heading with outline entry."""
     pdf.ln(4)
     pdf.set_font("Helvetica", "B", 14)
+    if pdf.will_page_break(10):
+        # break now so the outline entry points at the heading's page
+        pdf.add_page()
+    pdf.start_section(title, level=1)
     pdf.set_text_color(52, 73, 94)
-    pdf.cell(0, 10, sanitize_text(title), new_x="LMARGIN", new_y="NEXT")
+    pdf.cell(0, 10, title, new_x="LMARGIN", new_y="NEXT")
     pdf.ln(2)
 
 
 def _body_text(pdf, text):
-    """Normal paragraph text."""
-    pdf.set_font("Helvetica", "", 10)
+    """Normal paragraph text (inline Markdown is styled)."""
     pdf.set_text_color(50, 50, 50)
-    pdf.multi_cell(0, 6, sanitize_text(text))
+    _inline_text(pdf, text, 0, 6)
     pdf.ln(2)
 
 
-def _code_block(pdf, lines):
-    """Render a code block with grey background and Courier font."""
+CODE_WIDTH = 190
+CODE_LINE_HEIGHT = 5.5
+CODE_TEXT_COLOR = (30, 30, 30)
+CODE_TOKEN_COLORS = {
+    "comment": (120, 120, 120),
+    "key": (41, 128, 185),
+    "keyword": (142, 68, 173),
+    "string": (39, 174, 96),
+    "template": (211, 84, 0),
+}
+CODE_LINE_NUMBER_COLOR = (150, 150, 150)
+
+_CODE_COMMENT = r"(?P<comment>(?:^|(?<=\s))#.*)"
+_CODE_STRING = r"(?P<string>\"[^\"]*\"|'[^']*')"
+_CODE_TEMPLATE = r"(?P<template>\{\{.*?\}\}|\{%.*?%\}|\{#.*?#\})"
+
+# One compiled tokenizer per fence language; anything unmatched keeps the
+# default code colour.
+_CODE_TOKENIZERS = {
+    "yaml": re.compile(
+        "|".join(
+            (
+                _CODE_TEMPLATE,
+                _CODE_COMMENT,
+                r"(?P<key>^\s*(?:-\s+)?[\w./-]+(?=\s*:(?:\s|$)))",
+                _CODE_STRING,
+            )
+        )
+    ),
+    "jinja": re.compile(_CODE_TEMPLATE),
+    "junos": re.compile(
+        "|".join(
+            (
+                r"(?P<keyword>^\s*(?:set|delete|deactivate|activate|edit|"
+                r"insert|rename|annotate)\b)",
+                _CODE_COMMENT,
+                _CODE_STRING,
+            )
+        )
+    ),
+}
+CODE_LANGUAGES = {
+    "yaml": "yaml",
+    "yml": "yaml",
+    "jinja": "jinja",
+    "jinja2": "jinja",
+    "j2": "jinja",
+    "junos": "junos",
+}
+
+
+def _code_runs(text, tokenizer):
+    """Split a code line into ``(column, text, token)`` runs."""
+    runs = []
+    pos = 0
+    for m in tokenizer.finditer(text):
+        start, end = m.span()
+        if start == end:
+            continue
+        if start > pos:
+            runs.append((pos, text[pos:start], None))
+        runs.append((start, m.group(), m.lastgroup))
+        pos = end
+    if pos < len(text):
+        runs.append((pos, text[pos:], None))
+    return runs
+
+
+def _code_block(pdf, lines, language=""):
+    """Render a code block with grey background and Courier font.
+
+    The block is laid out in page-sized chunks: the number of lines that fit
+    above the page-break trigger is computed once per page, the chunk's
+    background is one filled rectangle, and the text is placed with
+    ``pdf.text`` (grouped by colour) rather than one ``cell`` per line.
+    Fences tagged ``yaml``, ``jinja`` or ``junos`` are colourised, and
+    ``pdf.code_line_numbers`` adds a line-number gutter.
+    """
     pdf.set_fill_color(240, 240, 240)
     pdf.set_draw_color(200, 200, 200)
     pdf.set_font("Courier", "", 9)
-    pdf.set_text_color(30, 30, 30)
     x = pdf.get_x()
-    w = 190
-    for line in lines:
-        if pdf.get_y() > 265:
+    # Courier is monospaced, so every column offset is a multiple of this
+    char_w = pdf.get_string_width(" ")
+    baseline = 0.5 * CODE_LINE_HEIGHT + 0.3 * pdf.font_size
+    tokenizer = _CODE_TOKENIZERS.get(CODE_LANGUAGES.get(language))
+    if getattr(pdf, "code_line_numbers", False):
+        digits = len(str(len(lines)))
+        text_x = x + pdf.c_margin + (digits + 2) * char_w
+    else:
+        digits = 0
+        text_x = x + pdf.c_margin + 2 * char_w
+
+    start = 0
+    while start < len(lines):
+        y = pdf.get_y()
+        fit = int((pdf.page_break_trigger - y) // CODE_LINE_HEIGHT)
+        if fit <= 0:
             pdf.add_page()
-        pdf.set_x(x)
-        pdf.cell(
-            w,
-            5.5,
-            "  " + sanitize_text(line),
-            fill=True,
-            new_x="LMARGIN",
-            new_y="NEXT",
-        )
+            continue
+        chunk = lines[start : start + fit]
+        pdf.rect(x, y, CODE_WIDTH, len(chunk) * CODE_LINE_HEIGHT, style="F")
+
+        by_color = {CODE_TEXT_COLOR: []}
+        for i, line in enumerate(chunk):
+            text = pdf.normalize_text(line)
+            if not text:
+                continue
+            ty = y + i * CODE_LINE_HEIGHT + baseline
+            if tokenizer is None:
+                by_color[CODE_TEXT_COLOR].append((text_x, ty, text))
+                continue
+            for col, run, token in _code_runs(text, tokenizer):
+                color = CODE_TOKEN_COLORS[token] if token else CODE_TEXT_COLOR
+                by_color.setdefault(color, []).append(
+                    (text_x + col * char_w, ty, run)
+                )
+        if digits:
+            by_color[CODE_LINE_NUMBER_COLOR] = [
+                (
+                    x + pdf.c_margin,
+                    y + i * CODE_LINE_HEIGHT + baseline,
+                    str(start + i + 1).rjust(digits),
+                )
+                for i in range(len(chunk))
+            ]
+        for color, items in by_color.items():
+            pdf.set_text_color(*color)
+            for tx, ty, text in items:
+                pdf.text(tx, ty, text)
+
+        start += len(chunk)
+        pdf.set_xy(pdf.l_margin, y + len(chunk) * CODE_LINE_HEIGHT)
+    pdf.set_text_color(*CODE_TEXT_COLOR)
     pdf.ln(4)
 
 
-def _table_col_widths(num_cols):
-    """Return a list of column widths that sum to 190 mm."""
-    if num_cols == 2:
-        return [45, 145]
-    elif num_cols == 3:
-        return [35, 55, 100]
-    elif num_cols == 4:
-        return [30, 45, 50, 65]
+TABLE_WIDTH = 190
+TABLE_LINE_HEIGHT = 5
+TABLE_ROW_PADDING = 2  # single-line rows stay 7 mm tall
+
+
+def _table_col_widths(natural, total=TABLE_WIDTH):
+    """Split *total* mm between columns given their natural (unwrapped) widths.
+
+    Columns narrower than an even share keep their natural width; the rest
+    of the space goes to the wide columns in proportion to their content,
+    which is where wrapping happens.  Any slack is spread proportionally.
+    """
+    num_cols = len(natural)
+    widths = [None] * num_cols
+    remaining = total
+    flexible = list(range(num_cols))
+    while flexible:
+        share = remaining / len(flexible)
+        narrow = [i for i in flexible if natural[i] <= share]
+        if not narrow:
+            break
+        for i in narrow:
+            widths[i] = natural[i]
+            remaining -= natural[i]
+        flexible = [i for i in flexible if widths[i] is None]
+
+    if flexible:
+        weight = sum(natural[i] for i in flexible)
+        for i in flexible:
+            widths[i] = remaining * natural[i] / weight
     else:
-        # 5+ columns: distribute evenly
-        w = int(190 / num_cols)
-        widths = [w] * num_cols
-        # give any remaining space to the last column
-        widths[-1] += 190 - sum(widths)
-        return widths
-
-
-def _table_row(pdf, cells, header=False):
-    """Render one table row with optional header styling."""
-    pdf.set_font("Helvetica", "B" if header else "", 9)
-    if header:
+        weight = sum(natural)
+        for i in range(num_cols):
+            widths[i] += remaining * natural[i] / weight
+    return widths
+
+
+def _table(pdf, rows):
+    """Render a table with measured column widths and wrapped cells.
+
+    Every cell is measured exactly once; only cells wider
+    than their column go through fpdf's line breaker.  Rows that do not fit
+    on the page move to the next one, and the header row is repeated there;
+    rows taller than a whole page are split across pages.  A table without
+    any cells (a line that is just ``|``) draws nothing.
+    """
+    if not any(rows):
+        return
+    num_cols = max(len(row) for row in rows)
+    styles = ["B"] + [""] * (len(rows) - 1)
+    pad = 2 * pdf.c_margin
+    width_cache = {}  # (style, text) -> string width; cells repeat a lot
+    texts = []
+    measured = []
+    natural = [pad] * num_cols
+    for style, row in zip(styles, rows):
+        pdf.set_font("Helvetica", style, 9)
+        cells = [c.strip() for c in row]
+        cells += [""] * (num_cols - len(cells))
+        widths = []
+        for i, text in enumerate(cells):
+            w = width_cache.get((style, text))
+            if w is None:
+                w = width_cache[style, text] = pdf.get_string_width(text)
+            widths.append(w)
+            natural[i] = max(natural[i], w + pad)
+        texts.append(cells)
+        measured.append(widths)
+    col_widths = _table_col_widths(natural)
+
+    # Lay out every row: the lines of each cell, plus the row height.
+    layout = []
+    for style, cells, widths in zip(styles, texts, measured):
+        pdf.set_font("Helvetica", style, 9)
+        cell_lines = []
+        for text, w, cw in zip(cells, widths, col_widths):
+            if w + pad <= cw:
+                cell_lines.append([text])
+            else:
+                cell_lines.append(
+                    pdf.multi_cell(
+                        cw, TABLE_LINE_HEIGHT, text, dry_run=True, output="LINES"
+                    )
+                )
+        n = max(len(lines) for lines in cell_lines)
+        height = n * TABLE_LINE_HEIGHT + TABLE_ROW_PADDING
+        layout.append((style, cell_lines, height))
+
+    header = layout[0]
+    # keep the header together with the first body row
+    first = header[2] + (layout[1][2] if len(layout) > 1 else 0)
+    at_top = pdf.will_page_break(first)  # header just drawn atop a page
+    if at_top:
+        pdf.add_page()
+    _table_draw_row(pdf, header, col_widths)
+    for row in layout[1:]:
+        if pdf.will_page_break(row[2]) and not at_top:
+            pdf.add_page()
+            _table_draw_row(pdf, header, col_widths)
+        if pdf.will_page_break(row[2]):
+            _table_draw_tall_row(pdf, row, header, col_widths)
+        else:
+            _table_draw_row(pdf, row, col_widths)
+        at_top = False
+    pdf.ln(3)
+
+
+def _table_draw_tall_row(pdf, row, header, col_widths):
+    """Draw a row taller than a page, one page's worth of lines at a time.
+
+    Every part is a row of its own, so cell borders and fills stay on their
+    page; the header row is repeated above each continuation.
+    """
+    style, cell_lines, _height = row
+    total = max(len(lines) for lines in cell_lines)
+    start = 0
+    while True:
+        room = pdf.page_break_trigger - pdf.y - TABLE_ROW_PADDING
+        count = max(1, int(room // TABLE_LINE_HEIGHT))
+        height = count * TABLE_LINE_HEIGHT + TABLE_ROW_PADDING
+        while count > 1 and pdf.will_page_break(height):
+            count -= 1
+            height -= TABLE_LINE_HEIGHT
+        end = min(start + count, total)
+        part = [lines[start:end] or [""] for lines in cell_lines]
+        height = (end - start) * TABLE_LINE_HEIGHT + TABLE_ROW_PADDING
+        _table_draw_row(pdf, (style, part, height), col_widths)
+        if end == total:
+            return
+        start = end
+        pdf.add_page()
+        _table_draw_row(pdf, header, col_widths)
+
+
+def _table_draw_row(pdf, row, col_widths):
+    """Draw one laid-out table row at the current position."""
+    style, cell_lines, height = row
+    pdf.set_font("Helvetica", style, 9)
+    if style:
         pdf.set_fill_color(41, 128, 185)
         pdf.set_text_color(255, 255, 255)
     else:
         pdf.set_fill_color(245, 245, 245)
         pdf.set_text_color(50, 50, 50)
 
-    col_widths = _table_col_widths(len(cells))
-    for i, cell in enumerate(cells):
-        cw = col_widths[i] if i < len(col_widths) else 60
-        pdf.cell(cw, 7, sanitize_text(cell.strip()), border=1, fill=True)
-    pdf.ln()
+    if height == TABLE_LINE_HEIGHT + TABLE_ROW_PADDING:
+        for lines, cw in zip(cell_lines, col_widths):
+            pdf.cell(cw, height, lines[0], border=1, fill=True)
+        pdf.ln()
+        return
+
+    x, y = pdf.get_x(), pdf.get_y()
+    for lines, cw in zip(cell_lines, col_widths):
+        pdf.rect(x, y, cw, height, style="DF")
+        pdf.set_xy(x, y + TABLE_ROW_PADDING / 2)
+        for line in lines:
+            pdf.cell(cw, TABLE_LINE_HEIGHT, line, new_x="LEFT", new_y="NEXT")
+        x += cw
+    pdf.set_xy(pdf.l_margin, y + height)
+
+
+# ---------------------------------------------------------------------------
+# Inline Markdown (code spans, bold, italics, links) in one compiled pass
+# ---------------------------------------------------------------------------
+_INLINE_RE = re.compile(
+    r"`(?P<code>[^`]+)`"
+    r"|\*\*(?P<bold>[^*]+)\*\*"
+    r"|\[(?P<link>[^\]]+)\]\((?P<url>[^)]+)\)"
+    r"|(?<![\w*])\*(?P<italic>[^*\s](?:[^*]*[^*\s])?)\*(?![\w*])"
+)
+# run style -> (font family, font style)
+INLINE_FONTS = {
+    "": ("Helvetica", ""),
+    "B": ("Helvetica", "B"),
+    "I": ("Helvetica", "I"),
+    "BI": ("Helvetica", "BI"),
+    "C": ("Courier", ""),
+}
+LINK_COLOR = (41, 128, 185)
+# fpdf takes any other link target for a named destination (``#intro``)
+# or a file, and refuses to output a PDF naming a destination never set
+_PDF_LINK_RE = re.compile(r"\s*(?:https?|mailto):", re.IGNORECASE)
+
+
+def _pdf_link(url):
+    """*url* if it may become a PDF link (absolute http(s) or mailto)."""
+    return url if url and _PDF_LINK_RE.match(url) else None
+
+
+def parse_inline(text):
+    """Split *text* into ``(text, style, link)`` runs.
+
+    *style* is ``""`` (plain), ``"B"`` (bold), ``"I"`` (italic), ``"BI"``
+    or ``"C"`` (code span); *link* is the target URL of a ``[text](url)``
+    run, else ``None``.  Bold, italic and link text may nest further spans
+    (``**`ls -la`**``, ``[`git`](url)``).  Text without any inline marker
+    is returned as a single run without touching the regex.
+    """
+    if "`" not in text and "*" not in text and "[" not in text:
+        return [(text, "", None)]
+    runs = []
+    _inline_runs(text, "", None, runs)
+    return runs
+
+
+def _inline_runs(text, style, link, runs):
+    """Append the runs of *text*, nested in *style* and *link*, to *runs*."""
+    pos = 0
+    for m in _INLINE_RE.finditer(text):
+        if m.start() > pos:
+            runs.append((text[pos : m.start()], style, link))
+        code, bold, label, url, italic = m.groups()
+        if code is not None:
+            runs.append((code, "C", link))  # code spans keep their font
+        elif label is not None:
+            _inline_runs(label, style, url, runs)
+        elif bold is not None:
+            _inline_runs(bold, "B" + style.replace("B", ""), link, runs)
+        else:
+            _inline_runs(italic, style.replace("I", "") + "I", link, runs)
+        pos = m.end()
+    if pos < len(text):
+        runs.append((text[pos:], style, link))
+
+
+def _plain_match(m):
+    code, bold, label, _url, italic = m.groups()
+    if code is not None:
+        return code
+    inner = bold if bold is not None else label if label is not None else italic
+    return _INLINE_RE.sub(_plain_match, inner)
 
 
 def _clean_inline_md(text):
-    """Strip inline Markdown formatting (backticks, bold, links)."""
-    text = re.sub(r"`([^`]+)`", r"\1", text)
-    text = re.sub(r"\*\*([^*]+)\*\*", r"\1", text)
-    text = re.sub(r"\[([^\]]+)\]\([^)]+\)", r"\1", text)
-    return text
+    """Strip inline Markdown formatting (code spans, bold, italics, links)."""
+    if "`" not in text and "*" not in text and "[" not in text:
+        return text
+    return _INLINE_RE.sub(_plain_match, text)
+
+
+def _inline_text(pdf, text, width, h, base_style="", size=10):
+    """Flow inline-Markdown *text* from the current x over *width* mm.
+
+    Plain text goes through a single ``multi_cell``; styled text is written
+    run by run with the matching font (bold, italic, Courier for code,
+    clickable web and mailto links; other targets stay plain text) inside
+    temporary margins.  *width* 0 means "up to the right margin", as with
+    ``multi_cell``.
+    """
+    runs = parse_inline(text)
+    if len(runs) == 1 and not runs[0][1] and runs[0][2] is None:
+        pdf.set_font("Helvetica", base_style, size)
+        pdf.multi_cell(width, h, runs[0][0])
+        return
+
+    color = pdf.text_color
+    left, right = pdf.l_margin, pdf.r_margin
+    x = pdf.get_x()
+    pdf.set_left_margin(x)
+    if width:
+        pdf.set_right_margin(pdf.w - x - width)
+    for run, style, link in runs:
+        family, font_style = INLINE_FONTS[style]
+        if family == "Helvetica":
+            font_style = "".join(sorted(set(font_style + base_style)))
+        pdf.set_font(family, font_style, size)
+        link = _pdf_link(link)
+        if link:
+            pdf.set_text_color(*LINK_COLOR)
+            pdf.write(h, run, link=link)
+            pdf.set_text_color(color)
+        else:
+            pdf.write(h, run)
+    pdf.ln(h)
+    pdf.set_left_margin(left)
+    pdf.set_right_margin(right)
 
 
 # ---------------------------------------------------------------------------
 # Markdown parser  →  PDF builder
 # ---------------------------------------------------------------------------
 
-def _extract_toc(sections):
-    """Return a list of section titles (from ## headers) for the ToC."""
-    toc = []
-    for sec in sections:
-        lines = sec.strip().split("\n")
-        title = lines[0].strip().lstrip("#").strip()
-        if title.lower().startswith("table of contents"):
-            continue
-        toc.append(title)
-    return toc
+MMAP_CHUNK_BYTES = 256 * 1024
 
 
-def _parse_and_render(pdf, md_content):
-    """Walk through Markdown content and emit PDF elements."""
-    sections = md_content.split("\n## ")
+def iter_md_lines(path):
+    """Yield the lines of the UTF-8 file at *path* without line endings.
 
-    # First pass: collect ToC items (skip the part before the first ##)
-    toc_items = _extract_toc(sections[1:])
-    _add_toc(pdf, toc_items)
+    The file is memory-mapped and decoded in line-aligned chunks of about
+    ``MMAP_CHUNK_BYTES`` (a chunk always ends on ``\\n``, so it never splits
+    a UTF-8 sequence), and pages already consumed are released again, so
+    memory use does not grow with the file's size.  Line endings are
+    normalised like text-mode ``open()``.  Files that cannot be mapped
+    (empty files, pipes) are read through a normal text stream.
+    """
+    with open(path, "rb") as fh:
+        try:
+            mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            for line in io.TextIOWrapper(fh, encoding="utf-8", newline=None):
+                yield line.rstrip("\n")
+            return
+        with mm:
+            yield from _iter_mapped_lines(mm)
 
-    # Second pass: render each section
-    for sec_idx, section in enumerate(sections):
-        if sec_idx == 0:
-            # Content before the first ## (often a top-level # heading / intro)
-            continue
 
-        lines = section.strip().split("\n")
-        title = lines[0].strip().lstrip("#").strip()
+def _iter_mapped_lines(mm):
+    size = len(mm)
+    advise = getattr(mm, "madvise", None)
+    if advise is not None and hasattr(mmap, "MADV_SEQUENTIAL"):
+        advise(mmap.MADV_SEQUENTIAL)
+    release = advise is not None and hasattr(mmap, "MADV_DONTNEED")
+    released = pos = 0
+    while pos < size:
+        end = pos + MMAP_CHUNK_BYTES
+        if end < size:
+            cut = mm.rfind(b"\n", pos, end)
+            if cut < 0:  # a single line longer than the chunk
+                cut = mm.find(b"\n", end)
+            end = size if cut < 0 else cut + 1
+        else:
+            end = size
+        text = mm[pos:end].decode("utf-8")
+        pos = end
+        if "\r" in text:
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+        lines = text.split("\n")
+        if not lines[-1]:
+            lines.pop()  # the chunk's final newline
+        yield from lines
+        if release:
+            # drop the pages just decoded from our resident set
+            done = pos - pos % mmap.PAGESIZE
+            if done > released:
+                advise(mmap.MADV_DONTNEED, released, done - released)
+                released = done
 
-        if title.lower().startswith("table of contents"):
-            continue
 
-        _section_title(pdf, title)
+def iter_text_lines(text):
+    """Yield the lines of the Markdown string *text* without line endings.
 
-        in_code = False
-        code_lines = []
-        in_table = False
+    Line endings are normalised the same way as :func:`iter_md_lines`.
+    """
+    for line in io.StringIO(text, newline=None):
+        yield line.rstrip("\n")
 
-        for line in lines[1:]:
-            stripped = line.strip()
 
-            # --- code fences ---
-            if stripped.startswith("```"):
-                if in_code:
-                    _code_block(pdf, code_lines)
-                    code_lines = []
-                    in_code = False
-                else:
-                    in_code = True
-                continue
+# Single-line block types are classified by the first character of the
+# stripped line: _LINE_RULES maps it to the (kind, match) rules tried in
+# order.  match(stripped, line) returns the block's data, or None if the
+# line is not of that kind; a rule whose kind is None drops the line.  A
+# line no rule claims is a paragraph, so plain prose (most lines) costs one
+# dict lookup.  Code fences and tables span several lines and are handled
+# by parse_md_blocks itself.
+def _match_rule(stripped, _line):
+    return True if stripped == "---" else None
 
-            if in_code:
-                code_lines.append(line.rstrip())
-                continue
 
-            # --- tables ---
-            if stripped.startswith("|") and not stripped.startswith("|---"):
-                cells = [c.strip() for c in stripped.split("|") if c.strip()]
-                if not in_table:
-                    in_table = True
-                    if pdf.get_y() > 250:
-                        pdf.add_page()
-                    _table_row(pdf, cells, header=True)
-                elif (
-                    stripped.replace("|", "").replace("-", "").replace(" ", "") == ""
-                ):
-                    continue
-                else:
-                    if pdf.get_y() > 270:
-                        pdf.add_page()
-                    _table_row(pdf, cells, header=False)
-                continue
-            elif in_table and not stripped.startswith("|"):
-                in_table = False
-                pdf.ln(3)
+def _match_table_rule(_stripped, _line):
+    return True  # a "|---" line outside a table
 
-            # Skip separator lines
-            if stripped.startswith("|---") or stripped == "---":
-                continue
 
-            # --- subsection headers ---
-            if stripped.startswith("### "):
-                _subsection_title(pdf, stripped[4:].strip())
-                continue
+def _match_subsection(stripped, _line):
+    return stripped[4:].strip() if stripped.startswith("### ") else None
 
-            # --- bold-only paragraphs ---
-            if stripped.startswith("**") and stripped.endswith("**"):
-                pdf.set_font("Helvetica", "B", 10)
-                pdf.set_text_color(50, 50, 50)
-                text = stripped.strip("*").strip()
-                pdf.multi_cell(0, 6, sanitize_text(text))
-                pdf.ln(2)
-                continue
 
-            # --- bullet points ---
-            if stripped.startswith("- "):
-                pdf.set_font("Helvetica", "", 10)
-                pdf.set_text_color(50, 50, 50)
-                text = _clean_inline_md(stripped[2:])
-                pdf.cell(5)
-                pdf.cell(5, 6, "-")
-                pdf.multi_cell(175, 6, sanitize_text(text))
-                pdf.ln(1)
-                continue
+def _match_heading(_stripped, _line):
+    return True  # "#" and "####"+ headings are not rendered
 
-            # --- blockquotes (render as italic indented text) ---
-            if stripped.startswith("> "):
-                pdf.set_font("Helvetica", "I", 10)
-                pdf.set_text_color(100, 100, 100)
-                text = _clean_inline_md(stripped[2:].lstrip("*").rstrip("*").strip())
-                pdf.cell(10)
-                pdf.multi_cell(175, 6, sanitize_text(text))
-                pdf.ln(2)
-                continue
 
-            # --- regular paragraph ---
-            if stripped and not stripped.startswith("#"):
-                text = _clean_inline_md(stripped)
-                _body_text(pdf, text)
+def _match_bold(stripped, _line):
+    if stripped.startswith("**") and stripped.endswith("**"):
+        return stripped.strip("*").strip()
+    return None
 
 
-# ---------------------------------------------------------------------------
-# Public API
-# ---------------------------------------------------------------------------
+def _match_bullet(stripped, _line):
+    return stripped[2:] if stripped.startswith("- ") else None
 
-def convert_md_to_pdf(
-    input_path,
-    output_path,
-    title="Document",
-    subtitle="",
-    author="Author",
-    version="1.0",
-    year=None,
-):
-    """Read *input_path* (Markdown) and write a styled PDF to *output_path*."""
-    if year is None:
-        year = str(datetime.now().year)
 
-    with open(input_path, "r", encoding="utf-8") as fh:
-        md_content = fh.read()
+def _match_quote(stripped, _line):
+    return stripped[2:].strip() if stripped.startswith("> ") else None
 
-    pdf = MarkdownPDF(header_title=title)
-    pdf.alias_nb_pages()
-    pdf.set_auto_page_break(auto=True, margin=20)
 
-    _add_cover_page(pdf, title, subtitle, author, version=version, year=year)
-    _parse_and_render(pdf, md_content)
+_LINE_RULES = {
+    "-": [(None, _match_rule), ("bullet", _match_bullet)],
+    "|": [(None, _match_table_rule)],
+    "#": [("subsection", _match_subsection), (None, _match_heading)],
+    "*": [("bold", _match_bold)],
+    ">": [("quote", _match_quote)],
+}
+_REGISTERED_KINDS = []  # parse-affecting block types, part of cache keys
 
-    pdf.output(output_path)
-    print(f"PDF generated successfully: {output_path}")
 
+def parse_md_blocks(lines):
+    """Turn an iterable of Markdown lines into a stream of block events.
 
-# ---------------------------------------------------------------------------
-# CLI entry-point
-# ---------------------------------------------------------------------------
+    Yields ``(kind, data)`` tuples as soon as each block is complete:
 
-def main():
-    parser = argparse.ArgumentParser(
-        description="Convert a Markdown file to a professionally formatted PDF.",
-    )
-    parser.add_argument(
+    ``("section", title)``         ``## `` header (starts a new page)
+    ``("subsection", title)``      ``### `` header
+    ``("code", (lang, [lines]))``  fenced code block and its fence language
+    ``("table", [[cells], ...])``  table rows, header row first
+    ``("bold", text)``             paragraph wrapped entirely in ``**``
+    ``("bullet", text)``           ``- `` list item (inline Markdown intact)
+    ``("quote", text)``            ``> `` blockquote (inline Markdown intact)
+    ``("paragraph", text)``        anything else (inline Markdown intact)
+
+    plus the block types added with :func:`register_block`.  Content before
+    the first ``## `` header and any "Table of Contents" section are
+    skipped.  Only the current code block or table is buffered, so the
+    input can be consumed straight from :func:`iter_md_lines`.
+    """
+    rules = _LINE_RULES
+    first_line = True
+    in_section = False  # False before the first ## and inside a ToC section
+    await_title = False
+    in_code = False
+    code_lang = ""
+    code_lines = []
+    table_rows = None  # rows of the table being collected, if any
+
+    for line in lines:
+        if line.startswith("## ") and not first_line:
+            if await_title:
+                yield ("section", "")  # previous header had no title at all
+            if table_rows:
+                yield ("table", table_rows)
+            # A new section; any unterminated code block is dropped.
+            in_section = False
+            in_code = False
+            code_lines = []
+            table_rows = None
+            line = line[3:]
+            await_title = True
+        first_line = False
+
+        stripped = line.strip()
+
+        if await_title:
+            if not stripped:
+                continue  # a blank "## " line takes its title from the next one
+            await_title = False
+            title = stripped.lstrip("#").strip()
+            in_section = not title.lower().startswith("table of contents")
+            if in_section:
+                yield ("section", title)
+            continue
+
+        if not in_section:
+            continue
+
+        if in_code:
+            if stripped.startswith("```"):
+                yield ("code", (code_lang, code_lines))
+                code_lines = []
+                in_code = False
+            else:
+                code_lines.append(line.rstrip())
+            continue
+
+        lead = stripped[:1]
+
+        # --- tables ---
+        if table_rows is not None:
+            if lead == "|":
+                if stripped.startswith("|---") or (
+                    stripped.replace("|", "").replace("-", "").replace(" ", "")
+                    == ""
+                ):
+                    continue
+                table_rows.append(
+                    [c.strip() for c in stripped.split("|") if c.strip()]
+                )
+                continue
+            yield ("table", table_rows)
+            table_rows = None
+        elif lead == "|" and not stripped.startswith("|---"):
+            table_rows = [[c.strip() for c in stripped.split("|") if c.strip()]]
+            continue
+
+        if not lead:
+            continue
+
+        # --- code fences ---
+        if lead == "`" and stripped.startswith("```"):
+            in_code = True
+            info = stripped[3:].split()
+            code_lang = info[0].lower() if info else ""
+            continue
+
+        # --- single-line blocks, by leading character ---
+        for kind, match in rules.get(lead, ()):
+            data = match(stripped, line)
+            if data is not None:
+                if kind is not None:
+                    yield (kind, data)
+                break
+        else:
+            yield ("paragraph", stripped)
+
+    if await_title:
+        yield ("section", "")
+    if table_rows:
+        yield ("table", table_rows)
+
+
+# ---------------------------------------------------------------------------
+# Document model (parse once, walk many times)
+# ---------------------------------------------------------------------------
+
+class Block:
+    """One non-header block inside a section (see :func:`parse_md_blocks`)."""
+
+    __slots__ = ("kind", "data")
+
+    def __init__(self, kind, data):
+        self.kind = kind
+        self.data = data
+
+    def __repr__(self):
+        return f"Block({self.kind!r}, {self.data!r})"
+
+
+class Section:
+    """A ``## `` section: its title and the blocks under it."""
+
+    __slots__ = ("title", "blocks")
+
+    def __init__(self, title, blocks=None):
+        self.title = title
+        self.blocks = blocks if blocks is not None else []
+
+    def __repr__(self):
+        return f"Section({self.title!r}, {len(self.blocks)} blocks)"
+
+
+class Document:
+    """Parsed Markdown document; picklable so it can be cached between runs."""
+
+    __slots__ = ("sections",)
+
+    def __init__(self, sections=None):
+        self.sections = sections if sections is not None else []
+
+    def toc(self):
+        """Return the section titles in document order."""
+        return [sec.title for sec in self.sections]
+
+    def __repr__(self):
+        return f"Document({len(self.sections)} sections)"
+
+
+def parse_md_document(lines):
+    """Parse an iterable of Markdown lines into a :class:`Document`."""
+    sections = []
+    blocks = None
+    for kind, data in parse_md_blocks(lines):
+        if kind == "section":
+            section = Section(data)
+            sections.append(section)
+            blocks = section.blocks
+        else:
+            blocks.append(Block(kind, data))
+    return Document(sections)
+
+
+def load_md_document(input_path, cache_dir=None, digest=None):
+    """Parse *input_path*, reusing a pickled :class:`Document` when possible.
+
+    With *cache_dir* set, the parsed model is stored next to the PDF build
+    cache keyed on the input bytes and converter version, so a change to
+    only the render arguments (title, author, ...) skips parsing.  *digest*
+    is the input's :func:`_file_digest` if the caller already computed it.
+    """
+    if not cache_dir:
+        return parse_md_document(iter_md_lines(input_path))
+
+    if digest is None:
+        digest = _file_digest(input_path)
+    tag = " ".join(["doc", __version__, *_REGISTERED_KINDS, digest])
+    key = hashlib.sha256(tag.encode()).hexdigest()
+    entry = os.path.join(cache_dir, key + ".pickle")
+    try:
+        with open(entry, "rb") as fh:
+            document = pickle.load(fh)
+        os.utime(entry)  # refresh for LRU eviction
+        return document
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        pass
+
+    document = parse_md_document(iter_md_lines(input_path))
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = f"{entry}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as fh:
+        pickle.dump(document, fh, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, entry)
+    return document
+
+
+def _code_event(pdf, data):
+    language, lines = data
+    _code_block(pdf, lines, language)
+
+
+def _bold_paragraph(pdf, text):
+    pdf.set_font("Helvetica", "B", 10)
+    pdf.set_text_color(50, 50, 50)
+    pdf.multi_cell(0, 6, text)
+    pdf.ln(2)
+
+
+def _bullet(pdf, text):
+    pdf.set_font("Helvetica", "", 10)
+    pdf.set_text_color(50, 50, 50)
+    pdf.cell(5)
+    pdf.cell(5, 6, "-")
+    _inline_text(pdf, text, 175, 6)
+    pdf.ln(1)
+
+
+def _quote(pdf, text):
+    # render as italic indented text
+    pdf.set_font("Helvetica", "I", 10)
+    pdf.set_text_color(100, 100, 100)
+    pdf.cell(10)
+    _inline_text(pdf, text, 175, 6, base_style="I")
+    pdf.ln(2)
+
+
+# block kind -> render(pdf, data); see register_block
+_BLOCK_RENDERERS = {
+    "section": _section_title,
+    "subsection": _subsection_title,
+    "code": _code_event,
+    "table": _table,
+    "bold": _bold_paragraph,
+    "bullet": _bullet,
+    "quote": _quote,
+    "paragraph": _body_text,
+}
+
+
+def register_block(
+    kind, render, leads="", match=None, to_html=None, to_text=None
+):
+    """Add a block type to the parser and renderer, or restyle one.
+
+    *render(pdf, data)* draws every ``(kind, data)`` block.  With *match*,
+    stripped lines whose first character is one of *leads* are offered to
+    ``match(stripped, line)`` (*line* keeps its indentation) before the
+    built-in rules for that character; a result other than ``None``
+    becomes a ``(kind, result)`` block.  Only lines starting with one of
+    *leads* pay for the check, e.g.::
+
+        register_block(
+            "numbered", render_numbered, leads="0123456789",
+            match=lambda s, _line: s if ORDERED_RE.match(s) else None,
+        )
+
+    *to_html(data)* and *to_text(data)* return the block for
+    :func:`render_html` and :func:`render_text`; without them the block's
+    data is written out as a plain paragraph.
+
+    Register at import time so worker processes (batch, volumes,
+    :class:`AsyncConverter`) know the type as well.
+    """
+    if bool(leads) != (match is not None):
+        raise ValueError("register_block needs leads and match together")
+    _BLOCK_RENDERERS[kind] = render
+    if to_html is not None:
+        _HTML_RENDERERS[kind] = to_html
+    if to_text is not None:
+        _TEXT_RENDERERS[kind] = to_text
+    if match is None:
+        return
+    for lead in leads:
+        _LINE_RULES.setdefault(lead, []).insert(0, (kind, match))
+    if kind not in _REGISTERED_KINDS:
+        _REGISTERED_KINDS.append(kind)
+
+
+def _render_block(pdf, kind, data):
+    """Draw a single block event produced by :func:`parse_md_blocks`."""
+    render = _BLOCK_RENDERERS.get(kind)
+    if render is not None:
+        render(pdf, data)
+
+
+def _drain(items):
+    """Yield the items of list *items* in order, removing each from it."""
+    items.reverse()
+    while items:
+        yield items.pop()
+
+
+def _parse_and_render(
+    pdf,
+    document,
+    profiler=None,
+    layout=None,
+    layout_cache=None,
+    release_document=False,
+):
+    """Render a parsed :class:`Document` in a single pass.
+
+    The ToC pages are reserved up front and filled in with real page
+    numbers when the PDF is output; every section and subsection also gets
+    a PDF outline (bookmark) entry.  A :class:`DocumentProfile` passed as
+    *layout* may ask for a static ToC or none at all instead.  With a
+    :class:`Profiler`, the time spent on each block type is recorded as well.
+    With a :class:`LayoutCache`, unchanged sections are replayed from it.
+    With *release_document*, sections are removed from *document* as they
+    are rendered so their blocks can be freed (see :func:`_render_stream`).
+    """
+    toc = layout.toc if layout is not None else "generated"
+    if toc == "generated":
+        numbered = layout.toc_numbered if layout is not None else True
+        on_fresh_page = _add_toc(pdf, len(document.sections), numbered)
+    else:
+        if toc == "static":
+            _add_static_toc(pdf, layout.toc_entries)
+        on_fresh_page = False
+    if layout_cache is not None:
+        layout_cache.render_sections(pdf, document.sections, on_fresh_page)
+        if profiler is not None:
+            profiler.count("sections_reused", layout_cache.hits)
+            profiler.count("sections_rendered", layout_cache.misses)
+        return
+    sections = document.sections
+    if release_document:
+        sections = _drain(sections)
+    if profiler is None:
+        for section in sections:
+            _section_title(pdf, section.title, new_page=not on_fresh_page)
+            on_fresh_page = False
+            for block in section.blocks:
+                _render_block(pdf, block.kind, block.data)
+        return
+
+    clock = time.perf_counter
+    for section in sections:
+        start = clock()
+        _section_title(pdf, section.title, new_page=not on_fresh_page)
+        on_fresh_page = False
+        profiler.add_block("section", clock() - start)
+        for block in section.blocks:
+            start = clock()
+            _render_block(pdf, block.kind, block.data)
+            profiler.add_block(block.kind, clock() - start)
+
+
+# ---------------------------------------------------------------------------
+# Instrumentation
+# ---------------------------------------------------------------------------
+
+class Profiler:
+    """Opt-in wall-time and call-count recorder for conversions.
+
+    Records time per phase (``hash``, ``parse``, ``layout``, ``serialize``,
+    ``write`` ... plus the nested ``sanitize`` and ``inline_md`` helpers),
+    time and count per rendered block type, and pages / bytes emitted.  One
+    instance can span many conversions; *callback*, if given, receives
+    :meth:`to_dict` after each one so a build system can aggregate them.
+
+    Hot-path helpers are timed by swapping module globals for the duration
+    of a conversion, so a profiled conversion must not run concurrently with
+    other conversions in the same process.
+    """
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.phases = {}  # name -> [seconds, calls]
+        self.blocks = {}  # kind -> [seconds, count]
+        self.counters = {
+            "conversions": 0,
+            "cache_hits": 0,
+            "pages": 0,
+            "output_bytes": 0,
+        }
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Time the enclosed code as one call of phase *name*."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - start)
+
+    def add_phase(self, name, seconds, calls=1):
+        entry = self.phases.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += calls
+
+    def add_block(self, kind, seconds, count=1):
+        entry = self.blocks.setdefault(kind, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += count
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def finish(self):
+        """Close one conversion and hand the running totals to the callback."""
+        self.count("conversions")
+        if self.callback is not None:
+            self.callback(self.to_dict())
+
+    def to_dict(self):
+        return {
+            "phases": {
+                name: {"seconds": sec, "calls": calls}
+                for name, (sec, calls) in self.phases.items()
+            },
+            "blocks": {
+                kind: {"seconds": sec, "count": count}
+                for kind, (sec, count) in self.blocks.items()
+            },
+            "counters": dict(self.counters),
+        }
+
+    def merge(self, stats):
+        """Add the totals from another profiler's :meth:`to_dict` output."""
+        for name, entry in stats.get("phases", {}).items():
+            self.add_phase(name, entry["seconds"], entry["calls"])
+        for kind, entry in stats.get("blocks", {}).items():
+            self.add_block(kind, entry["seconds"], entry["count"])
+        for name, n in stats.get("counters", {}).items():
+            self.count(name, n)
+
+    def to_json(self, indent=2):
+        return json.dumps(self.to_dict(), indent=indent, sort_keys=True)
+
+    def to_prometheus(self, prefix="md_to_pdf"):
+        """Return the totals in the Prometheus text exposition format."""
+        out = []
+
+        def metric(name, help_text, samples):
+            out.append(f"# HELP {prefix}_{name} {help_text}")
+            out.append(f"# TYPE {prefix}_{name} counter")
+            for labels, value in samples:
+                out.append(f"{prefix}_{name}{labels} {value}")
+
+        phases = sorted(self.phases.items())
+        blocks = sorted(self.blocks.items())
+        metric(
+            "phase_seconds_total",
+            "Wall time spent per conversion phase.",
+            [(f'{{phase="{n}"}}', f"{sec:.9f}") for n, (sec, _c) in phases],
+        )
+        metric(
+            "phase_calls_total",
+            "Number of times each conversion phase ran.",
+            [(f'{{phase="{n}"}}', calls) for n, (_s, calls) in phases],
+        )
+        metric(
+            "block_seconds_total",
+            "Wall time spent rendering each block type.",
+            [(f'{{block="{k}"}}', f"{sec:.9f}") for k, (sec, _c) in blocks],
+        )
+        metric(
+            "blocks_total",
+            "Number of blocks rendered per block type.",
+            [(f'{{block="{k}"}}', count) for k, (_s, count) in blocks],
+        )
+        for name, value in sorted(self.counters.items()):
+            help_text = f"Total {name.replace('_', ' ')}."
+            metric(f"{name}_total", help_text, [("", value)])
+        return "\n".join(out) + "\n"
+
+
+@contextlib.contextmanager
+def _no_phase(_name):
+    """Stand-in for :meth:`Profiler.phase` when profiling is off."""
+    yield
+
+
+_PROFILED_HELPERS = {"sanitize_text": "sanitize", "parse_inline": "inline_md"}
+
+
+@contextlib.contextmanager
+def _profiling(profiler):
+    """Time the hot-path text helpers while a profiled conversion runs."""
+    if profiler is None:
+        yield
+        return
+
+    module = globals()
+    originals = {name: module[name] for name in _PROFILED_HELPERS}
+
+    def timed(fn, phase):
+        clock = time.perf_counter
+
+        def wrapper(text):
+            start = clock()
+            try:
+                return fn(text)
+            finally:
+                profiler.add_phase(phase, clock() - start)
+
+        return wrapper
+
+    for name, phase in _PROFILED_HELPERS.items():
+        module[name] = timed(originals[name], phase)
+    try:
+        yield
+    finally:
+        module.update(originals)
+
+
+# ---------------------------------------------------------------------------
+# Build cache
+# ---------------------------------------------------------------------------
+
+def _file_digest(path):
+    """Return the SHA-256 hex digest of the file at *path*, read in chunks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _cache_key(digest, render_args):
+    """Hash the input digest, render arguments and converter version.
+
+    The block types and renderers added by :func:`register_block` change
+    the output as well, so they are part of the key.
+    """
+    h = hashlib.sha256()
+    h.update(f"md_to_pdf {__version__} fpdf {_fpdf_version()}\n".encode())
+    renderers = {
+        kind: f"{render.__module__}.{_qualname(render)}"
+        for kind, render in _BLOCK_RENDERERS.items()
+    }
+    blocks = [sorted(_REGISTERED_KINDS), renderers]
+    h.update(json.dumps(blocks, sort_keys=True).encode("utf-8"))
+    h.update(json.dumps(render_args, sort_keys=True).encode("utf-8"))
+    h.update(f"\n{digest}".encode())
+    return h.hexdigest()
+
+
+def _qualname(obj):
+    """``__qualname__`` of a function, or of the type of other callables."""
+    return getattr(obj, "__qualname__", type(obj).__qualname__)
+
+
+def _render_args(
+    title, subtitle, author, version, year, line_numbers, layout, fonts
+):
+    """The layout-affecting render arguments, as hashed by :func:`_cache_key`."""
+    render_args = {
+        "title": title,
+        "subtitle": subtitle,
+        "author": author,
+        "version": version,
+        "year": str(year),
+        "line_numbers": bool(line_numbers),
+    }
+    if layout is not None:
+        render_args["layout"] = layout.layout_args()
+    if fonts is not None:
+        render_args["fonts"] = fonts.cache_args()
+    return render_args
+
+
+def _cache_fetch(cache_dir, key, output_path):
+    """Place a cached PDF at *output_path*; return ``False`` on a miss.
+
+    If *output_path* already holds identical bytes it is left untouched so
+    its mtime (and anything depending on it) stays stable.
+    """
+    entry = os.path.join(cache_dir, key + ".pdf")
+    if not os.path.isfile(entry):
+        return False
+    if not (
+        os.path.isfile(output_path)
+        and filecmp.cmp(entry, output_path, shallow=False)
+    ):
+        shutil.copyfile(entry, output_path)
+    os.utime(entry)  # refresh for LRU eviction
+    return True
+
+
+def _cache_store(cache_dir, key, pdf_bytes):
+    """Atomically write *pdf_bytes* into the cache under *key*."""
+    os.makedirs(cache_dir, exist_ok=True)
+    entry = os.path.join(cache_dir, key + ".pdf")
+    tmp = f"{entry}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(pdf_bytes)
+    os.replace(tmp, entry)
+
+
+def _cache_store_file(cache_dir, key, path):
+    """Atomically copy the PDF at *path* into the cache under *key*."""
+    os.makedirs(cache_dir, exist_ok=True)
+    entry = os.path.join(cache_dir, key + ".pdf")
+    tmp = f"{entry}.{os.getpid()}.tmp"
+    shutil.copyfile(path, tmp)
+    os.replace(tmp, entry)
+
+
+def evict_cache(
+    cache_dir=DEFAULT_CACHE_DIR,
+    max_bytes=CACHE_MAX_BYTES,
+    max_age_days=CACHE_MAX_AGE_DAYS,
+):
+    """Trim the build cache by age, then by size (least recently used first).
+
+    Returns the number of entries removed.
+    """
+    try:
+        names = [
+            n for n in os.listdir(cache_dir) if n.endswith((".pdf", ".pickle", ".json"))
+        ]
+    except FileNotFoundError:
+        return 0
+
+    entries = []
+    for name in names:
+        path = os.path.join(cache_dir, name)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+    entries.sort()  # oldest first
+
+    cutoff = time.time() - max_age_days * 86400
+    total = sum(size for _mtime, size, _path in entries)
+    removed = 0
+    for mtime, size, path in entries:
+        if mtime >= cutoff and total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    return removed
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def render_document(
+    document,
+    title="Document",
+    subtitle="",
+    author="Author",
+    version="1.0",
+    year=None,
+    line_numbers=False,
+    layout=None,
+    fonts=None,
+    optimize=None,
+):
+    """Render a parsed :class:`Document` (cover, ToC, body) to PDF bytes.
+
+    With *line_numbers*, code blocks get a line-number gutter; *layout* is
+    an optional :class:`DocumentProfile`, *fonts* an optional
+    :class:`UnicodeFonts` and *optimize* a key of :data:`OPTIMIZE_PRESETS`.
+    """
+    return bytes(
+        _render_buffer(
+            document,
+            title,
+            subtitle,
+            author,
+            version,
+            year,
+            line_numbers=line_numbers,
+            layout=layout,
+            fonts=fonts,
+            optimize=optimize,
+        )
+    )
+
+
+def _lay_out(
+    document,
+    title,
+    subtitle,
+    author,
+    version,
+    year,
+    profiler=None,
+    line_numbers=False,
+    layout=None,
+    layout_cache=None,
+    fonts=None,
+    optimize=None,
+    dry_run=False,
+    low_memory=False,
+    release_document=False,
+):
+    """Lay out cover, ToC and body of *document*; returns the ``MarkdownPDF``.
+
+    With *dry_run*, text is measured instead of drawn (see
+    :class:`MarkdownPDF`): line wrapping and page breaks come out as in a
+    full layout, but the result can only be inspected (see
+    :func:`_page_map`), not output.  With *low_memory*, finished pages
+    are spooled to disk (see :func:`_render_stream`), and with
+    *release_document* the sections of *document* are consumed as they
+    are laid out.
+    """
+    if year is None:
+        year = str(datetime.now().year)
+    title_lines = None
+    if layout is not None:
+        document = layout.apply(document)
+        title_lines = layout.title_lines
+
+    _load_fpdf()
+    pdf = MarkdownPDF(
+        header_title=title,
+        line_numbers=line_numbers,
+        fonts=fonts,
+        optimize=optimize,
+        dry_run=dry_run,
+        low_memory=low_memory,
+    )
+    pdf.set_creation_date(_creation_date(year))
+    pdf.alias_nb_pages()
+    pdf.set_auto_page_break(auto=True, margin=20)
+    if layout_cache is not None:
+        layout_cache.prepare(pdf)
+
+    _add_cover_page(
+        pdf,
+        title,
+        subtitle,
+        author,
+        version=version,
+        year=year,
+        title_lines=title_lines,
+    )
+    _parse_and_render(
+        pdf, document, profiler, layout, layout_cache, release_document
+    )
+    return pdf
+
+
+def _render_buffer(
+    document,
+    title,
+    subtitle,
+    author,
+    version,
+    year,
+    profiler=None,
+    line_numbers=False,
+    layout=None,
+    layout_cache=None,
+    fonts=None,
+    optimize=None,
+):
+    """Render *document* and return fpdf's output ``bytearray`` (no copy)."""
+    args = (document, title, subtitle, author, version, year, profiler)
+    kwargs = dict(
+        line_numbers=line_numbers,
+        layout=layout,
+        layout_cache=layout_cache,
+        fonts=fonts,
+        optimize=optimize,
+    )
+    if profiler is None:
+        return _lay_out(*args, **kwargs).output()
+
+    with profiler.phase("layout"):
+        pdf = _lay_out(*args, **kwargs)
+    with profiler.phase("serialize"):
+        buf = pdf.output()
+    profiler.count("pages", pdf.pages_count)
+    return buf
+
+
+def _render_stream(
+    output,
+    document,
+    title,
+    subtitle,
+    author,
+    version,
+    year,
+    profiler=None,
+    line_numbers=False,
+    layout=None,
+    fonts=None,
+    optimize=None,
+    release_document=False,
+):
+    """Render *document* into *output* with flat peak memory.
+
+    *output* is a file path or writable binary stream.  Finished pages are
+    spooled to a temporary file during layout and the PDF is written to
+    *output* object by object; what stays in memory per page is fpdf's page
+    object, outline entry and link annotations.  Pass *release_document* when nothing else needs *document*: its
+    sections are then freed as they are laid out, instead of staying in
+    memory until the PDF is written.  The bytes are identical to
+    :func:`_render_buffer`'s.  Returns the size of the PDF.
+    """
+    args = (document, title, subtitle, author, version, year, profiler)
+    kwargs = dict(
+        line_numbers=line_numbers,
+        layout=layout,
+        fonts=fonts,
+        optimize=optimize,
+        low_memory=True,
+        release_document=release_document,
+    )
+    phase = profiler.phase if profiler else _no_phase
+    with phase("layout"):
+        pdf = _lay_out(*args, **kwargs)
+    with phase("serialize"):
+        pdf.output(output)
+    if profiler is not None:
+        profiler.count("pages", pdf.pages_count)
+    return len(pdf.buffer)
+
+
+def _page_map(pdf):
+    """Page numbers of the sections and subsections laid out in *pdf*.
+
+    Returns ``{"pages", "front_pages", "sections"}``; every ``## `` section
+    lists its ``first_page``, ``last_page``, page count and its ``### ``
+    subsections with the page each starts on.
+    """
+    starts = []
+    for entry in pdf._outline:
+        if entry.level == 0:
+            starts.append((entry.name, entry.page_number, []))
+        elif starts:
+            starts[-1][2].append(
+                {"title": entry.name, "page": entry.page_number}
+            )
+
+    total = pdf.pages_count
+    sections = []
+    for idx, (name, first, subsections) in enumerate(starts):
+        last = starts[idx + 1][1] - 1 if idx + 1 < len(starts) else total
+        last = max(first, last)
+        sections.append(
+            {
+                "title": name,
+                "first_page": first,
+                "last_page": last,
+                "pages": last - first + 1,
+                "subsections": subsections,
+            }
+        )
+    return {
+        "pages": total,
+        "front_pages": starts[0][1] - 1 if starts else total,
+        "sections": sections,
+    }
+
+
+def _iter_source_lines(source):
+    """Normalise an in-memory Markdown *source* into an iterator of lines.
+
+    Accepts a ``str``, UTF-8 ``bytes``/``bytearray``/``memoryview``, a text
+    or binary file-like object, or any iterable of lines (trailing newlines
+    are stripped).
+    """
+    if isinstance(source, str):
+        return iter_text_lines(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    if hasattr(source, "read"):
+        if not isinstance(source.read(0), str):
+            source = io.TextIOWrapper(source, encoding="utf-8", newline=None)
+        return (line.rstrip("\n") for line in source)
+    return (line.rstrip("\r\n") for line in source)
+
+
+def render_md(
+    source,
+    output=None,
+    title="Document",
+    subtitle="",
+    author="Author",
+    version="1.0",
+    year=None,
+    as_memoryview=False,
+    profiler=None,
+    line_numbers=False,
+    layout=None,
+    fonts=None,
+    optimize=None,
+    low_memory=False,
+):
+    """Convert in-memory Markdown to PDF without touching the filesystem.
+
+    *source* may be a string, UTF-8 bytes, a file-like object or an
+    iterable of lines.  If *output* is a writable stream (anything with a
+    ``write`` method: file, ``BytesIO``, ``socket.makefile("wb")``, an
+    upload body ...) the PDF is written to it and the number of bytes is
+    returned.  Otherwise the PDF is returned as ``bytes``, or as a zero-copy
+    ``memoryview`` of the render buffer when *as_memoryview* is true.
+    A :class:`Profiler` passed as *profiler* records the conversion,
+    *line_numbers* adds a line-number gutter to code blocks, *layout* is
+    an optional :class:`DocumentProfile`, *fonts* an optional
+    :class:`UnicodeFonts` and *optimize* a key of :data:`OPTIMIZE_PRESETS`.
+    *low_memory* (which needs *output*) writes the PDF to *output* as it is
+    serialized, with finished pages spooled to a temporary file meanwhile.
+    """
+    if low_memory and output is None:
+        raise ValueError("low_memory rendering needs an output stream")
+    phase = profiler.phase if profiler else _no_phase
+    with _profiling(profiler):
+        with phase("parse"):
+            document = parse_md_document(_iter_source_lines(source))
+        args = (document, title, subtitle, author, version, year, profiler)
+        kwargs = dict(
+            line_numbers=line_numbers,
+            layout=layout,
+            fonts=fonts,
+            optimize=optimize,
+        )
+        if low_memory:
+            size = _render_stream(
+                output, *args, release_document=True, **kwargs
+            )
+        else:
+            buf = _render_buffer(*args, **kwargs)
+            size = len(buf)
+            if output is not None:
+                with phase("write"):
+                    output.write(memoryview(buf))
+    if profiler is not None:
+        profiler.count("output_bytes", size)
+        profiler.finish()
+    if output is not None:
+        return size
+    if as_memoryview:
+        return memoryview(buf)
+    return bytes(buf)
+
+
+def convert_md_to_pdf(
+    input_path,
+    output_path,
+    title="Document",
+    subtitle="",
+    author="Author",
+    version="1.0",
+    year=None,
+    cache_dir=None,
+    force=False,
+    profiler=None,
+    line_numbers=False,
+    layout=None,
+    fonts=None,
+    optimize=None,
+    low_memory=False,
+    document=None,
+    digest=None,
+):
+    """Read *input_path* (Markdown) and write a styled PDF to *output_path*.
+
+    When *cache_dir* is given, the PDF is looked up in (and stored to) a
+    build cache keyed on the input bytes, the render arguments and the
+    converter version; a hit skips parsing and rendering entirely.  Pass
+    ``force=True`` to re-render and refresh the cache entry regardless.
+    A :class:`Profiler` passed as *profiler* records per-phase and
+    per-block timings for the conversion.  *line_numbers* adds a
+    line-number gutter to code blocks, *layout* is an optional
+    :class:`DocumentProfile` (see :func:`convert_profile`), *fonts* an
+    optional :class:`UnicodeFonts` to embed instead of the core fonts and
+    *optimize* a key of :data:`OPTIMIZE_PRESETS` (``"speed"`` or ``"size"``).
+    With *low_memory*, pages are spooled to disk and the PDF is written
+    incrementally, so peak memory stays flat however long the document is.
+    *document* is an already parsed :class:`Document` of *input_path* to
+    render instead of parsing it again (see :func:`convert_md`), and
+    *digest* its :func:`_file_digest` if the caller already computed it.
+    Identical inputs and arguments always produce byte-identical PDFs.
+    """
+    if year is None:
+        year = str(datetime.now().year)
+
+    phase = profiler.phase if profiler else _no_phase
+    with _profiling(profiler):
+        key = None
+        if cache_dir:
+            if digest is None:
+                with phase("hash"):
+                    digest = _file_digest(input_path)
+            render_args = _render_args(
+                title, subtitle, author, version, year, line_numbers, layout,
+                fonts,
+            )
+            if optimize is not None:
+                render_args["optimize"] = optimize
+            key = _cache_key(digest, render_args)
+            if not force:
+                with phase("cache_fetch"):
+                    hit = _cache_fetch(cache_dir, key, output_path)
+                if hit:
+                    if profiler is not None:
+                        profiler.count("cache_hits")
+                        profiler.finish()
+                    print(f"PDF up to date (cached): {output_path}")
+                    return
+
+        release_document = document is None  # ours to consume
+        if document is None:
+            with phase("parse"):
+                document = load_md_document(
+                    input_path, cache_dir, digest=digest
+                )
+        args = (document, title, subtitle, author, version, year, profiler)
+        if low_memory:
+            # written while serializing: never leave a truncated PDF behind
+            tmp = f"{output_path}.{os.getpid()}.tmp"
+            try:
+                size = _render_stream(
+                    tmp,
+                    *args,
+                    line_numbers=line_numbers,
+                    layout=layout,
+                    fonts=fonts,
+                    optimize=optimize,
+                    release_document=release_document,
+                )
+                os.replace(tmp, output_path)
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+        else:
+            pdf_bytes = _render_buffer(
+                *args,
+                line_numbers=line_numbers,
+                layout=layout,
+                fonts=fonts,
+                optimize=optimize,
+            )
+            size = len(pdf_bytes)
+            with phase("write"):
+                with open(output_path, "wb") as fh:
+                    fh.write(pdf_bytes)
+        if key is not None:
+            with phase("cache_store"):
+                if low_memory:
+                    _cache_store_file(cache_dir, key, output_path)
+                else:
+                    _cache_store(cache_dir, key, pdf_bytes)
+                evict_cache(cache_dir)
+    if profiler is not None:
+        profiler.count("output_bytes", size)
+        profiler.finish()
+    print(f"PDF generated successfully: {output_path}")
+
+
+def layout_md(
+    input_path,
+    title="Document",
+    subtitle="",
+    author="Author",
+    version="1.0",
+    year=None,
+    cache_dir=None,
+    force=False,
+    profiler=None,
+    line_numbers=False,
+    layout=None,
+    fonts=None,
+):
+    """Lay out *input_path* without producing a PDF; returns its page map.
+
+    The same layout code as :func:`convert_md_to_pdf` decides line wrapping
+    and page breaks, but text is only measured, and nothing is drawn or
+    serialized.  The result (see
+    :func:`_page_map`) gives the total page count and the pages of every
+    section and subsection, e.g. to check where a change moves page breaks.
+    With *cache_dir*, page maps are cached next to the PDFs (keyed like
+    them, minus *optimize*, which does not affect the layout).
+    """
+    if year is None:
+        year = str(datetime.now().year)
+
+    phase = profiler.phase if profiler else _no_phase
+    with _profiling(profiler):
+        key = digest = None
+        if cache_dir:
+            with phase("hash"):
+                digest = _file_digest(input_path)
+            render_args = _render_args(
+                title, subtitle, author, version, year, line_numbers, layout,
+                fonts,
+            )
+            render_args["page_map"] = True
+            key = _cache_key(digest, render_args)
+            entry = os.path.join(cache_dir, key + ".json")
+            if not force and os.path.isfile(entry):
+                with phase("cache_fetch"):
+                    with open(entry, "r", encoding="utf-8") as fh:
+                        page_map = json.load(fh)
+                    os.utime(entry)  # refresh for LRU eviction
+                if profiler is not None:
+                    profiler.count("cache_hits")
+                    profiler.finish()
+                return page_map
+
+        with phase("parse"):
+            document = load_md_document(input_path, cache_dir, digest=digest)
+        with phase("layout"):
+            pdf = _lay_out(
+                document,
+                title,
+                subtitle,
+                author,
+                version,
+                year,
+                profiler,
+                line_numbers,
+                layout,
+                fonts=fonts,
+                dry_run=True,
+            )
+            page_map = _page_map(pdf)
+        if key is not None:
+            with phase("cache_store"):
+                os.makedirs(cache_dir, exist_ok=True)
+                tmp = f"{entry}.{os.getpid()}.tmp"
+                with open(tmp, "w", encoding="utf-8") as fh:
+                    json.dump(page_map, fh)
+                os.replace(tmp, entry)
+                evict_cache(cache_dir)
+    if profiler is not None:
+        profiler.count("pages", page_map["pages"])
+        profiler.finish()
+    return page_map
+
+
+# ---------------------------------------------------------------------------
+# HTML and plain-text output (same parse as the PDF)
+# ---------------------------------------------------------------------------
+
+# format -> file extension; see convert_md and format_output_paths
+OUTPUT_FORMATS = {"pdf": ".pdf", "html": ".html", "txt": ".txt"}
+
+TEXT_WIDTH = 79
+
+
+def _css_color(rgb):
+    return "#{:02x}{:02x}{:02x}".format(*rgb)
+
+
+# Mirrors the PDF styling (colours, code and table look).
+HTML_STYLE = "\n".join(
+    [
+        "body { font-family: Helvetica, Arial, sans-serif; font-size: 11pt;"
+        " color: #323232; max-width: 52em; margin: 2em auto;"
+        " padding: 0 1em; }",
+        f"a {{ color: {_css_color(LINK_COLOR)}; }}",
+        ".cover { text-align: center; margin: 4em 0; }",
+        ".cover h1 { color: #2980b9; font-size: 32pt; margin-bottom: 0.4em;"
+        " padding-bottom: 0.4em; border-bottom: 3px solid #2980b9; }",
+        ".cover .subtitle { color: #646464; font-size: 14pt; }",
+        ".cover .meta { color: #646464; }",
+        "h2 { color: #2980b9; font-size: 20pt; margin-top: 2em;"
+        " border-bottom: 2px solid #2980b9; }",
+        "h3 { color: #34495e; font-size: 14pt; }",
+        "pre { background: #f0f0f0; padding: 0.6em 1em; overflow-x: auto;"
+        f" color: {_css_color(CODE_TEXT_COLOR)}; }}",
+        "code { font-family: Courier, monospace; font-size: 9pt; }",
+        "table { border-collapse: collapse; font-size: 9pt; width: 100%; }",
+        "th, td { border: 1px solid #c8c8c8; padding: 0.3em 0.5em;"
+        " text-align: left; vertical-align: top; }",
+        "th { background: #2980b9; color: #fff; }",
+        "tbody tr { background: #f5f5f5; }",
+        "blockquote { color: #646464; font-style: italic; }",
+    ]
+    + [
+        f".tok-{token} {{ color: {_css_color(rgb)}; }}"
+        for token, rgb in CODE_TOKEN_COLORS.items()
+    ]
+)
+
+
+_HTML_LINK_SCHEMES = ("http", "https", "mailto")
+_URL_SCHEME_RE = re.compile(r"([A-Za-z][A-Za-z0-9+.-]*):")
+_URL_IGNORED_RE = re.compile(r"[\x00-\x20\x7f]")  # browsers skip these
+
+
+def _html_href(url):
+    """Whether *url* may become a link: http(s), mailto or relative."""
+    scheme = _URL_SCHEME_RE.match(_URL_IGNORED_RE.sub("", url))
+    return scheme is None or scheme.group(1).lower() in _HTML_LINK_SCHEMES
+
+
+def _html_inline(text):
+    """Inline Markdown of *text* (see :func:`parse_inline`) as HTML.
+
+    Links other than http(s), mailto and relative ones (``javascript:``,
+    ``data:``, ...) are written as their plain text.
+    """
+    out = []
+    for run, style, link in parse_inline(text):
+        run = html.escape(run, quote=False)
+        if style == "C":
+            run = f"<code>{run}</code>"
+        if "I" in style:
+            run = f"<em>{run}</em>"
+        if "B" in style:
+            run = f"<strong>{run}</strong>"
+        if link and _html_href(link):
+            run = f'<a href="{html.escape(link)}">{run}</a>'
+        out.append(run)
+    return "".join(out)
+
+
+def _html_code(data):
+    language, lines = data
+    tokenizer = _CODE_TOKENIZERS.get(CODE_LANGUAGES.get(language))
+    out = []
+    for line in lines:
+        if tokenizer is None:
+            out.append(html.escape(line, quote=False))
+            continue
+        out.append(
+            "".join(
+                html.escape(run, quote=False)
+                if token is None
+                else f'<span class="tok-{token}">'
+                f"{html.escape(run, quote=False)}</span>"
+                for _col, run, token in _code_runs(line, tokenizer)
+            )
+        )
+    attr = f' class="language-{html.escape(language)}"' if language else ""
+    return f"<pre><code{attr}>" + "\n".join(out) + "</code></pre>"
+
+
+def _html_table(rows):
+    head, *body = rows
+    out = [
+        "<table>",
+        "<thead><tr>"
+        + "".join(f"<th>{_html_inline(c)}</th>" for c in head)
+        + "</tr></thead>",
+        "<tbody>",
+    ]
+    for row in body:
+        out.append(
+            "<tr>"
+            + "".join(f"<td>{_html_inline(c)}</td>" for c in row)
+            + "</tr>"
+        )
+    out += ["</tbody>", "</table>"]
+    return "\n".join(out)
+
+
+# block kind -> render(data) returning an HTML fragment; see register_block.
+# Consecutive <li> fragments are wrapped in one <ul>.
+_HTML_RENDERERS = {
+    "subsection": lambda title: f"<h3>{html.escape(title)}</h3>",
+    "code": _html_code,
+    "table": _html_table,
+    "bold": lambda text: f"<p><strong>{html.escape(text)}</strong></p>",
+    "bullet": lambda text: f"<li>{_html_inline(text)}</li>",
+    "quote": lambda text: f"<blockquote>{_html_inline(text)}</blockquote>",
+    "paragraph": lambda text: f"<p>{_html_inline(text)}</p>",
+}
+
+
+def _fill(text, indent="", subsequent=None):
+    return textwrap.fill(
+        text,
+        TEXT_WIDTH,
+        initial_indent=indent,
+        subsequent_indent=indent if subsequent is None else subsequent,
+        break_long_words=False,
+        break_on_hyphens=False,
+    )
+
+
+def _text_code(data):
+    _language, lines = data
+    return "\n".join(f"    {line}" if line else "" for line in lines)
+
+
+def _text_table(rows):
+    cells = [[_clean_inline_md(c) for c in row] for row in rows]
+    num_cols = max(len(row) for row in cells)
+    for row in cells:
+        row += [""] * (num_cols - len(row))
+    widths = [max(len(row[i]) for row in cells) for i in range(num_cols)]
+    lines = [
+        "  ".join(c.ljust(w) for c, w in zip(row, widths)).rstrip()
+        for row in cells
+    ]
+    lines.insert(1, "  ".join("-" * w for w in widths))
+    return "\n".join(lines)
+
+
+# block kind -> render(data) returning plain text; see register_block
+_TEXT_RENDERERS = {
+    "subsection": lambda title: f"{title}\n{'-' * len(title)}",
+    "code": _text_code,
+    "table": _text_table,
+    "bold": _fill,
+    "bullet": lambda text: _fill(_clean_inline_md(text), "  - ", "    "),
+    "quote": lambda text: _fill(_clean_inline_md(text), "  > "),
+    "paragraph": lambda text: _fill(_clean_inline_md(text)),
+}
+
+
+def _output_document(document, title, layout):
+    """Apply *layout* to *document*; returns ``(document, title lines)``."""
+    title_lines = None
+    if layout is not None:
+        document = layout.apply(document)
+        title_lines = layout.title_lines
+    return document, title_lines or [title]
+
+
+def render_html(
+    document,
+    title="Document",
+    subtitle="",
+    author="Author",
+    version="1.0",
+    year=None,
+    layout=None,
+):
+    """Render a parsed :class:`Document` as a standalone HTML page.
+
+    Uses the same parse, cover, ToC (as links to the sections) and
+    :class:`DocumentProfile` *layout* as :func:`render_document`, with
+    styling that mirrors the PDF.  Returns the page as a string.
+    """
+    if year is None:
+        year = str(datetime.now().year)
+    document, title_lines = _output_document(document, title, layout)
+    esc = html.escape
+    out = [
+        "<!DOCTYPE html>",
+        '<html lang="en">',
+        "<head>",
+        '<meta charset="utf-8">',
+        f"<title>{esc(title)}</title>",
+        f"<style>\n{HTML_STYLE}\n</style>",
+        "</head>",
+        "<body>",
+        '<header class="cover">',
+        f"<h1>{'<br>'.join(esc(line) for line in title_lines)}</h1>",
+        f'<p class="subtitle">{esc(subtitle)}</p>',
+        f'<p class="meta">Author: {esc(author)}<br>'
+        f"Version: {esc(version)} | {esc(str(year))}</p>",
+        "</header>",
+    ]
+
+    toc = layout.toc if layout is not None else "generated"
+    if toc != "none":
+        out += ['<nav class="toc">', "<h2>Table of Contents</h2>"]
+        if toc == "generated":
+            numbered = layout.toc_numbered if layout is not None else True
+            tag = "ol" if numbered else "ul"
+            out.append(f"<{tag}>")
+            for idx, section in enumerate(document.sections, start=1):
+                out.append(
+                    f'<li><a href="#section-{idx}">'
+                    f"{esc(section.title)}</a></li>"
+                )
+            out.append(f"</{tag}>")
+        else:
+            out.append("<ul>")
+            out += [f"<li>{esc(entry)}</li>" for entry in layout.toc_entries]
+            out.append("</ul>")
+        out.append("</nav>")
+
+    renderers = _HTML_RENDERERS
+    for idx, section in enumerate(document.sections, start=1):
+        out.append(f'<section id="section-{idx}">')
+        out.append(f"<h2>{esc(section.title)}</h2>")
+        in_list = False
+        for block in section.blocks:
+            if (block.kind == "bullet") != in_list:
+                in_list = not in_list
+                out.append("<ul>" if in_list else "</ul>")
+            render = renderers.get(block.kind)
+            if render is None:
+                out.append(f"<p>{esc(str(block.data))}</p>")
+            else:
+                out.append(render(block.data))
+        if in_list:
+            out.append("</ul>")
+        out.append("</section>")
+    out += ["</body>", "</html>", ""]
+    return "\n".join(out)
+
+
+def render_text(
+    document,
+    title="Document",
+    subtitle="",
+    author="Author",
+    version="1.0",
+    year=None,
+    layout=None,
+):
+    """Render a parsed :class:`Document` as plain text (no markup).
+
+    Sections are underlined, code is indented by four spaces, tables are
+    aligned in columns and prose is wrapped at :data:`TEXT_WIDTH`.
+    """
+    if year is None:
+        year = str(datetime.now().year)
+    document, title_lines = _output_document(document, title, layout)
+    out = ["\n".join(title_lines).upper()]
+    if subtitle:
+        out.append(subtitle)
+    out.append(f"Author: {author}\nVersion: {version}  |  {year}")
+
+    toc = layout.toc if layout is not None else "generated"
+    if toc == "generated":
+        numbered = layout.toc_numbered if layout is not None else True
+        out.append(
+            "Table of Contents\n"
+            + "\n".join(
+                f"  {idx}. {sec.title}" if numbered else f"  {sec.title}"
+                for idx, sec in enumerate(document.sections, start=1)
+            )
+        )
+    elif toc == "static":
+        out.append(
+            "Table of Contents\n"
+            + "\n".join(f"  {entry}" for entry in layout.toc_entries)
+        )
+
+    renderers = _TEXT_RENDERERS
+    for section in document.sections:
+        out.append(f"\n{section.title}\n{'=' * len(section.title)}")
+        previous = None
+        for block in section.blocks:
+            render = renderers.get(block.kind)
+            text = str(block.data) if render is None else render(block.data)
+            if block.kind == previous == "bullet":
+                out[-1] += "\n" + text  # keep a list together
+            else:
+                out.append(text)
+            previous = block.kind
+    return "\n\n".join(out) + "\n"
+
+
+def format_output_paths(output_path, formats):
+    """Map every format in *formats* to its output file.
+
+    A single format writes to *output_path* itself; several formats share
+    its name with each format's extension (``guide.pdf``, ``guide.html``).
+    """
+    formats = list(dict.fromkeys(formats))
+    unknown = [fmt for fmt in formats if fmt not in OUTPUT_FORMATS]
+    if unknown:
+        choices = ", ".join(OUTPUT_FORMATS)
+        raise ValueError(
+            f"unknown output format {unknown[0]!r} (choose from {choices})"
+        )
+    if len(formats) == 1:
+        return {formats[0]: output_path}
+    stem = os.path.splitext(output_path)[0]
+    return {fmt: stem + OUTPUT_FORMATS[fmt] for fmt in formats}
+
+
+def convert_md(
+    input_path,
+    outputs,
+    title="Document",
+    subtitle="",
+    author="Author",
+    version="1.0",
+    year=None,
+    cache_dir=None,
+    force=False,
+    profiler=None,
+    line_numbers=False,
+    layout=None,
+    fonts=None,
+    optimize=None,
+    low_memory=False,
+):
+    """Write *input_path* in several formats from a single parse.
+
+    *outputs* maps formats of :data:`OUTPUT_FORMATS` (``"pdf"``, ``"html"``,
+    ``"txt"``) to output paths, e.g. from :func:`format_output_paths`.  The
+    Markdown is parsed once and the same :class:`Document` feeds
+    :func:`render_html`, :func:`render_text` and the PDF, which goes
+    through :func:`convert_md_to_pdf` (build cache included; a PDF on its
+    own is looked up there before anything is parsed).  The other
+    arguments are as for :func:`convert_md_to_pdf`; *line_numbers*,
+    *fonts*, *optimize* and *low_memory* only concern the PDF.
+    """
+    for fmt in outputs:
+        if fmt not in OUTPUT_FORMATS:
+            choices = ", ".join(OUTPUT_FORMATS)
+            raise ValueError(
+                f"unknown output format {fmt!r} (choose from {choices})"
+            )
+    if year is None:
+        year = str(datetime.now().year)
+    cover = dict(
+        title=title,
+        subtitle=subtitle,
+        author=author,
+        version=version,
+        year=year,
+    )
+    pdf_args = dict(
+        cache_dir=cache_dir,
+        force=force,
+        profiler=profiler,
+        line_numbers=line_numbers,
+        layout=layout,
+        fonts=fonts,
+        optimize=optimize,
+        low_memory=low_memory,
+        **cover,
+    )
+    if set(outputs) == {"pdf"}:
+        # nothing to share: keep the build cache's hit before any parse
+        convert_md_to_pdf(input_path, outputs["pdf"], **pdf_args)
+        return
+
+    phase = profiler.phase if profiler else _no_phase
+    with _profiling(profiler):
+        digest = None
+        if cache_dir:
+            with phase("hash"):
+                digest = _file_digest(input_path)
+        with phase("parse"):
+            document = load_md_document(input_path, cache_dir, digest=digest)
+        for fmt, render, name in (
+            ("html", render_html, "HTML"),
+            ("txt", render_text, "Text"),
+        ):
+            if fmt not in outputs:
+                continue
+            with phase(fmt):
+                data = render(document, layout=layout, **cover)
+            with phase("write"):
+                with open(outputs[fmt], "w", encoding="utf-8") as fh:
+                    fh.write(data)
+            print(f"{name} generated successfully: {outputs[fmt]}")
+
+    if "pdf" not in outputs:
+        if profiler is not None:
+            profiler.finish()
+        return
+    convert_md_to_pdf(
+        input_path,
+        outputs["pdf"],
+        document=document,
+        digest=digest,
+        **pdf_args,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Document profiles
+# ---------------------------------------------------------------------------
+
+TOC_STYLES = ("generated", "static", "none")
+
+
+class DocumentProfile:
+    """Declarative layout of a guide, usually read by :func:`load_document_profile`.
+
+    Names the Markdown input and PDF output, the cover page, the ToC style
+    (``"generated"`` from the ``## `` headers, ``"static"`` from
+    *toc_entries*, or ``"none"``), section titles to leave out and the
+    ``(title, markdown)`` pages appended after the body.
+    """
+
+    __slots__ = (
+        "input_path",
+        "output_path",
+        "title",
+        "subtitle",
+        "author",
+        "version",
+        "year",
+        "title_lines",
+        "toc",
+        "toc_numbered",
+        "toc_entries",
+        "exclude",
+        "appendix",
+    )
+
+    def __init__(
+        self,
+        input_path,
+        output_path=None,
+        title="Document",
+        subtitle="",
+        author="Author",
+        version="1.0",
+        year=None,
+        title_lines=None,
+        toc="generated",
+        toc_numbered=True,
+        toc_entries=(),
+        exclude=(),
+        appendix=(),
+    ):
+        if toc not in TOC_STYLES:
+            raise ValueError(f"toc style must be one of {TOC_STYLES}, not {toc!r}")
+        self.input_path = input_path
+        self.output_path = output_path or os.path.splitext(input_path)[0] + ".pdf"
+        self.title = title
+        self.subtitle = subtitle
+        self.author = author
+        self.version = version
+        self.year = year
+        self.title_lines = list(title_lines) if title_lines else None
+        self.toc = toc
+        self.toc_numbered = toc_numbered
+        self.toc_entries = list(toc_entries)
+        self.exclude = list(exclude)
+        self.appendix = [tuple(page) for page in appendix]
+
+    def layout_args(self):
+        """The layout settings as a JSON-able dict (part of the cache key)."""
+        return {
+            "title_lines": self.title_lines,
+            "toc": self.toc,
+            "toc_numbered": self.toc_numbered,
+            "toc_entries": self.toc_entries,
+            "exclude": self.exclude,
+            "appendix": self.appendix,
+        }
+
+    def apply(self, document):
+        """Return *document* without excluded sections, plus the appendix."""
+        excluded = set(self.exclude)
+        sections = [sec for sec in document.sections if sec.title not in excluded]
+        for title, markdown in self.appendix:
+            text = f"## {title}\n{markdown}" if title else markdown
+            # parse_md_blocks never opens a section on the very first line
+            sections += parse_md_document(iter_text_lines("\n" + text)).sections
+        return Document(sections)
+
+    def __repr__(self):
+        return f"DocumentProfile({self.input_path!r})"
+
+
+_PROFILE_KEYS = {"input", "output", "cover", "toc", "exclude", "appendix"}
+_PROFILE_COVER_KEYS = {
+    "title",
+    "title_lines",
+    "subtitle",
+    "author",
+    "version",
+    "year",
+}
+
+
+def _read_profile_file(path):
+    """Load the raw mapping from a TOML or YAML profile."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".toml":
+        try:
+            import tomllib
+        except ImportError:  # Python < 3.11
+            try:
+                import tomli as tomllib
+            except ImportError:
+                raise ValueError(
+                    f"{path}: TOML profiles need Python 3.11+ or tomli"
+                ) from None
+        with open(path, "rb") as fh:
+            try:
+                return tomllib.load(fh)
+            except tomllib.TOMLDecodeError as exc:
+                raise ValueError(f"{path}: {exc}") from None
+    if ext in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError(f"{path}: YAML profiles need PyYAML") from None
+        with open(path, "r", encoding="utf-8") as fh:
+            try:
+                return yaml.safe_load(fh) or {}
+            except yaml.YAMLError as exc:
+                raise ValueError(f"{path}: {exc}") from None
+    raise ValueError(f"{path}: document profiles must be .toml, .yaml or .yml")
+
+
+def load_document_profile(path):
+    """Read a :class:`DocumentProfile` from a TOML or YAML file.
+
+    Relative ``input``, ``output`` and appendix ``file`` paths are resolved
+    against the profile's directory.  Raises ``ValueError`` for unknown keys
+    or malformed values.
+    """
+    data = _read_profile_file(path)
+    base = os.path.dirname(os.path.abspath(path))
+
+    def fail(message):
+        raise ValueError(f"{path}: {message}")
+
+    def check_keys(mapping, allowed, where):
+        if not isinstance(mapping, dict):
+            fail(f"{where} must be a table/mapping")
+        unknown = sorted(set(mapping) - allowed)
+        if unknown:
+            fail(f"unknown {where} key(s): {', '.join(unknown)}")
+
+    check_keys(data, _PROFILE_KEYS, "top-level")
+    if not isinstance(data.get("input"), str):
+        fail("'input' (path of the Markdown file) is required")
+
+    cover = data.get("cover", {})
+    check_keys(cover, _PROFILE_COVER_KEYS, "cover")
+    kwargs = {
+        name: str(cover[name])
+        for name in ("title", "subtitle", "author", "version", "year")
+        if name in cover
+    }
+    if "title_lines" in cover:
+        kwargs["title_lines"] = [str(line) for line in cover["title_lines"]]
+
+    toc = data.get("toc", "generated")
+    if isinstance(toc, str):
+        toc = {"style": toc}
+    check_keys(toc, {"style", "numbered", "entries"}, "toc")
+    kwargs["toc"] = toc.get("style", "static" if "entries" in toc else "generated")
+    kwargs["toc_numbered"] = bool(toc.get("numbered", True))
+    kwargs["toc_entries"] = [str(entry) for entry in toc.get("entries", [])]
+
+    kwargs["exclude"] = [str(title) for title in data.get("exclude", [])]
+
+    appendix = []
+    for page in data.get("appendix", []):
+        check_keys(page, {"title", "markdown", "file"}, "appendix")
+        if ("markdown" in page) == ("file" in page):
+            fail("each appendix page needs exactly one of 'markdown' or 'file'")
+        markdown = page.get("markdown")
+        if markdown is None:
+            with open(os.path.join(base, page["file"]), "r", encoding="utf-8") as fh:
+                markdown = fh.read()
+        appendix.append((str(page.get("title", "")), markdown))
+    kwargs["appendix"] = appendix
+
+    output = data.get("output")
+    try:
+        return DocumentProfile(
+            os.path.join(base, data["input"]),
+            os.path.join(base, output) if output else None,
+            **kwargs,
+        )
+    except ValueError as exc:
+        fail(exc)
+
+
+def convert_profile(
+    profile,
+    output_path=None,
+    cache_dir=None,
+    force=False,
+    profiler=None,
+    line_numbers=False,
+    fonts=None,
+    optimize=None,
+    low_memory=False,
+    formats=("pdf",),
+):
+    """Render the guide described by *profile* (a :class:`DocumentProfile`
+    or the path of a profile file) through :func:`convert_md`.
+
+    *output_path* overrides the profile's ``output``; *formats* are keys of
+    :data:`OUTPUT_FORMATS` (see :func:`format_output_paths`).
+    """
+    if not isinstance(profile, DocumentProfile):
+        profile = load_document_profile(profile)
+    convert_md(
+        profile.input_path,
+        format_output_paths(output_path or profile.output_path, formats),
+        title=profile.title,
+        subtitle=profile.subtitle,
+        author=profile.author,
+        version=profile.version,
+        year=profile.year,
+        cache_dir=cache_dir,
+        force=force,
+        profiler=profiler,
+        line_numbers=line_numbers,
+        layout=profile,
+        fonts=fonts,
+        optimize=optimize,
+        low_memory=low_memory,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Watch mode (incremental re-rendering)
+# ---------------------------------------------------------------------------
+
+# Every font the renderer can select, registered up front in this order so
+# font resource ids (/F1, /F2 ...) are identical from one render to the next.
+_LAYOUT_FONTS = (
+    ("Helvetica", ""),
+    ("Helvetica", "B"),
+    ("Helvetica", "I"),
+    ("Helvetica", "BI"),
+    ("Courier", ""),
+)
+WATCH_POLL_INTERVAL = 0.5
+WATCH_SETTLE_SECONDS = 0.05
+
+
+def _register_layout_fonts(pdf):
+    """Register :data:`_LAYOUT_FONTS` in order; return ``{font key: id}``."""
+    for family, style in _LAYOUT_FONTS:
+        pdf.set_font(family, style)
+    return {key: font.i for key, font in pdf.fonts.items()}
+
+
+def _graphics_state(pdf):
+    """Font, colours and line width *pdf* currently has in effect."""
+    return (
+        pdf.font_family,
+        pdf.font_style,
+        pdf.font_size_pt,
+        pdf.draw_color,
+        pdf.fill_color,
+        pdf.text_color,
+        pdf.line_width,
+    )
+
+
+class _RecordedPage:
+    """Body content of one page of a recorded section."""
+
+    __slots__ = ("content", "resources", "annots", "outline", "state")
+
+    def __init__(self, content, resources, annots, outline, state):
+        self.content = content  # content stream between header and footer
+        self.resources = resources  # [(resource type, {resource ids})]
+        self.annots = annots  # link annotations
+        self.outline = outline  # [(name, level, y)] bookmarks on this page
+        self.state = state  # font and colours in effect at the footer
+
+
+class _SectionRecorder:
+    """Collects the pages of one section while it is laid out normally.
+
+    :class:`MarkdownPDF` calls :meth:`page_started` once a new page (and its
+    header) is set up and :meth:`page_ended` before fpdf starts the footer (and the graphics
+    state it saves around it), so only the body content of each page is
+    kept.
+    """
+
+    def __init__(self, pdf, new_page):
+        self.pages = []
+        self._start = None
+        self._outline_mark = len(pdf._outline)
+        self._annot_mark = 0
+        if not new_page:  # the section continues on the current page
+            self.page_started(pdf)
+
+    def page_started(self, pdf):
+        page = pdf.pages[pdf.page]
+        self._start = len(page.contents)
+        self._annot_mark = len(page.annots or ())
+
+    def page_ended(self, pdf):
+        if self._start is None:
+            return  # footer of the page before the section
+        page = pdf.pages[pdf.page]
+        catalog = pdf._resource_catalog
+        shared = set(pdf._shared_forms.values())  # drawn by the header
+        resources = []
+        for (number, rtype), ids in catalog.resources_per_page.items():
+            if number == pdf.page and ids:
+                if rtype is PDFResourceType.X_OBJECT:
+                    ids = ids - shared
+                resources.append((rtype, set(ids)))
+        outline = [
+            (sec.name, sec.level, (pdf.h_pt - sec.dest.top) / pdf.k)
+            for sec in pdf._outline[self._outline_mark :]
+            if sec.page_number == pdf.page
+        ]
+        self.pages.append(
+            _RecordedPage(
+                bytes(page.contents[self._start :]),
+                resources,
+                list(page.annots or ())[self._annot_mark :],
+                outline,
+                _graphics_state(pdf),
+            )
+        )
+        self._start = None
+
+    def finish(self, pdf):
+        self.page_ended(pdf)
+        return self.pages
+
+
+class LayoutCache:
+    """In-memory cache of laid-out sections for incremental re-rendering.
+
+    Every ``## `` section starts on a page of its own, so its pages depend
+    only on its content, the render settings and the graphics state the
+    previous section left behind.  A section whose hash
+    matches the previous render has its page content, font resources, links
+    and outline entries replayed instead of being laid out again; headers
+    and footers (page numbers) are still drawn fresh.  Entries the latest
+    render did not use are dropped, so memory is bounded by one document.
+
+    This works on fpdf's page objects directly; a cache is only valid for
+    the process (and fpdf version) that filled it.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._font_ids = None
+        self.hits = 0
+        self.misses = 0
+
+    def prepare(self, pdf):
+        """Register every font in a fixed order (stable resource ids)."""
+        font_ids = _register_layout_fonts(pdf)
+        if font_ids != self._font_ids:
+            self._entries = {}  # recorded pages refer to fonts by id
+            self._font_ids = font_ids
+
+    def _key(self, pdf, section, new_page):
+        h = hashlib.sha256()
+        h.update(f"{__version__} {_fpdf_version()} {new_page}".encode())
+        h.update(repr((pdf._header_title, pdf.code_line_numbers)).encode())
+        # fpdf skips operators for state already in effect, so the recorded
+        # content is only valid after the same state
+        h.update(repr(_graphics_state(pdf)).encode())
+        h.update(repr((section.title, section.blocks)).encode("utf-8"))
+        return h.hexdigest()
+
+    def render_sections(self, pdf, sections, on_fresh_page):
+        """Lay out *sections*, replaying the ones cached by the last render."""
+        entries = {}
+        self.hits = self.misses = 0
+        for section in sections:
+            new_page = not on_fresh_page
+            on_fresh_page = False
+            key = self._key(pdf, section, new_page)
+            pages = self._entries.get(key) or entries.get(key)
+            if pages is not None:
+                _replay_section(pdf, pages, new_page)
+                self.hits += 1
+            else:
+                pages = _record_section(pdf, section, new_page)
+                self.misses += 1
+            if pages is not None:
+                entries[key] = pages
+        self._entries = entries
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _record_section(pdf, section, new_page):
+    """Render *section* normally; return its recorded pages (or ``None``)."""
+    if "{nb}" in repr(section.blocks):
+        # the page-count alias is substituted per page at output time
+        _section_title(pdf, section.title, new_page=new_page)
+        for block in section.blocks:
+            _render_block(pdf, block.kind, block.data)
+        return None
+    recorder = _SectionRecorder(pdf, new_page)
+    pdf._recorder = recorder
+    try:
+        _section_title(pdf, section.title, new_page=new_page)
+        for block in section.blocks:
+            _render_block(pdf, block.kind, block.data)
+        return recorder.finish(pdf)
+    finally:
+        pdf._recorder = None
+
+
+def _replay_section(pdf, pages, new_page):
+    """Re-emit recorded *pages* into *pdf* as if the section was laid out."""
+    catalog = pdf._resource_catalog
+    for i, recorded in enumerate(pages):
+        if i or new_page:
+            pdf.add_page()
+        page = pdf.pages[pdf.page]
+        page.contents.extend(recorded.content)
+        for rtype, ids in recorded.resources:
+            for resource in ids:
+                catalog.add(rtype, resource, pdf.page)
+        for annot in recorded.annots:
+            page.add_annotation(annot)
+        for name, level, y in recorded.outline:
+            pdf.set_y(y)
+            pdf.start_section(name, level)
+        # Bring fpdf's idea of the graphics state in line with the replayed
+        # content, so the footer (and the next page) emit what they need.
+        # Assigned directly: the set_* methods would emit operators too.
+        family, style, size, draw, fill, text, width = recorded.state
+        if family:
+            pdf.set_font(family, style, size)
+        pdf.current_font_is_set_on_page = False
+        pdf.draw_color = draw
+        pdf.fill_color = fill
+        pdf.text_color = text
+        pdf.line_width = width
+
+
+class _PollWatcher:
+    """Detect changes to a file by polling its size, mtime and inode."""
+
+    def __init__(self, path, interval=WATCH_POLL_INTERVAL):
+        self._path = path
+        self._interval = interval
+        self._signature = self._stat()
+
+    def _stat(self):
+        try:
+            st = os.stat(self._path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def wait(self):
+        while True:
+            time.sleep(self._interval)
+            signature = self._stat()
+            if signature is not None and signature != self._signature:
+                self._signature = signature
+                return
+
+    def close(self):
+        pass
+
+
+class _InotifyWatcher:
+    """Detect changes to a file with Linux inotify.
+
+    The parent directory is watched, so editors that save by writing a
+    temporary file and renaming it over the original are noticed too.
+    """
+
+    # IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+    _MASK = 0x00000008 | 0x00000080 | 0x00000100
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self, path):
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        directory, self._name = os.path.split(os.path.abspath(path))
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self._fd, os.fsencode(directory), self._MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, f"cannot watch {directory}")
+
+    def _drain(self):
+        """Consume pending events; return True if one concerned our file."""
+        seen = False
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return seen
+            offset = 0
+            while offset < len(data):
+                _wd, _mask, _cookie, length = self._EVENT.unpack_from(data, offset)
+                offset += self._EVENT.size
+                name = data[offset : offset + length].split(b"\0", 1)[0]
+                offset += length
+                if os.fsdecode(name) == self._name:
+                    seen = True
+
+    def wait(self):
+        while True:
+            select.select([self._fd], [], [])
+            if self._drain():
+                # editors often save in several steps; let them finish
+                time.sleep(WATCH_SETTLE_SECONDS)
+                self._drain()
+                return
+
+    def close(self):
+        os.close(self._fd)
+
+
+def _file_watcher(path, poll_interval=None):
+    """inotify on Linux unless *poll_interval* is given, else polling."""
+    if poll_interval is None and sys.platform.startswith("linux"):
+        try:
+            return _InotifyWatcher(path)
+        except (OSError, AttributeError):  # no inotify (or no libc symbol)
+            pass
+    return _PollWatcher(path, poll_interval or WATCH_POLL_INTERVAL)
+
+
+def watch_md(
+    input_path,
+    output_path,
+    title="Document",
+    subtitle="",
+    author="Author",
+    version="1.0",
+    year=None,
+    line_numbers=False,
+    layout=None,
+    poll_interval=None,
+    fonts=None,
+    optimize=None,
+):
+    """Render *input_path* to *output_path* and again after every change.
+
+    Changes are detected with inotify where available, otherwise (or when
+    *poll_interval* is given) by polling.  Each re-render re-parses the
+    input but replays the layout of every section whose content did not
+    change (see :class:`LayoutCache`), and replaces the PDF atomically so
+    viewers never see a half-written file.  Runs until interrupted.
+    """
+    cache = LayoutCache()
+    watcher = _file_watcher(input_path, poll_interval)
+    print(f"Watching {input_path} (Ctrl+C to stop)")
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                document = parse_md_document(iter_md_lines(input_path))
+                pdf_bytes = _render_buffer(
+                    document,
+                    title,
+                    subtitle,
+                    author,
+                    version,
+                    year,
+                    line_numbers=line_numbers,
+                    layout=layout,
+                    layout_cache=cache,
+                    fonts=fonts,
+                    optimize=optimize,
+                )
+                tmp = f"{output_path}.{os.getpid()}.tmp"
+                with open(tmp, "wb") as fh:
+                    fh.write(pdf_bytes)
+                os.replace(tmp, output_path)
+            except Exception as exc:  # keep watching through a bad save
+                print(f"Error rendering {input_path}: {exc}", file=sys.stderr)
+            else:
+                elapsed = (time.perf_counter() - start) * 1e3
+                print(
+                    f"PDF generated in {elapsed:.0f} ms: {output_path} "
+                    f"({cache.misses} sections rendered, {cache.hits} reused)"
+                )
+            watcher.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+
+_GLOB_MAGIC_RE = re.compile(r"[*?[]")
+
+
+def _glob_root(pattern):
+    """The leading directories of glob *pattern* that hold no wildcard."""
+    parts = []
+    for part in os.path.dirname(pattern).split(os.sep):
+        if _GLOB_MAGIC_RE.search(part):
+            break
+        parts.append(part)
+    return os.sep.join(parts) or os.curdir
+
+
+def _collect_batch_inputs(source):
+    """Expand *source* (directory or glob) into ``(input_path, rel_path)`` pairs.
+
+    For a directory every ``*.md`` file below it is returned, with the path
+    relative to the directory so the tree can be mirrored in the output dir.
+    For a glob pattern the path is relative to the pattern's leading
+    directories without wildcards (``docs/**/*.md`` keeps what ``**``
+    matched), so files of the same name in different directories stay apart.
+    """
+    if os.path.isdir(source):
+        pairs = []
+        for root, _dirs, files in os.walk(source):
+            for name in files:
+                if name.lower().endswith(".md"):
+                    path = os.path.join(root, name)
+                    pairs.append((path, os.path.relpath(path, source)))
+        return sorted(pairs)
+    root = _glob_root(source)
+    return sorted(
+        (path, os.path.relpath(path, root))
+        for path in glob.glob(source, recursive=True)
+        if os.path.isfile(path)
+    )
+
+
+def _batch_worker(input_path, output_path, render_kwargs, profile=False):
+    """Convert one file for :func:`convert_md_batch`; never raises."""
+    start = time.perf_counter()
+    error = None
+    profiler = Profiler() if profile else None
+    try:
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        kwargs = dict(render_kwargs)
+        if kwargs.get("title") is None:
+            stem = os.path.splitext(os.path.basename(input_path))[0]
+            kwargs["title"] = stem.replace("_", " ")
+        formats = kwargs.pop("formats", None)
+        if formats:
+            outputs = format_output_paths(output_path, formats)
+            convert_md(input_path, outputs, profiler=profiler, **kwargs)
+        else:
+            convert_md_to_pdf(
+                input_path, output_path, profiler=profiler, **kwargs
+            )
+    except Exception as exc:  # report and keep the rest of the batch going
+        error = f"{type(exc).__name__}: {exc}"
+    return {
+        "input": input_path,
+        "output": output_path,
+        "seconds": time.perf_counter() - start,
+        "error": error,
+        "profile": profiler.to_dict() if profiler else None,
+    }
+
+
+def convert_md_batch(
+    source, output_dir, jobs=None, profile=False, **render_kwargs
+):
+    """Convert every Markdown file matched by *source* into *output_dir*.
+
+    *source* is a directory (searched recursively for ``*.md``) or a glob
+    pattern.  Files are rendered in a process pool of *jobs* workers
+    (default: one per CPU).  The remaining keyword arguments are passed to
+    :func:`convert_md_to_pdf`; when ``title`` is omitted or ``None`` each PDF
+    is titled after its file name.  ``formats=("pdf", "html")`` writes each
+    file in those formats from one parse instead (see :func:`convert_md`).
+
+    Returns a list of result dicts (``input``, ``output``, ``seconds``,
+    ``error``, ``profile``) in input order.  A failing file does not stop
+    the batch; its ``error`` field holds the exception message instead.
+    Raises ``ValueError`` before converting anything if two inputs map to
+    the same output file.
+    With *profile* set, ``profile`` holds each file's
+    :meth:`Profiler.to_dict` stats (merge them with :meth:`Profiler.merge`).
+    """
+    pairs = _collect_batch_inputs(source)
+    tasks = [
+        (path, os.path.join(output_dir, os.path.splitext(rel)[0] + ".pdf"))
+        for path, rel in pairs
+    ]
+    if not tasks:
+        return []
+    inputs = {}
+    for inp, out in tasks:
+        # e.g. a.md and a.markdown: two workers would write one file
+        other = inputs.setdefault(os.path.normcase(out), inp)
+        if other != inp:
+            raise ValueError(f"{other} and {inp} would both be written to {out}")
+
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    jobs = max(1, min(jobs, len(tasks)))
+
+    if jobs == 1:
+        return [
+            _batch_worker(inp, out, render_kwargs, profile) for inp, out in tasks
+        ]
+
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {
+            pool.submit(_batch_worker, inp, out, render_kwargs, profile): inp
+            for inp, out in tasks
+        }
+        for future in as_completed(futures):
+            result = future.result()
+            results[result["input"]] = result
+    return [results[inp] for inp, _out in tasks]
+
+
+def _print_batch_report(results, elapsed):
+    """Print per-file timings and a summary line for a batch run."""
+    failed = [r for r in results if r["error"]]
+    for r in results:
+        status = "FAIL" if r["error"] else "ok"
+        print(f"  [{status:>4}] {r['seconds']:7.2f}s  {r['input']}")
+        if r["error"]:
+            print(f"           {r['error']}")
+    print(
+        f"Converted {len(results) - len(failed)}/{len(results)} files "
+        f"in {elapsed:.2f}s ({len(failed)} failed)"
+    )
+
+
+# ---------------------------------------------------------------------------
+# Volumes (one large document rendered on several cores)
+# ---------------------------------------------------------------------------
+
+# Rough block heights in mm for page budgets; they only decide where volumes
+# are cut, never the layout itself.
+_PAGE_BODY_HEIGHT = 247
+_CHARS_PER_LINE = 100
+
+
+def _estimate_section_pages(section):
+    """Cheap estimate of the number of pages *section* will take."""
+    height = 22  # title, underline and spacing
+    for block in section.blocks:
+        kind, data = block.kind, block.data
+        if kind == "subsection":
+            height += 16
+        elif kind == "code":
+            height += len(data[1]) * CODE_LINE_HEIGHT + 4
+        elif kind == "table":
+            if not any(data):
+                continue  # nothing is drawn (see _table)
+            widest = max(sum(len(c) for c in row) for row in data)
+            rows = 1 + widest // _CHARS_PER_LINE
+            height += len(data) * (rows * TABLE_LINE_HEIGHT + TABLE_ROW_PADDING) + 3
+        else:
+            height += (1 + len(str(data)) // _CHARS_PER_LINE) * 6 + 2
+    return max(1, -(-int(height) // _PAGE_BODY_HEIGHT))
+
+
+def split_volumes(sections, max_pages=None, max_sections=None):
+    """Partition *sections* into volumes at ``## `` section boundaries.
+
+    A volume is closed before it would exceed *max_sections* sections or
+    (estimated) *max_pages* pages; a single section larger than the page
+    budget gets a volume of its own.  Returns a list of section lists.
+    """
+    volumes = []
+    current = []
+    pages = 0
+    for section in sections:
+        estimate = _estimate_section_pages(section) if max_pages else 0
+        if current and (
+            (max_sections and len(current) >= max_sections)
+            or (max_pages and pages + estimate > max_pages)
+        ):
+            volumes.append(current)
+            current = []
+            pages = 0
+        current.append(section)
+        pages += estimate
+    if current:
+        volumes.append(current)
+    return volumes
+
+
+def _record_volume(sections, header_title, line_numbers, fonts=None, lead_in=None):
+    """Lay out *sections* in a scratch PDF; return ``(state, pages)`` of each.
+
+    Runs in a worker process.  Fonts are registered in the same fixed order
+    as in the process that replays the pages, so resource ids agree.
+    *state* is the graphics state a section was laid out from (recorded
+    content is only valid after the same state, see :class:`LayoutCache`).
+    *lead_in*, the section before the volume, is laid out first but not
+    recorded, so the volume usually starts from the state it will be
+    replayed after.
+    """
+    _load_fpdf()
+    pdf = MarkdownPDF(
+        header_title=header_title, line_numbers=line_numbers, fonts=fonts
+    )
+    pdf.alias_nb_pages()
+    pdf.set_auto_page_break(auto=True, margin=20)
+    _register_layout_fonts(pdf)
+    pdf.add_page()  # stands in for the cover, so section pages get headers
+    if lead_in is not None:
+        _section_title(pdf, lead_in.title)
+        for block in lead_in.blocks:
+            _render_block(pdf, block.kind, block.data)
+    recorded = []
+    for section in sections:
+        state = _graphics_state(pdf)
+        recorded.append((state, _record_section(pdf, section, new_page=True)))
+    return recorded
+
+
+def _volume_worker(sections, output_path, render_kwargs):
+    """Render *sections* as a standalone volume PDF; returns its size."""
+    buf = _render_buffer(Document(sections), **render_kwargs)
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, "wb") as fh:
+        fh.write(buf)
+    return len(buf)
+
+
+class _RecordedLayout:
+    """Replays sections recorded by :func:`_record_volume` workers in order.
+
+    Has the :class:`LayoutCache` interface expected by
+    :func:`_parse_and_render`; sections that could not be recorded (they
+    use the ``{nb}`` alias) or were recorded after a different graphics
+    state are laid out normally.
+    """
+
+    def __init__(self, recorded):
+        self._recorded = recorded
+        self.hits = 0
+        self.misses = 0
+
+    def prepare(self, pdf):
+        _register_layout_fonts(pdf)
+
+    def render_sections(self, pdf, sections, on_fresh_page):
+        for section, (state, pages) in zip(sections, self._recorded):
+            new_page = not on_fresh_page
+            on_fresh_page = False
+            if pages is not None and state == _graphics_state(pdf):
+                _replay_section(pdf, pages, new_page)
+                self.hits += 1
+                continue
+            _section_title(pdf, section.title, new_page=new_page)
+            for block in section.blocks:
+                _render_block(pdf, block.kind, block.data)
+            self.misses += 1
+
+
+def volume_paths(output_path, count):
+    """Output paths of *count* volumes: ``report.pdf`` -> ``report.vol01.pdf``."""
+    stem, ext = os.path.splitext(output_path)
+    width = max(2, len(str(count)))
+    return [f"{stem}.vol{i:0{width}d}{ext or '.pdf'}" for i in range(1, count + 1)]
+
+
+def convert_md_volumes(
+    input_path,
+    output_path,
+    max_pages=None,
+    max_sections=None,
+    merge=False,
+    jobs=None,
+    title="Document",
+    subtitle="",
+    author="Author",
+    version="1.0",
+    year=None,
+    line_numbers=False,
+    profiler=None,
+    fonts=None,
+    optimize=None,
+):
+    """Render a large Markdown file as volumes in a pool of processes.
+
+    The document is split at ``## `` sections with :func:`split_volumes` and
+    every volume is laid out by its own worker (*jobs* processes, default
+    one per CPU).  Without *merge*, each volume is written as a standalone
+    PDF (cover, ToC, pages numbered from 1) at :func:`volume_paths` of
+    *output_path*.  With *merge*, the workers only lay out their sections;
+    the recorded pages are then replayed in order behind one cover and a
+    combined ToC, so *output_path* gets a single PDF with continuous page
+    numbers and a full outline.  *fonts* is an optional :class:`UnicodeFonts`
+    and *optimize* a key of :data:`OPTIMIZE_PRESETS`.
+
+    The build cache is not consulted.  Returns the list of written paths.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    if not (max_pages or max_sections):
+        raise ValueError("a page or section budget per volume is required")
+    if year is None:
+        year = str(datetime.now().year)
+
+    phase = profiler.phase if profiler else _no_phase
+    with _profiling(profiler):
+        with phase("parse"):
+            document = parse_md_document(iter_md_lines(input_path))
+        volumes = split_volumes(document.sections, max_pages, max_sections)
+        if jobs is None:
+            jobs = os.cpu_count() or 1
+        jobs = max(1, min(jobs, len(volumes)))
+
+        if merge:
+            with phase("volume_layout"):
+                args = [
+                    (vol, title, line_numbers, fonts, prev[-1] if prev else None)
+                    for prev, vol in zip([None] + volumes, volumes)
+                ]
+                if jobs == 1:
+                    recorded = [_record_volume(*a) for a in args]
+                else:
+                    with ProcessPoolExecutor(max_workers=jobs) as pool:
+                        recorded = list(pool.map(_record_volume, *zip(*args)))
+            replay = _RecordedLayout([pages for vol in recorded for pages in vol])
+            pdf_bytes = _render_buffer(
+                document,
+                title,
+                subtitle,
+                author,
+                version,
+                year,
+                profiler,
+                line_numbers,
+                layout_cache=replay,
+                fonts=fonts,
+                optimize=optimize,
+            )
+            with phase("write"):
+                with open(output_path, "wb") as fh:
+                    fh.write(pdf_bytes)
+            paths = [output_path]
+            size = len(pdf_bytes)
+        else:
+            paths = volume_paths(output_path, len(volumes))
+            tasks = []
+            for i, (vol, path) in enumerate(zip(volumes, paths), start=1):
+                label = f"Volume {i} of {len(volumes)}"
+                render_kwargs = {
+                    "title": title,
+                    "subtitle": f"{subtitle} - {label}" if subtitle else label,
+                    "author": author,
+                    "version": version,
+                    "year": year,
+                    "line_numbers": line_numbers,
+                    "fonts": fonts,
+                    "optimize": optimize,
+                }
+                tasks.append((vol, path, render_kwargs))
+            with phase("volume_render"):
+                if jobs == 1:
+                    sizes = [_volume_worker(*task) for task in tasks]
+                else:
+                    with ProcessPoolExecutor(max_workers=jobs) as pool:
+                        sizes = list(pool.map(_volume_worker, *zip(*tasks)))
+            size = sum(sizes)
+    if profiler is not None:
+        profiler.count("volumes", len(volumes))
+        profiler.count("output_bytes", size)
+        profiler.finish()
+    for path in paths:
+        print(f"PDF generated successfully: {path}")
+    return paths
+
+
+# ---------------------------------------------------------------------------
+# Async API (asyncio services)
+# ---------------------------------------------------------------------------
+
+def _render_job(source, render_kwargs):
+    """Executor-side half of :meth:`AsyncConverter.render`."""
+    return render_md(source, **render_kwargs)
+
+
+def _convert_job(input_path, output_path, render_kwargs):
+    """Executor-side half of :meth:`AsyncConverter.convert`."""
+    convert_md_to_pdf(input_path, output_path, **render_kwargs)
+
+
+class AsyncConverter:
+    """Convert Markdown from asyncio code without blocking the event loop.
+
+    Parsing, rendering and file I/O run in *executor* (default: a process
+    pool of *workers* processes owned by the converter), and at most
+    *max_concurrency* jobs (default: the worker count) are handed to it at
+    once; later calls wait for a free slot.  Every call takes an optional
+    *timeout* in seconds covering the wait and the render
+    (``asyncio.TimeoutError``) and can be cancelled like any other
+    coroutine.  A job a worker has already started cannot be interrupted:
+    its result is dropped and its slot only frees up once the worker is
+    done with it, so cancelled jobs never oversubscribe the pool.
+
+    Keyword arguments are those of :func:`render_md` (or
+    :func:`convert_md_to_pdf` for :meth:`convert`); with the default
+    process pool they must be picklable, and a *profiler* is not
+    reported back.
+
+    ::
+
+        async with AsyncConverter(workers=4) as converter:
+            pdf = await converter.render(text, title="Runbook", timeout=30)
+            async for chunk in converter.stream(text, title="Runbook"):
+                await response.write(chunk)
+    """
+
+    def __init__(self, workers=None, max_concurrency=None, executor=None):
+        import asyncio
+        from concurrent.futures import ProcessPoolExecutor
+
+        workers = workers or os.cpu_count() or 1
+        self._owns_executor = executor is None
+        if executor is None:
+            executor = ProcessPoolExecutor(max_workers=workers)
+        self._executor = executor
+        self.max_concurrency = max_concurrency or workers
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+
+    async def _run(self, timeout, fn, *args):
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+
+        def release(_future):
+            with contextlib.suppress(RuntimeError):  # loop already closed
+                loop.call_soon_threadsafe(self._slots.release)
+
+        async def submit_and_wait():
+            await self._slots.acquire()
+            try:
+                future = self._executor.submit(fn, *args)
+            except BaseException:
+                self._slots.release()
+                raise
+            future.add_done_callback(release)
+            return await asyncio.wrap_future(future)
+
+        return await asyncio.wait_for(submit_and_wait(), timeout)
+
+    async def render(self, source, timeout=None, **render_kwargs):
+        """Render in-memory Markdown and return the PDF as ``bytes``.
+
+        *source* is a string, UTF-8 bytes, a (blocking) file-like object,
+        read in a thread, or an iterable of lines.
+        """
+        import asyncio
+
+        if isinstance(source, (bytearray, memoryview)):
+            source = bytes(source)
+        elif hasattr(source, "read"):
+            source = await asyncio.to_thread(source.read)
+        elif not isinstance(source, (str, bytes)):
+            source = list(source)
+        return await self._run(timeout, _render_job, source, render_kwargs)
+
+    async def stream(
+        self, source, chunk_size=64 * 1024, timeout=None, **render_kwargs
+    ):
+        """Render like :meth:`render`; yield the PDF in *chunk_size* slices.
+
+        The chunks are ``memoryview`` slices of one buffer, ready for a
+        streamed HTTP response.
+        """
+        data = await self.render(source, timeout=timeout, **render_kwargs)
+        view = memoryview(data)
+        for start in range(0, len(view), chunk_size):
+            yield view[start : start + chunk_size]
+
+    async def convert(
+        self, input_path, output_path, timeout=None, **render_kwargs
+    ):
+        """Run :func:`convert_md_to_pdf` (build cache included) in the executor."""
+        await self._run(
+            timeout, _convert_job, input_path, output_path, render_kwargs
+        )
+
+    async def aclose(self):
+        """Shut down the executor if the converter created it."""
+        import asyncio
+
+        if self._owns_executor:
+            await asyncio.to_thread(
+                self._executor.shutdown, wait=True, cancel_futures=True
+            )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+
+# ---------------------------------------------------------------------------
+# CLI entry-point
+# ---------------------------------------------------------------------------
+
+def _write_profile(profiler, fmt, path):
+    """Emit a --profile report as JSON or Prometheus text."""
+    text = profiler.to_prometheus() if fmt == "prometheus" else profiler.to_json()
+    if path:
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(text if text.endswith("\n") else text + "\n")
+    else:
+        print(text, file=sys.stderr)
+
+
+def _print_page_map(page_map):
+    """Print a --dry-run page map as indented JSON on stdout."""
+    json.dump(page_map, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert a Markdown file to a professionally formatted PDF.",
+    )
+    parser.add_argument(
         "--input",
-        required=True,
-        help="Path to the input Markdown file.",
+        help="Path to the input Markdown file ('-' for stdin, or a "
+        "directory/glob with --batch).",
     )
     parser.add_argument(
         "--output",
-        required=True,
-        help="Path for the output PDF file.",
+        help="Path for the output PDF file ('-' for stdout, or the output "
+        "directory with --batch).",
+    )
+    parser.add_argument(
+        "--doc-profile",
+        default=None,
+        help="TOML/YAML document profile declaring the input, cover, ToC and "
+        "appended pages; --input/--output override its paths.",
     )
     parser.add_argument(
         "--title",
-        default="Document",
-        help="Document title (displayed on cover page and header).",
+        default=None,
+        help="Document title (displayed on cover page and header). "
+        "Defaults to 'Document', or to each file name in batch mode.",
     )
     parser.add_argument(
         "--subtitle",
@@ -480,18 +4178,397 @@ def main():
         default=None,
         help="Year shown on the cover page (default: current year).",
     )
+    parser.add_argument(
+        "--line-numbers",
+        action="store_true",
+        help="Number the lines of every code block.",
+    )
+    parser.add_argument(
+        "--font",
+        default=None,
+        help="TTF/OTF font embedded (subset) instead of Helvetica, so text is "
+        "not reduced to Latin-1.",
+    )
+    parser.add_argument("--font-bold", default=None, help="Bold face for --font.")
+    parser.add_argument(
+        "--font-italic", default=None, help="Italic face for --font."
+    )
+    parser.add_argument(
+        "--font-bold-italic", default=None, help="Bold italic face for --font."
+    )
+    parser.add_argument(
+        "--mono-font",
+        default=None,
+        help="Monospaced TTF/OTF font embedded instead of Courier for code.",
+    )
+    parser.add_argument(
+        "--optimize",
+        choices=tuple(OPTIMIZE_PRESETS),
+        default=None,
+        help="Output preset: 'speed' (fast, light stream compression) or "
+        "'size' (maximum compression, header drawn from one shared object, "
+        "one resource dictionary). Default: fpdf's defaults.",
+    )
+    parser.add_argument(
+        "--format",
+        default="pdf",
+        help="Comma-separated output formats: pdf, html, txt (default: pdf). "
+        "The input is parsed once; with several formats each is written "
+        "next to --output with its own extension.",
+    )
+    parser.add_argument(
+        "--low-memory",
+        action="store_true",
+        help="Spool finished pages to a temporary file and write the PDF "
+        "incrementally, so peak memory stays flat however long the document.",
+    )
+
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Convert every Markdown file under --input (directory or glob) "
+        "into the --output directory in parallel.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of worker processes for --batch and volumes "
+        "(default: CPU count).",
+    )
+    parser.add_argument(
+        "--volume-pages",
+        type=int,
+        default=None,
+        help="Split the document at ## sections into volumes of about N pages "
+        "each, laid out in parallel (see --jobs).",
+    )
+    parser.add_argument(
+        "--volume-sections",
+        type=int,
+        default=None,
+        help="Split the document into volumes of at most N ## sections each.",
+    )
+    parser.add_argument(
+        "--merge-volumes",
+        action="store_true",
+        help="Join the volumes into the single --output PDF, with continuous "
+        "page numbers and one ToC (default: one PDF per volume).",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only lay the document out and print its page map (total pages, "
+        "pages of every section) as JSON instead of writing the PDF.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=DEFAULT_CACHE_DIR,
+        help="Build cache directory (default: $MD_TO_PDF_CACHE or "
+        "~/.cache/md_to_pdf).",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Disable the build cache.",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Re-render even if the build cache has an up-to-date PDF.",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and re-render whenever the input changes, reusing "
+        "the layout of unchanged sections.",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=None,
+        help="With --watch, poll the input every N seconds instead of using "
+        "inotify.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Record per-phase and per-block timings, pages and bytes.",
+    )
+    parser.add_argument(
+        "--profile-format",
+        choices=("json", "prometheus"),
+        default="json",
+        help="Format of the --profile report (default: json).",
+    )
+    parser.add_argument(
+        "--profile-output",
+        default=None,
+        help="Write the --profile report to this file (default: stderr).",
+    )
 
     args = parser.parse_args()
+    cache_dir = None if args.no_cache else args.cache_dir
+    profiler = Profiler() if args.profile else None
+    fonts = None
+    if args.font or args.mono_font:
+        fonts = UnicodeFonts(
+            args.font,
+            bold=args.font_bold,
+            italic=args.font_italic,
+            bold_italic=args.font_bold_italic,
+            mono=args.mono_font,
+            cache_dir=cache_dir,
+        )
+        for _family, _style, path in fonts.faces():
+            if not os.path.isfile(path):
+                parser.error(f"font file not found: {path}")
+    elif args.font_bold or args.font_italic or args.font_bold_italic:
+        parser.error("--font-bold/--font-italic/--font-bold-italic need --font")
+    if args.low_memory and (
+        args.watch or args.volume_pages or args.volume_sections
+    ):
+        parser.error("--low-memory cannot be used with --watch or volumes")
+    formats = [fmt.strip() for fmt in args.format.split(",") if fmt.strip()]
+    for fmt in formats:
+        if fmt not in OUTPUT_FORMATS:
+            parser.error(
+                f"unknown --format {fmt!r} (choose from "
+                f"{', '.join(OUTPUT_FORMATS)})"
+            )
+    if not formats:
+        parser.error("--format needs at least one format")
+    if formats != ["pdf"] and (
+        args.watch
+        or args.dry_run
+        or args.volume_pages
+        or args.volume_sections
+        or "-" in (args.input, args.output)
+    ):
+        parser.error(
+            "--format other than pdf needs file paths and cannot use "
+            "--watch, --dry-run or volumes"
+        )
 
-    convert_md_to_pdf(
-        input_path=args.input,
-        output_path=args.output,
-        title=args.title,
+    if args.doc_profile:
+        if args.batch or "-" in (args.input, args.output):
+            parser.error("--doc-profile needs file paths and cannot use --batch")
+        if args.volume_pages or args.volume_sections:
+            parser.error("--doc-profile cannot be split into volumes")
+        try:
+            layout = load_document_profile(args.doc_profile)
+        except (OSError, ValueError) as exc:
+            parser.error(str(exc))
+        if args.input:
+            layout.input_path = args.input
+        if args.dry_run:
+            if args.watch:
+                parser.error("--dry-run cannot use --watch")
+            page_map = layout_md(
+                layout.input_path,
+                title=layout.title,
+                subtitle=layout.subtitle,
+                author=layout.author,
+                version=layout.version,
+                year=layout.year,
+                cache_dir=cache_dir,
+                force=args.force,
+                profiler=profiler,
+                line_numbers=args.line_numbers,
+                layout=layout,
+                fonts=fonts,
+            )
+            _print_page_map(page_map)
+            if profiler is not None:
+                _write_profile(
+                    profiler, args.profile_format, args.profile_output
+                )
+            return
+        if args.watch:
+            watch_md(
+                layout.input_path,
+                args.output or layout.output_path,
+                title=layout.title,
+                subtitle=layout.subtitle,
+                author=layout.author,
+                version=layout.version,
+                year=layout.year,
+                line_numbers=args.line_numbers,
+                fonts=fonts,
+                optimize=args.optimize,
+                layout=layout,
+                poll_interval=args.poll_interval,
+            )
+            return
+        convert_profile(
+            layout,
+            output_path=args.output,
+            cache_dir=cache_dir,
+            force=args.force,
+            profiler=profiler,
+            line_numbers=args.line_numbers,
+            fonts=fonts,
+            optimize=args.optimize,
+            low_memory=args.low_memory,
+            formats=formats,
+        )
+        if profiler is not None:
+            _write_profile(profiler, args.profile_format, args.profile_output)
+        return
+    if args.dry_run:
+        if args.input in (None, "-") or args.batch or args.watch:
+            parser.error(
+                "--dry-run needs an --input file and cannot use --batch or "
+                "--watch"
+            )
+        if args.volume_pages or args.volume_sections:
+            parser.error("--dry-run lays out the whole document, not volumes")
+        page_map = layout_md(
+            args.input,
+            title=args.title or "Document",
+            subtitle=args.subtitle,
+            author=args.author,
+            version=args.version,
+            year=args.year,
+            cache_dir=cache_dir,
+            force=args.force,
+            profiler=profiler,
+            line_numbers=args.line_numbers,
+            fonts=fonts,
+        )
+        _print_page_map(page_map)
+        if profiler is not None:
+            _write_profile(profiler, args.profile_format, args.profile_output)
+        return
+
+    if not args.input or not args.output:
+        parser.error("--input and --output are required without --doc-profile")
+
+    if args.volume_pages or args.volume_sections:
+        if args.batch or args.watch or "-" in (args.input, args.output):
+            parser.error(
+                "volumes need file paths and cannot use --batch or --watch"
+            )
+        convert_md_volumes(
+            args.input,
+            args.output,
+            max_pages=args.volume_pages,
+            max_sections=args.volume_sections,
+            merge=args.merge_volumes,
+            jobs=args.jobs,
+            title=args.title or "Document",
+            subtitle=args.subtitle,
+            author=args.author,
+            version=args.version,
+            year=args.year,
+            line_numbers=args.line_numbers,
+            fonts=fonts,
+            optimize=args.optimize,
+            profiler=profiler,
+        )
+        if profiler is not None:
+            _write_profile(profiler, args.profile_format, args.profile_output)
+        return
+
+    if args.watch:
+        if args.batch or "-" in (args.input, args.output):
+            parser.error("--watch needs file paths and cannot use --batch")
+        watch_md(
+            args.input,
+            args.output,
+            title=args.title or "Document",
+            subtitle=args.subtitle,
+            author=args.author,
+            version=args.version,
+            year=args.year,
+            line_numbers=args.line_numbers,
+            fonts=fonts,
+            optimize=args.optimize,
+            poll_interval=args.poll_interval,
+        )
+        return
+
+    if args.batch:
+        start = time.perf_counter()
+        try:
+            results = convert_md_batch(
+                args.input,
+                args.output,
+                jobs=args.jobs,
+                title=args.title,
+                subtitle=args.subtitle,
+                author=args.author,
+                version=args.version,
+                year=args.year,
+                line_numbers=args.line_numbers,
+                fonts=fonts,
+                optimize=args.optimize,
+                low_memory=args.low_memory,
+                formats=formats if formats != ["pdf"] else None,
+                cache_dir=cache_dir,
+                force=args.force,
+                profile=args.profile,
+            )
+        except ValueError as exc:
+            parser.error(str(exc))
+        if not results:
+            parser.error(f"no Markdown files matched {args.input!r}")
+        _print_batch_report(results, time.perf_counter() - start)
+        if profiler is not None:
+            for result in results:
+                if result["profile"]:
+                    profiler.merge(result["profile"])
+            _write_profile(profiler, args.profile_format, args.profile_output)
+        sys.exit(1 if any(r["error"] for r in results) else 0)
+
+    if args.input == "-" or args.output == "-":
+        # Stream through stdin/stdout; the build cache needs real paths.
+        if args.input == "-":
+            source = sys.stdin.buffer
+        else:
+            source = open(args.input, "rb")
+        with source:
+            if args.output == "-":
+                output = sys.stdout.buffer
+            else:
+                output = open(args.output, "wb")
+            with output:
+                render_md(
+                    source,
+                    output,
+                    title=args.title or "Document",
+                    subtitle=args.subtitle,
+                    author=args.author,
+                    version=args.version,
+                    year=args.year,
+                    line_numbers=args.line_numbers,
+                    fonts=fonts,
+                    optimize=args.optimize,
+                    low_memory=args.low_memory,
+                    profiler=profiler,
+                )
+        if profiler is not None:
+            _write_profile(profiler, args.profile_format, args.profile_output)
+        return
+
+    convert_md(
+        args.input,
+        format_output_paths(args.output, formats),
+        title=args.title or "Document",
         subtitle=args.subtitle,
         author=args.author,
         version=args.version,
         year=args.year,
+        line_numbers=args.line_numbers,
+        fonts=fonts,
+        optimize=args.optimize,
+        low_memory=args.low_memory,
+        cache_dir=cache_dir,
+        force=args.force,
+        profiler=profiler,
     )
+    if profiler is not None:
+        _write_profile(profiler, args.profile_format, args.profile_output)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,501 @@
+"""
+fpdf subclasses behind md_to_pdf: the document class and output producers.
+
+Importing this module imports fpdf and fontTools, which takes a few hundred
+ms, so md_to_pdf only does so on the render path (see
+``md_to_pdf._load_fpdf``); ``import md_to_pdf``, ``--help`` and build-cache
+hits never load it.  The helpers the classes call are looked up on
+md_to_pdf when called, so patching them there (as profiling does) applies
+here as well.
+"""
+
+import os
+import zlib
+
+from fpdf import FPDF
+from fpdf.enums import PDFResourceType, TextEmphasis, XPos, YPos
+from fpdf.fonts import TTFFont
+from fpdf.output import OutputProducer
+from fpdf.syntax import PDFContentStream
+
+import md_to_pdf
+
+# ---------------------------------------------------------------------------
+# Output producers
+# ---------------------------------------------------------------------------
+
+class _SubsetCachingProducer(OutputProducer):
+    """fpdf output producer that pre-subsets embedded TrueType fonts."""
+
+    def _add_fonts(self, *args, **kwargs):
+        # runs after the ToC and {nb} aliases are drawn: all glyphs known
+        for font in self.fpdf.fonts.values():
+            if (
+                isinstance(font, TTFFont)
+                and font.color_font is None
+                and not font.is_cff
+                and not font.is_compressed
+                and font.collection_font_number == 0
+            ):
+                md_to_pdf._presubset_font(font)
+        return super()._add_fonts(*args, **kwargs)
+
+    def _finalize_form_xobjects(
+        self,
+        img_objs_per_index,
+        gfxstate_objs_per_name,
+        pattern_objs_per_name,
+        shading_objs_per_name,
+        font_objs_per_index,
+    ):
+        super()._finalize_form_xobjects(
+            img_objs_per_index,
+            gfxstate_objs_per_name,
+            pattern_objs_per_name,
+            shading_objs_per_name,
+            font_objs_per_index,
+        )
+        # shared page content (see MarkdownPDF._share_content) uses fonts
+        for _, xobject in self.fpdf._resource_catalog.form_xobjects:
+            font_ids = getattr(xobject, "_font_ids", None)
+            if font_ids:
+                fonts = " ".join(
+                    f"/F{i} {font_objs_per_index[i].id} 0 R"
+                    for i in font_ids
+                )
+                xobject.resources = f"<</Font <<{fonts}>>>>"
+
+
+class _SpooledContentStream(PDFContentStream):
+    """Page content stream read back from the spool when serialized."""
+
+    def __init__(self, spool, index, substitutions, compress):
+        super().__init__(b"", compress=compress)
+        self._spool = spool
+        self._index = index
+        self._substitutions = substitutions
+        self._compress = compress
+
+    def serialize(self, obj_dict=None, _security_handler=None):
+        contents = self._spool.read(self._index)
+        for placeholder, value in self._substitutions:
+            contents = contents.replace(placeholder, value)
+        if self._compress:
+            contents = zlib.compress(contents, self._COMPRESSION_LEVEL)
+        self._contents = contents
+        self.length = len(contents)
+        try:
+            return super().serialize(obj_dict, _security_handler)
+        finally:
+            self._contents = b""  # only one page in memory at a time
+
+
+class _StreamingProducer(_SubsetCachingProducer):
+    """Producer writing to ``fpdf._stream`` (a :class:`_StreamWriter`)."""
+
+    def __init__(self, fpdf):
+        super().__init__(fpdf)
+        self.buffer = fpdf._stream
+
+    def _insert_resources(self, page_objs):
+        # fpdf's per-page lookups would otherwise store an empty set for
+        # every page and resource type it has none of
+        catalog = self.fpdf._resource_catalog
+        per_page = catalog.resources_per_page
+        catalog.resources_per_page = md_to_pdf._ResourceLookup(per_page)
+        try:
+            super()._insert_resources(page_objs)
+        finally:
+            catalog.resources_per_page = per_page
+
+    def _add_pages(self, _slice=slice(0, None)):
+        page_objs = super()._add_pages(_slice)
+        spool = self.fpdf._spool
+        total = str(self.fpdf.pages_count)
+        rendered = {}  # id(shared fragment) -> its substitution
+        position = {id(obj): i for i, obj in enumerate(self.pdf_objs)}
+        for page_obj in page_objs:
+            index = page_obj.index()
+            if index not in spool:
+                continue
+            substitutions = []
+            for item in spool.substitutions(index):
+                if id(item) not in rendered:
+                    rendered[id(item)] = (
+                        item.get_placeholder_string().encode("latin-1"),
+                        item.render_text_substitution(total).encode("latin-1"),
+                    )
+                substitutions.append(rendered[id(item)])
+            stream = _SpooledContentStream(
+                spool, index, substitutions, self.fpdf.compress
+            )
+            stream.id = page_obj.contents.id
+            self.pdf_objs[position[id(page_obj.contents)]] = stream
+            page_obj.contents = stream
+        return page_objs
+
+
+# ---------------------------------------------------------------------------
+# Custom PDF class with header / footer
+# ---------------------------------------------------------------------------
+
+class MarkdownPDF(FPDF):
+    """FPDF subclass that renders a header banner and page-number footer.
+
+    With *fonts* (a :class:`UnicodeFonts`), the embedded fonts are used
+    wherever the renderer asks for Helvetica or Courier.  *optimize* names
+    one of the :data:`OPTIMIZE_PRESETS` applied by :meth:`output`.
+    A *dry_run* instance computes the layout but draws nothing: ``cell``,
+    ``multi_cell``, ``write`` and ``get_string_width`` measure text with
+    cached string widths, so it must not be output.  A *low_memory*
+    instance spools finished pages to a temporary file and can only be
+    output to a file (path or writable stream), which is then written
+    incrementally.
+    """
+
+    def __init__(
+        self,
+        header_title="",
+        *args,
+        line_numbers=False,
+        fonts=None,
+        optimize=None,
+        dry_run=False,
+        low_memory=False,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self._header_title = header_title
+        if dry_run:
+            # layout only: text is measured (see _measure_cell), the
+            # drawing calls do nothing
+            self._out = md_to_pdf._discard_content
+            self.cell = self._measure_cell
+            self.multi_cell = self._measure_multi_cell
+            self.write = self._measure_write
+            self.get_string_width = self._measure_string_width
+            self.text = self.line = self.rect = md_to_pdf._discard_drawing
+            self._string_widths = {}  # (fontkey, size) -> measure
+        self._spool = md_to_pdf._PageSpool() if low_memory else None
+        self._font_sets = {}  # spooled pages' fonts, shared when equal
+        self._stream = None  # _StreamWriter while outputting
+        preset = md_to_pdf._optimize_preset(optimize)
+        self._compress_level = preset.get("compress_level")
+        self._share_forms = preset.get("share_forms", False)
+        self._shared_forms = {}  # page operators -> form XObject index
+        if preset.get("shared_resources"):
+            self.single_resources_object = True
+        self.code_line_numbers = line_numbers
+        self._recorder = None  # _SectionRecorder while recording
+        self._font_aliases = {}
+        self._pending_faces = {}  # fontkey -> font file, added when used
+        self._font_cache_dir = None
+        if fonts is not None:
+            self._font_aliases = fonts.aliases()
+            self._pending_faces = {
+                family + style: path
+                for family, style, path in fonts.faces()
+            }
+            self._font_cache_dir = fonts.cache_dir
+
+    def set_font(self, family=None, style="", size=0):
+        if family and self._font_aliases:
+            family = self._font_aliases.get(family.lower(), family)
+            if self._pending_faces:
+                # fpdf embeds every registered font, so faces the document
+                # never selects are not registered at all
+                face = TextEmphasis.coerce(style).style.replace("U", "")
+                path = self._pending_faces.pop(family + face, None)
+                if path is not None:
+                    metrics = md_to_pdf._load_font_metrics(
+                        path, self._font_cache_dir
+                    )
+                    md_to_pdf._add_cached_font(self, family, face, metrics)
+        super().set_font(family, style, size)
+
+    def _measure(self):
+        """Cached width (mm) of a string in the current font and size."""
+        key = (self.current_font.fontkey, self.font_size_pt)
+        measure = self._string_widths.get(key)
+        if measure is None:
+            font, size, k = self.current_font, self.font_size_pt, self.k
+            widths = {}
+
+            def measure(text):
+                width = widths.get(text)
+                if width is None:
+                    width = font.get_text_width(text, size, None)[1] / k
+                    widths[text] = width
+                return width
+
+            self._string_widths[key] = measure
+        return measure
+
+    def _measurable(self):
+        """Whether string widths are plain sums of glyph widths."""
+        return not (
+            self.text_shaping
+            or self.char_spacing
+            or self.font_stretching != 100
+        )
+
+    def _measure_string_width(self, s, normalized=False, markdown=False):
+        """Dry-run :meth:`get_string_width`, from the width cache."""
+        if markdown or not self._measurable():
+            return type(self).get_string_width(self, s, normalized, markdown)
+        return self._measure()(s if normalized else self.normalize_text(s))
+
+    def _wrap(self, text, first, rest):
+        """``(normalized text, lines)`` of *text* per :func:`_wrap_lines` in
+        the current font; lines are ``None`` where fpdf must wrap."""
+        text = self.normalize_text(text).replace("\r", "")
+        if not self._measurable() or md_to_pdf._MEASURE_BY_FPDF_RE.search(text):
+            return text, None
+        c = self.c_margin
+        lines = md_to_pdf._wrap_lines(
+            self._measure(), text, first - c - c, rest - c - c
+        )
+        return text, lines
+
+    def _measure_cell(
+        self, w=None, h=None, text="", *args, new_x="RIGHT", new_y="TOP",
+        **kwargs
+    ):
+        """Dry-run :meth:`cell`: moves the cursor like fpdf's, draws
+        nothing.  Calls whose outcome depends on the text go to fpdf."""
+        new_x, new_y = XPos.coerce(new_x), YPos.coerce(new_y)
+        if (
+            w is None
+            or args
+            or not kwargs.keys() <= {"border", "fill", "link", "align"}
+            or kwargs.get("align") in ("X", "CENTER")
+            or new_x not in (XPos.RIGHT, XPos.LEFT, XPos.LMARGIN)
+            or new_y not in (YPos.TOP, YPos.NEXT)
+        ):
+            return type(self).cell(
+                self, w, h, text, *args, new_x=new_x, new_y=new_y, **kwargs
+            )
+        if h is None:
+            h = self.font_size
+        if w == 0:
+            w = self.w - self.r_margin - self.x
+        broke = self._perform_page_break_if_need_be(h)
+        self._lasth = h or self.font_size
+        if new_x is XPos.RIGHT:
+            self.x += w
+        elif new_x is XPos.LMARGIN:
+            self.x = self.l_margin
+        if new_y is YPos.NEXT:
+            self.y += h
+        return broke
+
+    def _measure_multi_cell(
+        self, w, h=None, text="", *args, dry_run=False, output="PAGE_BREAK",
+        **kwargs
+    ):
+        """Dry-run :meth:`multi_cell` for the plain calls the renderers
+        make: word-wrapped lines advance the cursor, nothing is drawn."""
+        if args or kwargs or output not in ("PAGE_BREAK", "LINES"):
+            return self._fpdf_multi_cell(
+                w, h, text, *args, dry_run=dry_run, output=output, **kwargs
+            )
+        if h is None:
+            h = self.font_size
+        if w == 0:
+            w = self.w - self.r_margin - self.x
+        normalized, lines = self._wrap(text, w, w)
+        if lines is None:
+            return self._fpdf_multi_cell(
+                w, h, text, dry_run=dry_run, output=output
+            )
+        if output == "LINES":
+            self._lasth = h  # as fpdf leaves it after a dry run
+            return [normalized[i:j] for i, j, _ in lines] or [""]
+        broke = False
+        for _ in lines or [None]:
+            broke = self._perform_page_break_if_need_be(h) or broke
+            self._lasth = h
+            self.y += h
+        self.x += w
+        return broke
+
+    def _fpdf_multi_cell(self, *args, dry_run=False, **kwargs):
+        """fpdf's :meth:`multi_cell`.  Its own dry runs only restore the
+        position and pages when ``_out`` is fpdf's, so they get it back."""
+        if not dry_run:
+            return type(self).multi_cell(self, *args, **kwargs)
+        out = self._out
+        del self._out  # fpdf swaps it out and deletes it again
+        try:
+            return type(self).multi_cell(
+                self, *args, dry_run=True, **kwargs
+            )
+        finally:
+            self._out = out
+
+    def _measure_write(self, h=None, text="", link="", *args, **kwargs):
+        """Dry-run :meth:`write`: lines advance the cursor like fpdf's
+        (see :meth:`_measure_multi_cell`)."""
+        if h is None:
+            h = self.font_size
+        lines = None
+        if not (args or kwargs):
+            _, lines = self._wrap(
+                text,
+                self.w - self.x - self.r_margin,
+                self.w - self.l_margin - self.r_margin,
+            )
+        if lines is None:
+            return type(self).write(self, h, text, link, *args, **kwargs)
+        broke = False
+        c = self.c_margin
+        for index, (start, end, width) in enumerate(lines):
+            if index:
+                self.ln()
+            broke = self._perform_page_break_if_need_be(h) or broke
+            self._lasth = h
+            if end > start:  # fpdf only offsets lines with text
+                x = self.x + c
+                self.x = x + width - c if width else x
+        return broke
+
+    def add_page(self, *args, **kwargs):
+        finished = self.page
+        super().add_page(*args, **kwargs)
+        if self._recorder is not None:
+            # after fpdf restored the graphics state the header changed
+            self._recorder.page_started(self)
+        if self._spool is None or self.in_toc_rendering:
+            return
+        if finished:
+            self._spool_page(finished)
+
+    def _spool_page(self, index):
+        """Move the operators of finished page *index* to the spool."""
+        toc = self.toc_placeholder
+        if toc and toc.start_page <= index < toc.start_page + toc.pages:
+            return  # drawn into when the document is output
+        page = self.pages[index]
+        fragments = page.get_text_substitutions()
+        self._spool.write(index, page.contents, list(fragments))
+        page.contents = bytearray()
+        fragments.clear()  # resolved by _StreamingProducer instead
+        # fpdf keeps a set of fonts per page; most pages use the same few
+        per_page = self._resource_catalog.resources_per_page
+        key = (index, PDFResourceType.FONT)
+        if key in per_page:
+            fonts = frozenset(per_page[key])
+            per_page[key] = self._font_sets.setdefault(fonts, fonts)
+
+    def output(
+        self, name="", *, linearize=False, output_producer_class=None
+    ):
+        if self._spool is not None:
+            if isinstance(name, (str, os.PathLike)):
+                with open(name, "wb") as fh:
+                    return self.output(fh)
+            if not hasattr(name, "write"):
+                raise ValueError(
+                    "a low_memory MarkdownPDF can only be output to a "
+                    "file path or writable stream"
+                )
+            self._stream = md_to_pdf._StreamWriter(name)
+            try:
+                self._output(_StreamingProducer)
+            finally:
+                self._spool.close()
+            return None
+        return self._output(
+            output_producer_class or _SubsetCachingProducer,
+            name,
+            linearize,
+        )
+
+    def _output(self, producer_class, name="", linearize=False):
+        with md_to_pdf._compression_level(self._compress_level):
+            catalog = self._resource_catalog
+            for ops, index in self._shared_forms.items():
+                font_ids = sorted(
+                    {int(i) for i in md_to_pdf._FONT_REF_RE.findall(ops)}
+                )
+                xobject = md_to_pdf._form_xobject(
+                    ops, font_ids, self.w_pt, self.h_pt, self.compress
+                )
+                catalog.form_xobjects.append((index, xobject))
+            self._shared_forms = {}
+            return super().output(
+                name,
+                linearize=linearize,
+                output_producer_class=producer_class,
+            )
+
+    def _default_file_id(self, buffer):
+        if not isinstance(buffer, md_to_pdf._StreamWriter):
+            return super()._default_file_id(buffer)
+        # same /ID as the in-memory output: MD5 of the bytes so far
+        id_hash = buffer.md5.copy()
+        if self.creation_date:
+            id_hash.update(
+                self.creation_date.strftime("%Y%m%d%H%M%S").encode("utf8")
+            )
+        hash_hex = id_hash.hexdigest().upper()
+        return f"<{hash_hex}><{hash_hex}>"
+
+    def _share_content(self, start):
+        """Replace the page operators after *start* with a shared form.
+
+        Identical operator runs on different pages (the running header) are
+        stored once and drawn with ``Do``.  The form's graphics state does
+        not leak into the page, so the font is selected again before the
+        next text.
+        """
+        contents = self.pages[self.page].contents
+        ops = bytes(contents[start:])
+        if not ops:
+            return
+        catalog = self._resource_catalog
+        index = self._shared_forms.get(ops)
+        if index is None:
+            index = self._shared_forms[ops] = catalog.next_xobject_index
+            catalog.next_xobject_index += 1
+        del contents[start:]
+        self._out(f"/I{index} Do")
+        catalog.add(PDFResourceType.X_OBJECT, index, self.page)
+        self.current_font_is_set_on_page = False
+
+    def normalize_text(self, text):
+        """Sanitize *text* for the current font.
+
+        Core fonts get :func:`sanitize_text`; embedded fonts only lose the
+        characters they have no glyph for.
+        """
+        if self.is_ttf_font:
+            return md_to_pdf._fit_to_font(text, self.current_font)
+        return super().normalize_text(md_to_pdf.sanitize_text(text))
+
+    def header(self):
+        if self.page_no() > 1:
+            start = len(self.pages[self.page].contents)
+            if self._share_forms:
+                self.draw_color = None  # same operators on every page
+            self.set_font("Helvetica", "I", 8)
+            self.set_text_color(128, 128, 128)
+            self.cell(0, 10, self._header_title, align="C")
+            self.ln(5)
+            self.set_draw_color(200, 200, 200)
+            self.line(10, self.get_y(), 200, self.get_y())
+            self.ln(5)
+            if self._share_forms:
+                self._share_content(start)
+
+    def _render_footer(self):
+        # before fpdf saves the graphics state (q) around the footer
+        if self._recorder is not None:
+            self._recorder.page_ended(self)
+        super()._render_footer()
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_font("Helvetica", "I", 8)
+        self.set_text_color(128, 128, 128)
+        self.cell(0, 10, f"Page {self.page_no()}/{{nb}}", align="C")
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Long-running Markdown-to-PDF conversion server built on md_to_pdf.
+
+Keeps a pool of warm worker processes (fpdf imported, fonts loaded) so a
+request only pays for parsing and rendering, and answers repeated requests
+from an in-memory LRU of recent outputs keyed by content hash.
+
+Endpoints:
+  POST /render   Markdown request body -> application/pdf response.
+                 Optional query parameters: title, subtitle, author,
+                 version, year, optimize (speed or size).  The X-Cache
+                 header reports hit/miss.
+  GET  /healthz  JSON with pool, queue and cache statistics.
+
+When every worker is busy and the queue is full the server answers
+503 with a Retry-After header instead of piling up requests.
+
+Usage:
+    python md_to_pdf_server.py --port 8765 --workers 4
+    python md_to_pdf_server.py --unix-socket /run/md_to_pdf.sock
+
+    curl --data-binary @runbook.md -o runbook.pdf \\
+        "http://127.0.0.1:8765/render?title=Runbook"
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import signal
+import socketserver
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import md_to_pdf
+
+RENDER_ARGS = ("title", "subtitle", "author", "version", "year", "optimize")
+MAX_BODY_BYTES = 64 * 1024 * 1024
+
+
+# ---------------------------------------------------------------------------
+# Worker-side functions (run inside the process pool)
+# ---------------------------------------------------------------------------
+
+def _warm_up():
+    """Pool initializer: render a tiny document so fonts and code are hot."""
+    md_to_pdf.render_md("## Warm-up\nok\n")
+
+
+def _render(md_bytes, render_args):
+    """Parse and render one request; returns the PDF bytes."""
+    return md_to_pdf.render_md(md_bytes, **render_args)
+
+
+# ---------------------------------------------------------------------------
+# Service: pool, backpressure and output cache
+# ---------------------------------------------------------------------------
+
+class ServerBusy(Exception):
+    """Raised when the worker pool and its queue are both full."""
+
+
+class OutputCache:
+    """Thread-safe LRU of rendered PDFs, bounded by total size in bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._entries[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _key, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class ConversionService:
+    """Bounded pool of warm renderers with request queueing and caching.
+
+    At most ``workers + queue_size`` conversions are admitted at once; the
+    rest are rejected with :class:`ServerBusy` so callers can back off.
+    """
+
+    def __init__(
+        self, workers=None, queue_size=16, cache_bytes=256 * 1024 * 1024
+    ):
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.cache = OutputCache(cache_bytes)
+        self._slots = threading.BoundedSemaphore(self.workers + queue_size)
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_warm_up
+        )
+
+    @staticmethod
+    def cache_key(md_bytes, render_args):
+        """The build cache's key (see :func:`md_to_pdf._cache_key`)."""
+        digest = hashlib.sha256(md_bytes).hexdigest()
+        return md_to_pdf._cache_key(digest, render_args)
+
+    def convert(self, md_bytes, render_args):
+        """Return ``(pdf_bytes, cache_hit)`` for a Markdown request body."""
+        key = self.cache_key(md_bytes, render_args)
+        data = self.cache.get(key)
+        if data is not None:
+            return data, True
+
+        if not self._slots.acquire(blocking=False):
+            raise ServerBusy()
+        with self._lock:
+            self._in_flight += 1
+        try:
+            data = self._pool.submit(_render, md_bytes, render_args).result()
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+        self.cache.put(key, data)
+        return data, False
+
+    def stats(self):
+        with self._lock:
+            in_flight = self._in_flight
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "in_flight": in_flight,
+            "cache": self.cache.stats(),
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+
+# ---------------------------------------------------------------------------
+# HTTP front-end
+# ---------------------------------------------------------------------------
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    server_version = f"md_to_pdf/{md_to_pdf.__version__}"
+    protocol_version = "HTTP/1.1"
+
+    def address_string(self):
+        # Unix-socket peers have no host/port
+        return self.client_address[0] if self.client_address else "unix"
+
+    def _send(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, message, headers=None):
+        body = json.dumps({"error": message}).encode("utf-8")
+        self._send(status, body, "application/json", headers)
+
+    def do_GET(self):
+        if urlparse(self.path).path != "/healthz":
+            self._send_error(404, "not found")
+            return
+        body = json.dumps(self.server.service.stats()).encode("utf-8")
+        self._send(200, body, "application/json")
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/render":
+            self._send_error(404, "not found")
+            return
+
+        length = self.headers.get("Content-Length")
+        if length is None:
+            self.close_connection = True
+            self._send_error(411, "Content-Length required")
+            return
+        length = length.strip()
+        if not (length.isascii() and length.isdigit()):
+            self.close_connection = True
+            self._send_error(400, "invalid Content-Length")
+            return
+        length = int(length)
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            self._send_error(413, f"body larger than {MAX_BODY_BYTES} bytes")
+            return
+        md_bytes = self.rfile.read(length)
+
+        query = parse_qs(url.query)
+        render_args = {
+            name: query[name][-1] for name in RENDER_ARGS if name in query
+        }
+        render_args.setdefault("year", str(datetime.now().year))
+        optimize = render_args.get("optimize")
+        if optimize is not None and optimize not in md_to_pdf.OPTIMIZE_PRESETS:
+            self._send_error(400, f"unknown optimize preset {optimize!r}")
+            return
+
+        try:
+            data, hit = self.server.service.convert(md_bytes, render_args)
+        except ServerBusy:
+            self._send_error(503, "server busy", {"Retry-After": "1"})
+            return
+        except UnicodeDecodeError:
+            self._send_error(400, "request body is not valid UTF-8")
+            return
+        except Exception as exc:  # report render failures to the client
+            self._send_error(500, f"{type(exc).__name__}: {exc}")
+            return
+
+        headers = {"X-Cache": "hit" if hit else "miss"}
+        self._send(200, data, "application/pdf", headers)
+
+
+class _TCPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(service, host="127.0.0.1", port=8765, unix_socket=None):
+    """Create an HTTP server (TCP or Unix socket) in front of *service*."""
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        server = _UnixServer(unix_socket, _RequestHandler)
+    else:
+        server = _TCPServer((host, port), _RequestHandler)
+    server.service = service
+    return server
+
+
+# ---------------------------------------------------------------------------
+# CLI entry-point
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve Markdown-to-PDF conversions from warm workers.",
+    )
+    parser.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="Address to listen on (default: 127.0.0.1).",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8765,
+        help="TCP port to listen on (default: 8765).",
+    )
+    parser.add_argument(
+        "--unix-socket",
+        default=None,
+        help="Listen on this Unix socket path instead of TCP.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of renderer processes (default: CPU count).",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=16,
+        help="Requests allowed to wait for a worker before answering 503 "
+        "(default: 16).",
+    )
+    parser.add_argument(
+        "--cache-mb",
+        type=int,
+        default=256,
+        help="Size of the in-memory output cache in MiB (default: 256).",
+    )
+
+    args = parser.parse_args()
+
+    service = ConversionService(
+        workers=args.workers,
+        queue_size=args.queue_size,
+        cache_bytes=args.cache_mb * 1024 * 1024,
+    )
+    server = make_server(
+        service, host=args.host, port=args.port, unix_socket=args.unix_socket
+    )
+    where = args.unix_socket or f"http://{args.host}:{args.port}"
+    print(f"md_to_pdf server listening on {where} ({service.workers} workers)")
+
+    def _terminate(_signum, _frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, _terminate)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+        if args.unix_socket and os.path.exists(args.unix_socket):
+            os.remove(args.unix_socket)
+
+
+if __name__ == "__main__":
+    main()
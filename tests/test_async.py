@@ -0,0 +1,152 @@
+"""AsyncConverter: results, bounded concurrency, timeouts and cancellation."""
+
+import asyncio
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import md_to_pdf
+
+TEXT = "# Doc\n## Part\nSome text.\n"
+KWARGS = dict(title="Async", year="2025")
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        yield executor
+
+
+@pytest.fixture
+def stalled(monkeypatch):
+    """Make render jobs wait for the returned event; counts running jobs."""
+    release = threading.Event()
+    state = {"running": 0, "peak": 0, "started": 0}
+    lock = threading.Lock()
+
+    def job(source, render_kwargs):
+        with lock:
+            state["started"] += 1
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+        try:
+            release.wait(30)
+            return b"%PDF-" + source.encode()
+        finally:
+            with lock:
+                state["running"] -= 1
+
+    monkeypatch.setattr(md_to_pdf, "_render_job", job)
+    return release, state
+
+
+def test_process_pool_renders_like_render_md(tmp_path):
+    expected = md_to_pdf.render_md(TEXT, **KWARGS)
+    source = tmp_path / "doc.md"
+    source.write_text(TEXT, encoding="utf-8")
+
+    async def main():
+        async with md_to_pdf.AsyncConverter(workers=1) as converter:
+            results = [
+                await converter.render(TEXT, **KWARGS),
+                await converter.render(TEXT.encode(), **KWARGS),
+                await converter.render(io.StringIO(TEXT), **KWARGS),
+                await converter.render(TEXT.splitlines(True), **KWARGS),
+            ]
+            chunks = [
+                bytes(chunk)
+                async for chunk in converter.stream(TEXT, chunk_size=1000, **KWARGS)
+            ]
+            await converter.convert(str(source), str(tmp_path / "doc.pdf"), **KWARGS)
+        return results, chunks
+
+    results, chunks = asyncio.run(main())
+    assert results == [expected] * 4
+    assert b"".join(chunks) == expected
+    assert all(len(chunk) == 1000 for chunk in chunks[:-1])
+    assert (tmp_path / "doc.pdf").read_bytes().startswith(b"%PDF")
+
+
+def test_render_errors_reach_the_caller(executor):
+    async def main():
+        converter = md_to_pdf.AsyncConverter(executor=executor)
+        with pytest.raises(UnicodeDecodeError):
+            await converter.render(b"## \xff\n")
+
+    asyncio.run(main())
+
+
+def test_at_most_max_concurrency_jobs_run(executor, stalled):
+    release, state = stalled
+
+    async def main():
+        converter = md_to_pdf.AsyncConverter(executor=executor, max_concurrency=2)
+        tasks = [asyncio.create_task(converter.render(str(i))) for i in range(6)]
+        while state["started"] < 2:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.1)
+        assert state["started"] == 2  # the rest wait for a slot
+        release.set()
+        return await asyncio.gather(*tasks)
+
+    assert asyncio.run(main()) == [b"%%PDF-%d" % i for i in range(6)]
+    assert state["peak"] == 2
+
+
+def test_timed_out_job_holds_its_slot_until_the_worker_is_done(executor, stalled):
+    release, state = stalled
+
+    async def main():
+        converter = md_to_pdf.AsyncConverter(executor=executor, max_concurrency=1)
+        with pytest.raises(asyncio.TimeoutError):
+            await converter.render("slow", timeout=0.1)
+        assert state["running"] == 1
+        # the worker is still busy, so the next job cannot start yet
+        with pytest.raises(asyncio.TimeoutError):
+            await converter.render("queued", timeout=0.1)
+        assert state["started"] == 1
+        release.set()
+        return await converter.render("next", timeout=30)
+
+    assert asyncio.run(main()) == b"%PDF-next"
+    assert state["peak"] == 1
+
+
+def test_cancelled_waiting_job_never_runs(executor, stalled):
+    release, state = stalled
+
+    async def main():
+        converter = md_to_pdf.AsyncConverter(executor=executor, max_concurrency=1)
+        first = asyncio.create_task(converter.render("first"))
+        waiting = asyncio.create_task(converter.render("waiting"))
+        while state["started"] < 1:
+            await asyncio.sleep(0.01)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        release.set()
+        return await first
+
+    assert asyncio.run(main()) == b"%PDF-first"
+    assert state["started"] == 1
+
+
+def test_event_loop_keeps_running_during_a_render(executor, stalled):
+    release, _state = stalled
+
+    async def main():
+        converter = md_to_pdf.AsyncConverter(executor=executor)
+        job = asyncio.create_task(converter.render("x"))
+        ticks = 0
+        start = time.monotonic()
+        while time.monotonic() - start < 0.2:
+            await asyncio.sleep(0.01)
+            ticks += 1
+        release.set()
+        await job
+        return ticks
+
+    assert asyncio.run(main()) > 5
@@ -0,0 +1,190 @@
+"""Reading, parsing and sanitizing still behave like the e91e507 converter.
+
+The baseline split the whole file on ``"\\n## "`` and sanitized one
+character at a time; the streaming reader and parser and the translation
+table replaced that.  The baseline code is reproduced here as the oracle.
+"""
+
+import os
+import random
+
+import pytest
+
+import md_to_pdf
+from conftest import REPO_ROOT
+
+DOCUMENTS = (
+    "Ansible_Architecture_Commands_Python_Comparison.md",
+    "DOCUMENTATION.md",
+    "Ubuntu_Basic_Commands_Documentation.md",
+)
+COVER = ("Title", "Subtitle", "Author", "1.0", "2025")
+
+SAMPLE = (
+    "# Guide\nIntro, skipped.\n## Table of Contents\n- [One](#one)\n"
+    "## One\nText with `code`, **bold** and a [link](https://example.com).\n"
+    "### Sub — “quoted”\n- bullet • → é\n> quote\n"
+    "**Bold line**\n---\n| a | b |\n|---|---|\n| 1 | 2 ─ |\n\n"
+    "```python\nx = 1  # 中文\n```\n## \nTitle on the next line\ntext\n"
+    "## Last\n```\nunterminated"
+)
+# raw bytes -> what the baseline's open(encoding="utf-8").read() decoded
+EDGE_CASES = {
+    "empty": b"",
+    "bom": b"\xef\xbb\xbf" + SAMPLE.encode(),
+    "crlf": SAMPLE.replace("\n", "\r\n").encode(),
+    "cr": SAMPLE.replace("\n", "\r").encode(),
+    "no_final_newline": SAMPLE.encode(),
+    "final_newline": (SAMPLE + "\n").encode(),
+    "blank_lines_at_end": (SAMPLE + "\n\n\n").encode(),
+    "only_newlines": b"\n\n",
+}
+
+
+# e91e507's sanitize_text, verbatim
+def _baseline_sanitize(text):
+    for char, replacement in md_to_pdf.UNICODE_REPLACEMENTS.items():
+        text = text.replace(char, replacement)
+    result = []
+    for ch in text:
+        try:
+            ch.encode("latin-1")
+            result.append(ch)
+        except UnicodeEncodeError:
+            result.append("?")
+    return "".join(result)
+
+
+def _baseline_read(path):
+    with open(path, "r", encoding="utf-8") as fh:
+        return fh.read()
+
+
+def _baseline_lines(text):
+    lines = text.split("\n")
+    if lines[-1] == "":
+        lines.pop()  # the newline ending the last line
+    return lines
+
+
+def _baseline_blocks(md_content):
+    """e91e507's _parse_and_render, recording blocks instead of drawing them.
+
+    Inline Markdown is kept, where the baseline stripped it for display
+    (it is rendered as styled runs now), and the fence language, which the
+    baseline ignored, is recorded the way :func:`parse_md_blocks` does.
+    """
+    blocks = []
+    for section in md_content.split("\n## ")[1:]:
+        lines = section.strip().split("\n")
+        title = lines[0].strip().lstrip("#").strip()
+        if title.lower().startswith("table of contents"):
+            continue
+        blocks.append(("section", title))
+        in_code = False
+        code_lines = []
+        table = None
+        for line in lines[1:]:
+            stripped = line.strip()
+            if stripped.startswith("```"):
+                if in_code:
+                    blocks.append(("code", (language, code_lines)))
+                    code_lines = []
+                    in_code = False
+                else:
+                    info = stripped[3:].split()
+                    language = info[0].lower() if info else ""
+                    in_code = True
+                continue
+            if in_code:
+                code_lines.append(line.rstrip())
+                continue
+            if stripped.startswith("|") and not stripped.startswith("|---"):
+                cells = [c.strip() for c in stripped.split("|") if c.strip()]
+                if table is None:
+                    table = [cells]
+                    blocks.append(("table", table))
+                elif stripped.replace("|", "").replace("-", "").replace(" ", "") == "":
+                    continue
+                else:
+                    table.append(cells)
+                continue
+            elif table is not None and not stripped.startswith("|"):
+                table = None
+            if stripped.startswith("|---") or stripped == "---":
+                continue
+            if stripped.startswith("### "):
+                blocks.append(("subsection", stripped[4:].strip()))
+            elif stripped.startswith("**") and stripped.endswith("**"):
+                blocks.append(("bold", stripped.strip("*").strip()))
+            elif stripped.startswith("- "):
+                blocks.append(("bullet", stripped[2:]))
+            elif stripped.startswith("> "):
+                blocks.append(("quote", stripped[2:].strip()))
+            elif stripped and not stripped.startswith("#"):
+                blocks.append(("paragraph", stripped))
+    return blocks
+
+
+def _document(blocks):
+    sections = []
+    for kind, data in blocks:
+        if kind == "section":
+            sections.append(md_to_pdf.Section(data))
+        else:
+            sections[-1].blocks.append(md_to_pdf.Block(kind, data))
+    return md_to_pdf.Document(sections)
+
+
+def _inputs(tmp_path):
+    for name in DOCUMENTS:
+        yield os.path.join(REPO_ROOT, name)
+    for name, data in EDGE_CASES.items():
+        path = tmp_path / f"{name}.md"
+        path.write_bytes(data)
+        yield str(path)
+
+
+def _random_text(rnd):
+    alphabet = (
+        "ab Z09 \t|*#`-", "é ÿ×", "".join(md_to_pdf.UNICODE_REPLACEMENTS),
+        "中€́ ﻿\U0001f600\ud800",
+    )
+    return "".join(
+        rnd.choice(rnd.choice(alphabet)) for _ in range(rnd.randint(0, 40))
+    )
+
+
+def test_sanitize_text_matches_baseline():
+    rnd = random.Random(0)
+    texts = [_random_text(rnd) for _ in range(3000)]
+    texts += list(md_to_pdf.UNICODE_REPLACEMENTS) + ["", "plain ascii"]
+    for name in DOCUMENTS:
+        texts += _baseline_read(os.path.join(REPO_ROOT, name)).split("\n")
+    for text in texts + texts:  # the second round hits the LRU
+        assert md_to_pdf.sanitize_text(text) == _baseline_sanitize(text), text
+
+
+@pytest.mark.parametrize("chunk", [md_to_pdf.MMAP_CHUNK_BYTES, 7])
+def test_iter_md_lines_matches_baseline_read(tmp_path, monkeypatch, chunk):
+    monkeypatch.setattr(md_to_pdf, "MMAP_CHUNK_BYTES", chunk)
+    for path in _inputs(tmp_path):
+        expected = _baseline_lines(_baseline_read(path))
+        assert list(md_to_pdf.iter_md_lines(path)) == expected, path
+
+
+def test_parse_md_blocks_matches_baseline(tmp_path):
+    for path in _inputs(tmp_path):
+        blocks = list(md_to_pdf.parse_md_blocks(md_to_pdf.iter_md_lines(path)))
+        assert blocks == _baseline_blocks(_baseline_read(path)), path
+
+
+def test_rendered_output_matches_baseline_parse_and_sanitize(tmp_path, monkeypatch):
+    rendered = []
+    for path in _inputs(tmp_path):
+        document = md_to_pdf.load_md_document(path)
+        rendered.append(bytes(md_to_pdf._render_buffer(document, *COVER)))
+    monkeypatch.setattr(md_to_pdf, "sanitize_text", _baseline_sanitize)
+    for path, pdf in zip(_inputs(tmp_path), rendered):
+        document = _document(_baseline_blocks(_baseline_read(path)))
+        assert bytes(md_to_pdf._render_buffer(document, *COVER)) == pdf, path
@@ -0,0 +1,64 @@
+"""Batch conversion: output paths, per-file failures and the summary."""
+
+import os
+
+import pytest
+
+import md_to_pdf
+
+DOC = "# Doc\n## Part\nSome text.\n"
+
+
+def _tree(root, files):
+    for rel, data in files.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data if isinstance(data, bytes) else data.encode())
+
+
+def _outputs(results, root):
+    return sorted(os.path.relpath(r["output"], root) for r in results)
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_glob_keeps_same_named_files_apart(tmp_path, monkeypatch, jobs):
+    _tree(tmp_path, {"a/README.md": DOC, "b/README.md": DOC, "top.md": DOC})
+    monkeypatch.chdir(tmp_path)
+    results = md_to_pdf.convert_md_batch("**/*.md", "out", jobs=jobs, year="2025")
+    assert _outputs(results, "out") == [
+        os.path.join("a", "README.pdf"),
+        os.path.join("b", "README.pdf"),
+        "top.pdf",
+    ]
+    assert not any(r["error"] for r in results)
+    assert all(os.path.getsize(r["output"]) > 0 for r in results)
+
+
+def test_glob_paths_are_relative_to_the_pattern_root(tmp_path):
+    _tree(tmp_path, {"docs/x/a.md": DOC, "docs/b.md": DOC})
+    pairs = md_to_pdf._collect_batch_inputs(str(tmp_path / "docs" / "**" / "*.md"))
+    assert sorted(rel for _path, rel in pairs) == ["b.md", os.path.join("x", "a.md")]
+
+
+def test_inputs_sharing_an_output_fail_up_front(tmp_path):
+    _tree(tmp_path, {"a.md": DOC, "a.markdown": DOC})
+    with pytest.raises(ValueError, match="a.pdf"):
+        md_to_pdf.convert_md_batch(
+            str(tmp_path / "a.*"), str(tmp_path / "out"), jobs=1
+        )
+    assert not (tmp_path / "out").exists()
+
+
+def test_failing_file_does_not_stop_the_batch(tmp_path, capsys):
+    _tree(tmp_path, {"src/good.md": DOC, "src/bad.md": b"## \xff\xfe\n"})
+    results = md_to_pdf.convert_md_batch(
+        str(tmp_path / "src"), str(tmp_path / "out"), jobs=2, year="2025"
+    )
+    errors = {os.path.basename(r["input"]): r["error"] for r in results}
+    assert errors["good.md"] is None
+    assert errors["bad.md"].startswith("UnicodeDecodeError")
+    assert (tmp_path / "out" / "good.pdf").stat().st_size > 0
+    md_to_pdf._print_batch_report(results, 1.5)
+    out = capsys.readouterr().out
+    assert "[FAIL]" in out and "[  ok]" in out
+    assert out.rstrip().endswith("Converted 1/2 files in 1.50s (1 failed)")
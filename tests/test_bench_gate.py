@@ -0,0 +1,31 @@
+"""The benchmark's regression gate ignores jitter in tiny timings."""
+
+import os
+import sys
+
+from conftest import REPO_ROOT
+
+sys.path.insert(0, os.path.join(REPO_ROOT, "benchmarks"))
+
+from bench_md_to_pdf import TIMED_PHASES, find_regressions  # noqa: E402
+
+
+def _suite(**seconds):
+    timings = dict.fromkeys(TIMED_PHASES, 0.001)
+    timings.update(seconds)
+    return {"corpora": {"doc": {"seconds": timings}}}
+
+
+def test_small_absolute_slowdowns_are_not_regressions():
+    baseline = _suite(sanitize=0.0010, render=0.200)
+    suite = _suite(sanitize=0.0016, render=0.203)  # +60% but 0.6 ms
+    assert find_regressions(suite, baseline, 0.10) == []
+
+
+def test_slowdowns_beyond_ratio_and_delta_are_regressions():
+    baseline = _suite(render=0.200)
+    suite = _suite(render=0.260)
+    assert find_regressions(suite, baseline, 0.10) == [
+        ("doc", "render", 0.200, 0.260)
+    ]
+    assert find_regressions(suite, baseline, 0.10, min_delta=0.1) == []
@@ -0,0 +1,34 @@
+"""Build cache keys must change with anything that changes the output."""
+
+import md_to_pdf
+
+
+def _render_numbered(pdf, data):
+    md_to_pdf._body_text(pdf, data)
+
+
+def _render_restyled(pdf, data):
+    md_to_pdf._body_text(pdf, data)
+
+
+def test_cache_key_covers_registered_kinds(monkeypatch):
+    before = md_to_pdf._cache_key("digest", {})
+    monkeypatch.setattr(md_to_pdf, "_REGISTERED_KINDS", ["numbered"])
+    monkeypatch.setitem(md_to_pdf._BLOCK_RENDERERS, "numbered", _render_numbered)
+    assert md_to_pdf._cache_key("digest", {}) != before
+
+
+def test_cache_key_covers_renderers(monkeypatch):
+    before = md_to_pdf._cache_key("digest", {})
+    monkeypatch.setitem(md_to_pdf._BLOCK_RENDERERS, "quote", _render_restyled)
+    restyled = md_to_pdf._cache_key("digest", {})
+    assert restyled != before
+    monkeypatch.setitem(md_to_pdf._BLOCK_RENDERERS, "quote", _render_numbered)
+    assert md_to_pdf._cache_key("digest", {}) not in (before, restyled)
+
+
+def test_cache_key_ignores_registration_order(monkeypatch):
+    monkeypatch.setattr(md_to_pdf, "_REGISTERED_KINDS", ["a", "b"])
+    first = md_to_pdf._cache_key("digest", {})
+    monkeypatch.setattr(md_to_pdf, "_REGISTERED_KINDS", ["b", "a"])
+    assert md_to_pdf._cache_key("digest", {}) == first
@@ -0,0 +1,120 @@
+"""Code blocks: page-sized chunks, line numbers and token colours."""
+
+import re
+import zlib
+
+import pytest
+
+import md_to_pdf
+
+COVER = ("Title", "Subtitle", "Author", "1.0", "2025")
+_TEXT_RE = re.compile(
+    rb"q ([\d. ]+) rg BT ([\d.]+) ([\d.]+) Td \(((?:\\.|[^\\)])*)\) Tj ET Q"
+)
+_RECT_RE = re.compile(rb"([\d.]+) ([\d.]+) ([\d.]+) (-[\d.]+) re f")
+
+
+def _rgb(color):
+    return tuple(round(c / 255, 2) for c in color)
+
+
+def _lay_out(lines, language="", **kwargs):
+    source = ["# Code", "## Block", "```" + language, *lines, "```"]
+    pdf = md_to_pdf._lay_out(
+        md_to_pdf.parse_md_document(iter(source)), *COVER, **kwargs
+    )
+    pdf.output()
+    return pdf
+
+
+def _body_pages(pdf):
+    """Decompressed content streams of the pages after cover and ToC."""
+    for page in list(pdf.pages.values())[2:]:
+        data = page.contents.content_stream()
+        yield zlib.decompress(data) if page.contents.filter else data
+
+
+def _texts(stream):
+    """``(rgb, x, y, text)`` for every coloured text run in *stream*."""
+    return [
+        (
+            tuple(round(float(c), 2) for c in rgb.split()),
+            float(x),
+            float(y),
+            re.sub(rb"\\(.)", rb"\1", text).decode("latin-1"),
+        )
+        for rgb, x, y, text in _TEXT_RE.findall(stream)
+    ]
+
+
+def test_long_block_is_laid_out_in_page_chunks():
+    lines = [f"line {i:04d}" for i in range(400)]
+    pdf = _lay_out(lines)
+    bottom = (pdf.h - pdf.page_break_trigger) * pdf.k
+    width = round(md_to_pdf.CODE_WIDTH * pdf.k, 2)
+    line_height = md_to_pdf.CODE_LINE_HEIGHT * pdf.k
+    shown = []
+    for stream in _body_pages(pdf):
+        rects = [r for r in _RECT_RE.findall(stream) if float(r[2]) == width]
+        texts = [t for t in _texts(stream) if t[3].startswith("line ")]
+        # one background per page, tall enough for the page's lines
+        assert len(rects) == 1
+        y, h = float(rects[0][1]), -float(rects[0][3])
+        assert y - h >= bottom - 0.01
+        assert h == pytest.approx(len(texts) * line_height, abs=0.02)
+        shown += [t[3] for t in sorted(texts, key=lambda t: -t[2])]
+    assert shown == lines
+    assert pdf.pages_count > 4
+
+
+def test_line_numbers_continue_across_pages():
+    lines = [f"x = {i}" for i in range(150)]
+    pdf = _lay_out(lines, line_numbers=True)
+    gray = _rgb(md_to_pdf.CODE_LINE_NUMBER_COLOR)
+    numbers, code = [], {}
+    for stream in _body_pages(pdf):
+        texts = _texts(stream)
+        for rgb, x, y, text in texts:
+            if rgb == gray:
+                numbers.append(text)
+            else:
+                code[text] = (x, y)
+        lefts = {x for rgb, x, _y, _t in texts if rgb == gray}
+        assert len(lefts) <= 1  # one gutter column
+    assert numbers == [str(i).rjust(3) for i in range(1, 151)]
+    # the code sits right of the widest number
+    assert min(x for x, _y in code.values()) > max(lefts)
+
+
+@pytest.mark.parametrize("language, line, tokens", [
+    ("yaml", '- name: "x"  # note', {
+        "- name": "key", '"x"': "string", "# note": "comment",
+    }),
+    ("yml", "  when: {{ ok }}", {"  when": "key", "{{ ok }}": "template"}),
+    ("junos", "set system host-name r1 # lab", {
+        "set": "keyword", "# lab": "comment",
+    }),
+    ("j2", "{% if x %}a{# c #}", {"{% if x %}": "template", "{# c #}": "template"}),
+])
+def test_fence_languages_are_coloured(language, line, tokens):
+    (stream,) = _body_pages(_lay_out([line], language))
+    colours = {t[3]: t[0] for t in _texts(stream)}
+    for text, token in tokens.items():
+        assert colours[text] == _rgb(md_to_pdf.CODE_TOKEN_COLORS[token]), text
+    plain = [t for t in colours if t not in tokens]
+    for text in plain:
+        assert colours[text] == _rgb(md_to_pdf.CODE_TEXT_COLOR), text
+
+
+def test_untagged_fences_are_not_coloured():
+    (stream,) = _body_pages(_lay_out(['- name: "x"  # note', "set a b"]))
+    assert {t[0] for t in _texts(stream)} == {_rgb(md_to_pdf.CODE_TEXT_COLOR)}
+
+
+def test_code_runs_cover_the_line_in_order():
+    tokenizer = md_to_pdf._CODE_TOKENIZERS["yaml"]
+    line = "  - key: 'v' # c {{ t }}"
+    runs = md_to_pdf._code_runs(line, tokenizer)
+    assert "".join(text for _col, text, _token in runs) == line
+    assert all(line[col:].startswith(text) for col, text, _token in runs)
+    assert [token for _c, _t, token in runs if token] == ["key", "string", "comment"]
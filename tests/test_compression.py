@@ -0,0 +1,50 @@
+"""--optimize compression levels apply to one output, never to another."""
+
+import os
+import threading
+
+import pytest
+
+import md_to_pdf
+from conftest import REPO_ROOT
+
+COVER = ("Title", "Subtitle", "Author", "1.0", "2025")
+PRESETS = (None, "speed", "size")
+
+
+def _document():
+    path = os.path.join(REPO_ROOT, "Ansible_Architecture_Commands_Python_Comparison.md")
+    return md_to_pdf.load_md_document(path)
+
+
+def _render(document, optimize):
+    return bytes(md_to_pdf._render_buffer(document, *COVER, optimize=optimize))
+
+
+def test_concurrent_outputs_keep_their_own_level():
+    document = _document()
+    expected = {preset: _render(document, preset) for preset in PRESETS}
+    assert len(set(expected.values())) == len(PRESETS)
+    presets = PRESETS * 4
+    barrier = threading.Barrier(len(presets))
+    results = [None] * len(presets)
+
+    def render(i):
+        barrier.wait()
+        results[i] = _render(document, presets[i])
+
+    threads = [threading.Thread(target=render, args=(i,)) for i in range(len(presets))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [expected[preset] for preset in presets]
+
+
+def test_level_is_restored_after_a_failed_output():
+    md_to_pdf._load_fpdf()
+    with pytest.raises(RuntimeError):
+        with md_to_pdf._compression_level(9):
+            assert md_to_pdf.PDFContentStream._COMPRESSION_LEVEL == 9
+            raise RuntimeError
+    assert md_to_pdf.PDFContentStream._COMPRESSION_LEVEL == -1
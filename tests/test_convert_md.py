@@ -0,0 +1,45 @@
+"""convert_md: several output formats from one parse, cache hits first."""
+
+import os
+
+import md_to_pdf
+from conftest import REPO_ROOT
+
+SOURCE = os.path.join(REPO_ROOT, "Ansible_Architecture_Commands_Python_Comparison.md")
+
+
+def _counting(monkeypatch, name):
+    calls = []
+    real = getattr(md_to_pdf, name)
+
+    def wrapper(*args, **kwargs):
+        calls.append(args)
+        return real(*args, **kwargs)
+
+    monkeypatch.setattr(md_to_pdf, name, wrapper)
+    return calls
+
+
+def test_pdf_cache_hit_skips_parse_and_hashes_once(tmp_path, monkeypatch):
+    cache = str(tmp_path / "cache")
+    outputs = {"pdf": str(tmp_path / "out.pdf")}
+    md_to_pdf.convert_md(SOURCE, outputs, cache_dir=cache, year="2025")
+    digests = _counting(monkeypatch, "_file_digest")
+    parses = _counting(monkeypatch, "load_md_document")
+    md_to_pdf.convert_md(SOURCE, outputs, cache_dir=cache, year="2025")
+    assert len(digests) == 1
+    assert parses == []
+
+
+def test_formats_share_one_parse_and_digest(tmp_path, monkeypatch):
+    cache = str(tmp_path / "cache")
+    outputs = md_to_pdf.format_output_paths(
+        str(tmp_path / "out.pdf"), ("pdf", "html", "txt")
+    )
+    digests = _counting(monkeypatch, "_file_digest")
+    parses = _counting(monkeypatch, "load_md_document")
+    md_to_pdf.convert_md(SOURCE, outputs, cache_dir=cache, year="2025")
+    assert len(digests) == 1
+    assert len(parses) == 1
+    for path in outputs.values():
+        assert os.path.getsize(path) > 0
@@ -0,0 +1,82 @@
+"""Dry runs measure text instead of drawing it; the layout must not change."""
+
+import os
+import random
+
+import pytest
+
+import md_to_pdf
+from conftest import REPO_ROOT
+
+DOCUMENTS = (
+    "Ansible_Architecture_Commands_Python_Comparison.md",
+    "DOCUMENTATION.md",
+    "Ubuntu_Basic_Commands_Documentation.md",
+)
+COVER = ("Title", "Subtitle", "Author", "1.0", "2025")
+WORDS = (
+    "a", "the", "configuration", "x" * 70, "10.0.0.1", "GigabitEthernet0/0/1",
+    "WWW", "ü", "€", "—", "“quoted”", "tab\there", "",
+)
+
+
+def _document(name):
+    with open(os.path.join(REPO_ROOT, name), encoding="utf-8") as fh:
+        return md_to_pdf.parse_md_document(iter(fh.read().splitlines()))
+
+
+def _synthetic(seed, units=20):
+    """Bullets, quotes, paragraphs, tables and code with awkward wrapping."""
+    rnd = random.Random(seed)
+
+    def text(n):
+        return " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(0, n)))
+
+    lines = ["# Synthetic"]
+    for n in range(units):
+        lines += [f"## Part {n}", "", text(80), f"- {text(40)} **{text(5)}**"]
+        lines += [f"> {text(30)} `{text(3)}`", f"**{text(25)}**", ""]
+        lines += ["| a | b | c |", "|---|---|---|"]
+        lines += [f"| {text(12)} | {text(3)} | {text(20)} |" for _ in range(3)]
+        lines += ["", "```", *(text(12) for _ in range(rnd.randint(1, 30)))]
+        lines += ["```", ""]
+    return md_to_pdf.parse_md_document(iter(lines))
+
+
+def _page_maps(document, **kwargs):
+    dry = md_to_pdf._lay_out(document, *COVER, dry_run=True, **kwargs)
+    full = md_to_pdf._lay_out(document, *COVER, **kwargs)
+    return md_to_pdf._page_map(dry), md_to_pdf._page_map(full)
+
+
+@pytest.mark.parametrize("name", DOCUMENTS)
+@pytest.mark.parametrize("line_numbers", [False, True])
+def test_dry_run_page_map_matches_full_layout(name, line_numbers):
+    dry, full = _page_maps(_document(name), line_numbers=line_numbers)
+    assert dry == full
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_dry_run_page_map_matches_on_awkward_wrapping(seed):
+    dry, full = _page_maps(_synthetic(seed))
+    assert dry["pages"] > 10
+    assert dry == full
+
+
+def test_measured_lines_match_fpdf():
+    md_to_pdf._load_fpdf()
+    dry = md_to_pdf.MarkdownPDF(dry_run=True)
+    full = md_to_pdf.MarkdownPDF()
+    rnd = random.Random(0)
+    for pdf in (dry, full):
+        pdf.add_page()
+        pdf.set_font("Helvetica", "", 9)
+    for _ in range(200):
+        text = " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(0, 30)))
+        width = rnd.choice([20, 31.5, 47])
+        lines = [
+            pdf.multi_cell(width, 5, text, dry_run=True, output="LINES")
+            for pdf in (dry, full)
+        ]
+        assert lines[0] == lines[1]
+        assert dry.get_string_width(text) == full.get_string_width(text)
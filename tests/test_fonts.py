@@ -0,0 +1,141 @@
+"""Embedded Unicode fonts: glyph coverage, subsetting and cached metrics."""
+
+import io
+import shutil
+
+import pytest
+
+import md_to_pdf
+
+ttLib = pytest.importorskip("fontTools.ttLib")
+from fontTools.fontBuilder import FontBuilder  # noqa: E402
+from fontTools.pens.ttGlyphPen import TTGlyphPen  # noqa: E402
+
+COVER = ("Title", "Subtitle", "Author", "1.0", "2025")
+# ASCII, "é", the box-drawing "│" and the Cyrillic lower case
+CHARS = [chr(c) for c in range(0x20, 0x7F)] + ["é", "│"]
+CHARS += [chr(c) for c in range(0x430, 0x450)]
+TEXT = "# Doc\n## Hosts\nrouter-ж │ café € 中\n"
+
+
+def _glyph_name(char):
+    return f"uni{ord(char):04X}"
+
+
+def _box(width):
+    pen = TTGlyphPen(None)
+    pen.moveTo((50, 0))
+    pen.lineTo((50, 700))
+    pen.lineTo((width - 50, 700))
+    pen.lineTo((width - 50, 0))
+    pen.closePath()
+    return pen.glyph()
+
+
+@pytest.fixture(scope="module")
+def font_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("fonts") / "Test-Regular.ttf")
+    names = [".notdef"] + [_glyph_name(c) for c in CHARS]
+    builder = FontBuilder(1000, isTTF=True)
+    builder.setupGlyphOrder(names)
+    builder.setupCharacterMap({ord(c): _glyph_name(c) for c in CHARS})
+    builder.setupGlyf({name: _box(600) for name in names})
+    builder.setupHorizontalMetrics({name: (600, 50) for name in names})
+    builder.setupHorizontalHeader(ascent=800, descent=-200)
+    builder.setupNameTable(
+        {"familyName": "Test", "styleName": "Regular", "psName": "Test-Regular"}
+    )
+    builder.setupOS2(sTypoAscender=800, usWinAscent=800, usWinDescent=200)
+    builder.setupPost()
+    builder.save(path)
+    return path
+
+
+@pytest.fixture
+def clean_caches(monkeypatch):
+    monkeypatch.setattr(md_to_pdf, "_font_metrics", {})
+    monkeypatch.setattr(md_to_pdf, "_font_subsets", md_to_pdf.OrderedDict())
+
+
+def _document(text=TEXT):
+    return md_to_pdf.parse_md_document(md_to_pdf.iter_text_lines(text))
+
+
+def _render(fonts, text=TEXT):
+    return bytes(md_to_pdf._render_buffer(_document(text), *COVER, fonts=fonts))
+
+
+def _counting(monkeypatch, name):
+    calls = []
+    real = getattr(md_to_pdf, name)
+
+    def wrapper(*args, **kwargs):
+        calls.append(args)
+        return real(*args, **kwargs)
+
+    monkeypatch.setattr(md_to_pdf, name, wrapper)
+    return calls
+
+
+def test_embedded_font_keeps_the_glyphs_it_has(font_path):
+    fonts = md_to_pdf.UnicodeFonts(font_path)
+    pdf = md_to_pdf._lay_out(_document(), *COVER, fonts=fonts)
+    text = "router-ж │ café • 中"
+    pdf.set_font("Helvetica")
+    assert pdf.normalize_text(text) == "router-ж │ café - ?"
+    # Courier is not replaced, so code keeps the lossy Latin-1 sanitizing
+    pdf.set_font("Courier")
+    assert pdf.normalize_text(text) == "router-? | café - ?"
+
+
+def test_only_used_faces_and_glyphs_are_embedded(font_path, clean_caches):
+    _render(md_to_pdf.UnicodeFonts(font_path, mono=font_path))
+    # one subset per face drawn (regular, bold headings, italic header ...)
+    assert {key[0] for key in md_to_pdf._font_subsets} == {font_path}
+    glyphs = set()
+    for data in md_to_pdf._font_subsets.values():
+        glyphs.update(ttLib.TTFont(io.BytesIO(data)).getGlyphOrder())
+    assert {_glyph_name(c) for c in "ж│é"} <= glyphs
+    assert _glyph_name("я") not in glyphs  # in the font, never drawn
+    assert len(glyphs) < len(CHARS) // 2
+
+
+def test_presubsetting_does_not_change_the_output(
+    font_path, clean_caches, monkeypatch
+):
+    fonts = md_to_pdf.UnicodeFonts(font_path)
+    first = _render(fonts)
+    assert _render(fonts) == first  # subset cache hit
+    monkeypatch.setattr(md_to_pdf, "_presubset_font", lambda font: None)
+    assert _render(fonts) == first  # fpdf subsetting the whole font itself
+
+
+def test_metrics_are_parsed_once_per_process(
+    font_path, clean_caches, monkeypatch
+):
+    parses = _counting(monkeypatch, "_parse_font_metrics")
+    fonts = md_to_pdf.UnicodeFonts(font_path, bold=font_path, mono=font_path)
+    _render(fonts, TEXT + "**bold**\n```\ncode\n```\n")
+    _render(fonts)
+    assert len(parses) == 1
+
+
+def test_metrics_are_reused_from_the_disk_cache(
+    font_path, clean_caches, monkeypatch, tmp_path
+):
+    fonts = md_to_pdf.UnicodeFonts(font_path, cache_dir=str(tmp_path))
+    expected = _render(fonts)
+    assert len(list(tmp_path.glob("*.pickle"))) == 1
+    monkeypatch.setattr(md_to_pdf, "_font_metrics", {})  # a new process
+    parses = _counting(monkeypatch, "_parse_font_metrics")
+    assert _render(fonts) == expected
+    assert parses == []
+
+
+def test_font_files_are_part_of_the_cache_key(font_path, tmp_path):
+    copy = tmp_path / "copy.ttf"
+    shutil.copyfile(font_path, copy)
+    fonts = md_to_pdf.UnicodeFonts(str(copy))
+    before = fonts.cache_args()
+    copy.write_bytes(copy.read_bytes() + b"\0")
+    assert fonts.cache_args() != before
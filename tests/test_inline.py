@@ -0,0 +1,108 @@
+"""Inline Markdown: nested spans and the plain-text fallback."""
+
+import glob
+import os
+import re
+
+import pytest
+
+import md_to_pdf
+from conftest import REPO_ROOT
+
+
+def _chained_clean(text):
+    """The original chain of re.sub calls, plus italics (added since)."""
+    text = re.sub(r"`([^`]+)`", r"\1", text)
+    text = re.sub(r"\*\*([^*]+)\*\*", r"\1", text)
+    text = re.sub(r"\[([^\]]+)\]\([^)]+\)", r"\1", text)
+    italic = r"(?<![\w*])\*([^*\s](?:[^*]*[^*\s])?)\*(?![\w*])"
+    return re.sub(italic, r"\1", text)
+
+
+@pytest.mark.parametrize(
+    "text, runs",
+    [
+        ("plain", [("plain", "", None)]),
+        ("**`ls -la`**", [("ls -la", "C", None)]),
+        ("[`git`](u)", [("git", "C", "u")]),
+        ("**[docs](u)**", [("docs", "B", "u")]),
+        (
+            "[**b**](u) and `c`",
+            [("b", "B", "u"), (" and ", "", None), ("c", "C", None)],
+        ),
+        (
+            "*a `b` c*",
+            [("a ", "I", None), ("b", "C", None), (" c", "I", None)],
+        ),
+        ("`**x**`", [("**x**", "C", None)]),
+    ],
+)
+def test_parse_inline_nested(text, runs):
+    assert md_to_pdf.parse_inline(text) == runs
+
+
+@pytest.mark.parametrize(
+    "text, clean",
+    [
+        ("**`ls -la`**", "ls -la"),
+        ("[`git`](u)", "git"),
+        ("**[docs](u)**", "docs"),
+        ("a *b* c", "a b c"),
+        ("2 * 3 * 4", "2 * 3 * 4"),
+    ],
+)
+def test_clean_inline_md_nested(text, clean):
+    assert md_to_pdf._clean_inline_md(text) == clean
+
+
+def test_clean_inline_md_matches_chained_subs_on_repo_documents():
+    paths = glob.glob(os.path.join(REPO_ROOT, "**", "*.md"), recursive=True)
+    assert paths
+    for path in paths:
+        with open(path, encoding="utf-8") as fh:
+            for line in fh:
+                for text in [line.strip()] + line.split("|"):
+                    text = text.strip()
+                    assert md_to_pdf._clean_inline_md(text) == _chained_clean(
+                        text
+                    ), text
+
+
+def test_inline_runs_join_to_clean_text():
+    for text in ("**`ls -la`**", "[**b**](u) and `c`", "a *b* **c** [d](e)"):
+        joined = "".join(run for run, _, _ in md_to_pdf.parse_inline(text))
+        assert joined == md_to_pdf._clean_inline_md(text)
+
+
+@pytest.mark.parametrize(
+    "url",
+    ["https://x.org/a?b=1", "HTTP://x.org", "mailto:a@b.org", "#part", "docs/a:b"],
+)
+def test_html_links_keep_safe_urls(url):
+    assert md_to_pdf._html_inline(f"[t]({url})") == f'<a href="{url}">t</a>'
+
+
+@pytest.mark.parametrize(
+    "url",
+    ["javascript:alert(1", "JaVa\tScript:x", " javascript:x", "data:text/html,x"],
+)
+def test_html_links_drop_other_schemes(url):
+    assert md_to_pdf._html_inline(f"[**t**]({url})") == "<strong>t</strong>"
+
+
+
+def _pdf_bytes(line):
+    document = md_to_pdf.parse_md_document(iter(["# t", "## A", line]))
+    return bytes(md_to_pdf._render_buffer(document, "T", "S", "A", "1", "2025"))
+
+
+@pytest.mark.parametrize("url", ["#intro", "other.md", "ftp://x.org/f"])
+def test_pdf_keeps_other_link_targets_as_text(url):
+    # "#intro" used to fail the output: a destination that was never set
+    pdf = _pdf_bytes(f"see [the intro]({url}) here")
+    assert b"/URI" not in pdf and b"/intro" not in pdf
+
+
+def test_pdf_links_web_and_mailto_targets():
+    pdf = _pdf_bytes("[web](https://x.org) and [mail](mailto:a@b.org)")
+    assert re.findall(rb"/URI \((.*?)\)", pdf) == [b"https://x.org", b"mailto:a@b.org"]
@@ -0,0 +1,52 @@
+"""fpdf and the classes built on it are only imported on the render path."""
+
+import json
+import os
+import subprocess
+import sys
+
+from conftest import REPO_ROOT
+
+_CHILD = """
+import sys
+sys.path.insert(0, sys.argv[1])
+import md_to_pdf
+md_to_pdf._fpdf_version()
+sys.argv = ["md_to_pdf.py", "--help"]
+try:
+    md_to_pdf.main()
+except SystemExit:
+    pass
+loaded = {"fpdf", "fontTools", "md_to_pdf_fpdf"}
+print(sorted(m for m in sys.modules if m.split(".")[0] in loaded))
+"""
+
+
+def test_import_version_and_help_leave_fpdf_unloaded():
+    result = subprocess.run(
+        [sys.executable, "-c", _CHILD, REPO_ROOT],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.splitlines()[-1] == "[]"
+
+
+def test_script_and_fpdf_classes_share_one_module(tmp_path):
+    # the profiler times sanitize_text by patching the script's globals,
+    # which MarkdownPDF.normalize_text only sees if it calls the same module
+    report = tmp_path / "profile.json"
+    subprocess.run(
+        [
+            sys.executable,
+            os.path.join(REPO_ROOT, "md_to_pdf.py"),
+            "--input", os.path.join(REPO_ROOT, "DOCUMENTATION.md"),
+            "--output", str(tmp_path / "out.pdf"),
+            "--no-cache", "--profile", "--profile-output", str(report),
+        ],
+        capture_output=True,
+        check=True,
+        cwd=tmp_path,
+    )
+    phases = json.loads(report.read_text(encoding="utf-8"))["phases"]
+    assert phases["sanitize"]["calls"] > 0
@@ -0,0 +1,62 @@
+"""Low-memory rendering: same bytes, and peak RSS flat in the page count."""
+
+import io
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+import md_to_pdf
+from conftest import REPO_ROOT
+
+sys.path.insert(0, os.path.join(REPO_ROOT, "benchmarks"))
+
+from bench_md_to_pdf import corpus_text  # noqa: E402
+
+resource = pytest.importorskip("resource")
+
+COVER = ("Title", "Subtitle", "Author", "1.0", "2025")
+# growth allowed per page: fpdf still keeps a page object, outline entry and
+# link annotations for every page until the PDF is written
+RSS_PER_PAGE_KIB = 12
+
+_CHILD = """
+import resource, sys
+sys.path.insert(0, sys.argv[1])
+import md_to_pdf
+md_to_pdf.convert_md_to_pdf(sys.argv[2], sys.argv[3], low_memory=True)
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(rss // 1024 if sys.platform == "darwin" else rss)
+"""
+
+
+def _peak_rss_kib(tmp_path, corpus):
+    source = tmp_path / f"{corpus}.md"
+    output = tmp_path / f"{corpus}.pdf"
+    source.write_text(corpus_text(corpus), encoding="utf-8")
+    result = subprocess.run(
+        [sys.executable, "-c", _CHILD, REPO_ROOT, str(source), str(output)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    pages = len(re.findall(rb"/Type /Page\b", output.read_bytes()))
+    return int(result.stdout.split()[-1]), pages
+
+
+def test_low_memory_output_matches_buffered_render():
+    text = corpus_text("synthetic-5x")
+    document = md_to_pdf.parse_md_document(md_to_pdf.iter_text_lines(text))
+    stream = io.BytesIO()
+    md_to_pdf._render_stream(stream, document, *COVER)
+    assert stream.getvalue() == md_to_pdf._render_buffer(document, *COVER)
+
+
+def test_low_memory_peak_rss_is_flat_in_the_page_count(tmp_path):
+    small_rss, small_pages = _peak_rss_kib(tmp_path, "synthetic-10x")
+    large_rss, large_pages = _peak_rss_kib(tmp_path, "synthetic-100x")
+    assert large_pages > 8 * small_pages
+    growth = max(large_rss - small_rss, 0)
+    assert growth / (large_pages - small_pages) < RSS_PER_PAGE_KIB
@@ -0,0 +1,123 @@
+"""Document profiles: loading, validation and rendering through md_to_pdf."""
+
+import os
+
+import pytest
+
+import md_to_pdf
+from conftest import REPO_ROOT
+
+UBUNTU = os.path.join(REPO_ROOT, "Ubuntu_Basic_Commands_Documentation.toml")
+GUIDE = "# Guide\n## Front\nmeta\n## One\nfirst\n## Two\nsecond\n"
+
+
+def _profile(tmp_path, body, name="guide.toml"):
+    (tmp_path / "guide.md").write_text(GUIDE, encoding="utf-8")
+    path = tmp_path / name
+    path.write_text(body, encoding="utf-8")
+    return str(path)
+
+
+def test_ubuntu_profile_loads_relative_to_its_file():
+    profile = md_to_pdf.load_document_profile(UBUNTU)
+    base = os.path.join(REPO_ROOT, "Ubuntu_Basic_Commands_Documentation")
+    assert profile.input_path == base + ".md"
+    assert profile.output_path == base + ".pdf"
+    assert profile.title_lines == ["Ubuntu", "Basic Commands", "Documentation"]
+    assert (profile.author, profile.year) == ("NetDevOps Team", "2025")
+    assert (profile.toc, profile.toc_numbered) == ("generated", False)
+    assert profile.exclude == ["A Comprehensive Reference Guide"]
+
+
+def test_yaml_profile_matches_toml(tmp_path):
+    pytest.importorskip("yaml")
+    toml = _profile(tmp_path, (
+        'input = "guide.md"\nexclude = ["Front"]\n'
+        '[cover]\ntitle = "G"\nyear = 2025\n'
+        '[toc]\nentries = ["One", "Two"]\n'
+        '[[appendix]]\ntitle = "Extra"\nmarkdown = "- more"\n'
+    ))
+    yaml = _profile(tmp_path, (
+        "input: guide.md\nexclude: [Front]\n"
+        "cover: {title: G, year: 2025}\n"
+        "toc: {entries: [One, Two]}\n"
+        "appendix:\n  - {title: Extra, markdown: '- more'}\n"
+    ), "guide.yaml")
+    a = md_to_pdf.load_document_profile(toml)
+    b = md_to_pdf.load_document_profile(yaml)
+    assert a.layout_args() == b.layout_args()
+    assert (a.input_path, a.title, a.year) == (b.input_path, b.title, b.year)
+    assert a.toc == "static"  # entries without a style
+    assert a.year == "2025"
+
+
+@pytest.mark.parametrize("body, message", [
+    ('input = "guide.md"\ncolour = "red"\n', "unknown top-level key"),
+    ('input = "guide.md"\n[cover]\nfont = "x"\n', "unknown cover key"),
+    ('output = "x.pdf"\n', "'input'"),
+    ('input = "guide.md"\ntoc = "sideways"\n', "toc style"),
+    ('input = "guide.md"\n[[appendix]]\ntitle = "x"\n', "exactly one"),
+    ('input = "guide.md"\n[[appendix]]\nmarkdown = "a"\nfile = "b.md"\n',
+     "exactly one"),
+    ('input = "guide.md\n', "guide.toml"),
+])
+def test_bad_profiles_raise_value_error(tmp_path, body, message):
+    with pytest.raises(ValueError, match=message):
+        md_to_pdf.load_document_profile(_profile(tmp_path, body))
+
+
+def test_unsupported_extension(tmp_path):
+    with pytest.raises(ValueError, match=".toml, .yaml or .yml"):
+        md_to_pdf.load_document_profile(_profile(tmp_path, "{}", "guide.json"))
+
+
+def test_apply_excludes_sections_and_appends_pages(tmp_path):
+    (tmp_path / "extra.md").write_text("## From file\ntext\n", encoding="utf-8")
+    profile = md_to_pdf.load_document_profile(_profile(tmp_path, (
+        'input = "guide.md"\nexclude = ["Front"]\n'
+        '[[appendix]]\ntitle = "Inline"\nmarkdown = "- item"\n'
+        '[[appendix]]\nfile = "extra.md"\n'
+    )))
+    document = profile.apply(md_to_pdf.load_md_document(profile.input_path))
+    titles = [s.title for s in document.sections]
+    assert titles == ["One", "Two", "Inline", "From file"]
+    assert [(b.kind, b.data) for b in document.sections[2].blocks] == [
+        ("bullet", "item")
+    ]
+
+
+@pytest.mark.parametrize("toc, front_pages", [("generated", 2), ("none", 1)])
+def test_pdf_follows_the_profile(tmp_path, toc, front_pages):
+    profile = md_to_pdf.load_document_profile(_profile(tmp_path, (
+        f'input = "guide.md"\nexclude = ["Front"]\ntoc = "{toc}"\n'
+        '[[appendix]]\ntitle = "Extra"\nmarkdown = "text"\n'
+    )))
+    document = md_to_pdf.load_md_document(profile.input_path)
+    pdf = md_to_pdf._lay_out(document, "G", "", "A", "1", "2025", layout=profile)
+    page_map = md_to_pdf._page_map(pdf)
+    assert [s["title"] for s in page_map["sections"]] == ["One", "Two", "Extra"]
+    assert page_map["sections"][0]["first_page"] == front_pages + 1
+
+
+def test_convert_profile_renders_through_the_cache(tmp_path, capsys):
+    path = _profile(tmp_path, (
+        'input = "guide.md"\noutput = "out/guide.pdf"\n'
+        '[toc]\nentries = ["Static entry"]\n'
+    ))
+    (tmp_path / "out").mkdir()
+    cache = str(tmp_path / "cache")
+    md_to_pdf.convert_profile(path, cache_dir=cache, formats=("pdf", "txt"))
+    text = (tmp_path / "out" / "guide.txt").read_text(encoding="utf-8")
+    assert "Table of Contents\n  Static entry\n" in text
+    pdf = (tmp_path / "out" / "guide.pdf").read_bytes()
+    capsys.readouterr()
+    md_to_pdf.convert_profile(path, cache_dir=cache)
+    assert "(cached)" in capsys.readouterr().out
+    assert (tmp_path / "out" / "guide.pdf").read_bytes() == pdf
+
+    # layout settings are part of the key: another ToC is a fresh render
+    with open(path, "a", encoding="utf-8") as fh:
+        fh.write('style = "none"\n')
+    md_to_pdf.convert_profile(path, cache_dir=cache)
+    assert "(cached)" not in capsys.readouterr().out
+    assert (tmp_path / "out" / "guide.pdf").read_bytes() != pdf
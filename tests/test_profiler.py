@@ -0,0 +1,84 @@
+"""Profiling: phases, blocks and counters, exports, and the CLI report."""
+
+import json
+import os
+import sys
+
+import md_to_pdf
+from conftest import REPO_ROOT
+
+SOURCE = os.path.join(REPO_ROOT, "DOCUMENTATION.md")
+
+
+def _convert(tmp_path, profiler, name="out.pdf"):
+    output = tmp_path / name
+    md_to_pdf.convert_md_to_pdf(SOURCE, str(output), year="2025", profiler=profiler)
+    return output
+
+
+def test_conversion_records_phases_blocks_and_counters(tmp_path):
+    profiler = md_to_pdf.Profiler()
+    output = _convert(tmp_path, profiler)
+    stats = profiler.to_dict()
+    for phase in ("parse", "sanitize", "inline_md", "layout", "serialize", "write"):
+        assert stats["phases"][phase]["calls"] >= 1, phase
+    document = md_to_pdf.load_md_document(SOURCE)
+    kinds = [block.kind for section in document.sections for block in section.blocks]
+    assert stats["blocks"]["section"]["count"] == len(document.sections)
+    for kind in set(kinds):
+        assert stats["blocks"][kind]["count"] == kinds.count(kind), kind
+    data = output.read_bytes()
+    assert stats["counters"]["output_bytes"] == len(data)
+    assert stats["counters"]["pages"] == data.count(b"/Type /Page\n")
+    assert stats["counters"]["conversions"] == 1
+
+
+def test_profiling_leaves_output_and_helpers_unchanged(tmp_path):
+    sanitize, parse_inline = md_to_pdf.sanitize_text, md_to_pdf.parse_inline
+    profiled = _convert(tmp_path, md_to_pdf.Profiler(), "profiled.pdf")
+    plain = _convert(tmp_path, None, "plain.pdf")
+    assert profiled.read_bytes() == plain.read_bytes()
+    assert md_to_pdf.sanitize_text is sanitize
+    assert md_to_pdf.parse_inline is parse_inline
+
+
+def test_callback_gets_running_totals_per_conversion(tmp_path):
+    seen = []
+    profiler = md_to_pdf.Profiler(callback=seen.append)
+    _convert(tmp_path, profiler)
+    md_to_pdf.render_md("## One\ntext\n", year="2025", profiler=profiler)
+    assert [s["counters"]["conversions"] for s in seen] == [1, 2]
+    assert seen[-1] == profiler.to_dict()
+
+    total = md_to_pdf.Profiler()
+    total.merge(seen[-1])
+    total.merge(seen[-1])
+    assert total.counters["pages"] == 2 * profiler.counters["pages"]
+    assert total.blocks["paragraph"][1] == 2 * profiler.blocks["paragraph"][1]
+
+
+def test_prometheus_export():
+    profiler = md_to_pdf.Profiler()
+    profiler.add_phase("parse", 0.5, calls=2)
+    profiler.add_block("code", 0.25)
+    profiler.count("pages", 3)
+    lines = profiler.to_prometheus().splitlines()
+    assert "# TYPE md_to_pdf_phase_seconds_total counter" in lines
+    assert 'md_to_pdf_phase_seconds_total{phase="parse"} 0.500000000' in lines
+    assert 'md_to_pdf_phase_calls_total{phase="parse"} 2' in lines
+    assert 'md_to_pdf_blocks_total{block="code"} 1' in lines
+    assert "md_to_pdf_pages_total 3" in lines
+    assert "md_to_pdf_conversions_total 0" in lines
+
+
+def test_cli_writes_the_report(tmp_path, monkeypatch):
+    report = tmp_path / "profile.json"
+    monkeypatch.setattr(sys, "argv", [
+        "md_to_pdf.py", "--input", SOURCE, "--output", str(tmp_path / "o.pdf"),
+        "--year", "2025", "--no-cache", "--profile",
+        "--profile-output", str(report),
+    ])
+    md_to_pdf.main()
+    stats = json.loads(report.read_text(encoding="utf-8"))
+    assert stats["counters"]["conversions"] == 1
+    assert stats["counters"]["output_bytes"] == (tmp_path / "o.pdf").stat().st_size
@@ -0,0 +1,171 @@
+"""The conversion server: cache keys, request validation, backpressure."""
+
+import hashlib
+import http.client
+import json
+import socket
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+import md_to_pdf
+import md_to_pdf_server
+
+DOC = b"## Part\nSome text.\n"
+
+
+@pytest.fixture(scope="module")
+def service():
+    service = md_to_pdf_server.ConversionService(workers=1, queue_size=1)
+    yield service
+    service.shutdown()
+
+
+@pytest.fixture(scope="module")
+def server(service):
+    server = md_to_pdf_server.make_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _post(server, body, query="", headers=None):
+    conn = http.client.HTTPConnection(*server.server_address, timeout=60)
+    try:
+        conn.request("POST", "/render" + query, body=body, headers=headers or {})
+        response = conn.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        conn.close()
+
+
+class _StalledPool:
+    """Stands in for the process pool; renders wait for :attr:`release`."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.submitted = threading.Semaphore(0)
+
+    def submit(self, fn, *args):
+        future = Future()
+
+        def run():
+            self.release.wait()
+            future.set_result(fn(*args))
+
+        threading.Thread(target=run, daemon=True).start()
+        self.submitted.release()
+        return future
+
+    def shutdown(self, **kwargs):
+        self.release.set()
+
+
+def _raw_post(server, head):
+    """Send *head* verbatim as the request head; return the status line."""
+    with socket.create_connection(server.server_address, timeout=60) as sock:
+        sock.sendall(b"POST /render HTTP/1.1\r\nHost: x\r\n" + head + b"\r\n")
+        return sock.makefile("rb").readline().split(None, 2)[1]
+
+
+def test_cache_key_is_the_build_cache_key():
+    args = {"title": "T", "year": "2025"}
+    digest = hashlib.sha256(DOC).hexdigest()
+    key = md_to_pdf_server.ConversionService.cache_key(DOC, args)
+    assert key == md_to_pdf._cache_key(digest, args)
+
+
+def test_cache_key_covers_fpdf_and_renderers(monkeypatch):
+    cache_key = md_to_pdf_server.ConversionService.cache_key
+    before = cache_key(DOC, {})
+    monkeypatch.setattr(md_to_pdf, "_fpdf_version", lambda: "0.0")
+    other_fpdf = cache_key(DOC, {})
+    assert other_fpdf != before
+    monkeypatch.setitem(md_to_pdf._BLOCK_RENDERERS, "quote", md_to_pdf._body_text)
+    assert cache_key(DOC, {}) not in (before, other_fpdf)
+
+
+def test_render_returns_a_pdf(server):
+    status, headers, body = _post(server, DOC, "?year=2025")
+    assert status == 200 and headers["Content-Type"] == "application/pdf"
+    assert body == md_to_pdf.render_md(DOC, year="2025")
+
+
+def test_missing_content_length_is_411(server):
+    assert _raw_post(server, b"") == b"411"
+
+
+@pytest.mark.parametrize("length", [b"abc", b"-1", b"1_0", b"+5", b""])
+def test_invalid_content_length_is_400(server, length):
+    assert _raw_post(server, b"Content-Length: " + length + b"\r\n") == b"400"
+
+
+def test_healthz_still_answers_after_bad_requests(server):
+    _raw_post(server, b"Content-Length: -1\r\n")
+    conn = http.client.HTTPConnection(*server.server_address, timeout=60)
+    conn.request("GET", "/healthz")
+    response = conn.getresponse()
+    assert response.status == 200
+    assert json.loads(response.read())["workers"] == 1
+    conn.close()
+
+
+def test_x_cache_reports_miss_then_hit(server):
+    query = "?title=X-Cache&year=2025"
+    first = _post(server, DOC, query)
+    second = _post(server, DOC, query)
+    assert (first[0], first[1]["X-Cache"]) == (200, "miss")
+    assert (second[0], second[1]["X-Cache"]) == (200, "hit")
+    assert second[2] == first[2]
+
+
+def test_oversized_body_is_413(server, monkeypatch):
+    monkeypatch.setattr(md_to_pdf_server, "MAX_BODY_BYTES", len(DOC) - 1)
+    status, _headers, body = _post(server, DOC)
+    assert status == 413 and b"larger than" in body
+
+
+def test_unknown_optimize_preset_is_400(server):
+    status, _headers, body = _post(server, DOC, "?optimize=fast")
+    assert status == 400 and b"fast" in body
+
+
+def test_invalid_utf8_is_400(server):
+    status, _headers, body = _post(server, b"## \xff\xfe\n")
+    assert status == 400 and b"UTF-8" in body
+
+
+def test_full_pool_and_queue_answer_503():
+    service = md_to_pdf_server.ConversionService(workers=1, queue_size=1)
+    service._pool.shutdown()
+    service._pool = pool = _StalledPool()
+    server = md_to_pdf_server.make_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    results = []
+    # one request per slot (workers + queue_size), each with its own body
+    waiting = [
+        threading.Thread(
+            target=lambda i=i: results.append(_post(server, DOC + b"%d" % i))
+        )
+        for i in range(2)
+    ]
+    try:
+        for thread in waiting:
+            thread.start()
+        for _ in waiting:
+            assert pool.submitted.acquire(timeout=30)
+        status, headers, _body = _post(server, DOC + b"busy")
+        assert status == 503 and headers["Retry-After"] == "1"
+        assert service.stats()["in_flight"] == 2
+    finally:
+        pool.release.set()
+        for thread in waiting:
+            thread.join(timeout=60)
+        server.shutdown()
+        server.server_close()
+    assert [status for status, _h, _b in results] == [200, 200]
+    # a freed slot admits the next request
+    assert service.convert(DOC + b"busy", {"year": "2025"})[1] is False
@@ -0,0 +1,61 @@
+"""Tables: rows taller than a page are split, tables without cells skipped."""
+
+import re
+import zlib
+
+import md_to_pdf
+
+COVER = ("Title", "Subtitle", "Author", "1.0", "2025")
+WORDS = [f"word{i}" for i in range(2500)]
+
+
+def _document():
+    lines = ["# Tables", "## Tall row", "", "| name | description | note |"]
+    lines += ["|---|---|---|", "| a | short | first |"]
+    lines += [f"| big | {' '.join(WORDS)} | tall |", "| c | after | last |"]
+    return md_to_pdf.parse_md_document(iter(lines))
+
+
+def _streams(pdf):
+    for page in pdf.pages.values():
+        data = page.contents.content_stream()
+        yield zlib.decompress(data) if page.contents.filter else data
+
+
+def test_row_taller_than_a_page_is_split_across_pages():
+    pdf = md_to_pdf._lay_out(_document(), *COVER)
+    pdf.output()
+    bottom = (pdf.h - pdf.page_break_trigger) * pdf.k
+    shown = []
+    for stream in _streams(pdf):
+        for y, h in re.findall(rb"[\d.]+ ([\d.]+) [\d.]+ (-[\d.]+) re", stream):
+            assert float(y) + float(h) >= bottom - 0.01  # above the margin
+        for line in re.findall(rb"\((word[^)]*)\) Tj", stream):
+            shown += line.decode().split()
+    # every word once, in order, spread over several pages
+    assert shown == WORDS
+    assert pdf.pages_count > 6
+
+
+def test_split_rows_repeat_the_header_and_keep_the_page_map():
+    document = _document()
+    pdf = md_to_pdf._lay_out(document, *COVER)
+    pdf.output()
+    headers = [s.count(b"(description) Tj") for s in _streams(pdf)]
+    assert headers.count(1) == sum(1 for n in headers if n) > 3
+    dry = md_to_pdf._lay_out(document, *COVER, dry_run=True)
+    assert md_to_pdf._page_map(dry) == md_to_pdf._page_map(pdf)
+
+
+def test_tables_without_cells_draw_nothing():
+    lines = ["# T", "## S", "before", "|", "after", "|  |", "end"]
+    document = md_to_pdf.parse_md_document(iter(lines))
+    tables = [b.data for b in document.sections[0].blocks if b.kind == "table"]
+    assert tables == [[[]], [[]]]
+    plain = md_to_pdf.parse_md_document(iter(lines[:3] + lines[4:5] + lines[6:]))
+    expected = bytes(md_to_pdf._render_buffer(plain, *COVER))
+    assert bytes(md_to_pdf._render_buffer(document, *COVER)) == expected
+    dry = md_to_pdf._lay_out(document, *COVER, dry_run=True)
+    assert md_to_pdf._page_map(dry)["pages"] == 3
+    section = document.sections[0]
+    assert md_to_pdf._estimate_section_pages(section) == 1
@@ -0,0 +1,74 @@
+"""Volumes: split at ``## `` sections, page budgets, merged output."""
+
+import os
+import re
+
+import pytest
+
+import md_to_pdf
+from conftest import REPO_ROOT
+
+SOURCE = os.path.join(REPO_ROOT, "Ubuntu_Basic_Commands_Documentation.md")
+COVER = dict(title="T", subtitle="S", author="A", version="1", year="2025")
+
+
+def _sections(source=SOURCE):
+    return md_to_pdf.parse_md_document(md_to_pdf.iter_md_lines(source)).sections
+
+
+def test_split_keeps_whole_sections_in_order():
+    sections = _sections()
+    volumes = md_to_pdf.split_volumes(sections, max_sections=3)
+    assert [s for vol in volumes for s in vol] == sections
+    assert all(1 <= len(vol) <= 3 for vol in volumes)
+    assert len(volumes) == -(-len(sections) // 3)
+
+
+def test_split_respects_the_page_budget():
+    sections = _sections()
+    estimate = md_to_pdf._estimate_section_pages
+    volumes = md_to_pdf.split_volumes(sections, max_pages=4)
+    assert [s for vol in volumes for s in vol] == sections
+    for vol in volumes:
+        assert len(vol) == 1 or sum(estimate(s) for s in vol) <= 4
+    big = md_to_pdf.Section("Big", [md_to_pdf.Block("code", ("", ["x"] * 500))])
+    small = md_to_pdf.Section("Small")
+    assert md_to_pdf.split_volumes([small, big, small], max_pages=4) == [
+        [small], [big], [small]
+    ]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_merged_volumes_equal_a_single_pass_render(tmp_path, jobs):
+    out = tmp_path / "merged.pdf"
+    paths = md_to_pdf.convert_md_volumes(
+        SOURCE, str(out), max_sections=2, merge=True, jobs=jobs, **COVER
+    )
+    assert paths == [str(out)]
+    document = md_to_pdf.parse_md_document(md_to_pdf.iter_md_lines(SOURCE))
+    # fonts registered in the same fixed order as the replay
+    single = md_to_pdf._render_buffer(
+        document, *COVER.values(), layout_cache=md_to_pdf.LayoutCache()
+    )
+    assert out.read_bytes() == bytes(single)
+
+
+def test_unmerged_volumes_are_standalone_pdfs(tmp_path):
+    out = str(tmp_path / "guide.pdf")
+    volumes = md_to_pdf.split_volumes(_sections(), max_sections=5)
+    paths = md_to_pdf.convert_md_volumes(SOURCE, out, max_sections=5, jobs=1, **COVER)
+    assert paths == md_to_pdf.volume_paths(out, len(volumes))
+    every = {s.title.encode("latin-1") for vol in volumes for s in vol}
+    for path, vol in zip(paths, volumes):
+        with open(path, "rb") as fh:
+            titles = re.findall(rb"/Title \(((?:\\.|[^\\)])*)\)", fh.read())
+        outline = [re.sub(rb"\\(.)", rb"\1", t) for t in titles]
+        # each volume's outline holds its own sections (and their subsections)
+        assert [t for t in outline if t in every] == [
+            s.title.encode("latin-1") for s in vol
+        ]
+
+
+def test_volumes_need_a_budget(tmp_path):
+    with pytest.raises(ValueError):
+        md_to_pdf.convert_md_volumes(SOURCE, str(tmp_path / "x.pdf"))
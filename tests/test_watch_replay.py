@@ -0,0 +1,79 @@
+"""Replayed sections (watch mode) must match a fresh layout byte for byte."""
+
+import os
+import re
+import zlib
+
+import pytest
+
+import md_to_pdf
+from conftest import REPO_ROOT
+
+DOCUMENTS = ("DOCUMENTATION.md", "Ubuntu_Basic_Commands_Documentation.md")
+COVER = ("Title", "Subtitle", "Author", "1.0", "2025")
+
+
+def _read(name):
+    with open(os.path.join(REPO_ROOT, name), encoding="utf-8") as fh:
+        return fh.read()
+
+
+def _parse(text):
+    return md_to_pdf.parse_md_document(iter(text.splitlines()))
+
+
+def _page_streams(document, cache, **kwargs):
+    """Lay out and output *document*; returns its decompressed page streams."""
+    pdf = md_to_pdf._lay_out(document, *COVER, layout_cache=cache, **kwargs)
+    pdf.output()
+    streams = []
+    for page in pdf.pages.values():
+        data = page.contents.content_stream()
+        streams.append(zlib.decompress(data) if page.contents.filter else data)
+    return streams
+
+
+@pytest.mark.parametrize("name", DOCUMENTS)
+@pytest.mark.parametrize("optimize", [None, "size"])
+def test_replayed_page_streams_match_fresh_render(name, optimize):
+    document = _parse(_read(name))
+    cache = md_to_pdf.LayoutCache()
+    fresh = _page_streams(document, cache, optimize=optimize)
+    replayed = _page_streams(document, cache, optimize=optimize)
+    assert cache.hits == len(document.sections)
+    assert replayed == fresh
+
+
+@pytest.mark.parametrize("name", DOCUMENTS)
+def test_replayed_pages_balance_graphics_state(name):
+    document = _parse(_read(name))
+    cache = md_to_pdf.LayoutCache()
+    _page_streams(document, cache)
+    for number, stream in enumerate(_page_streams(document, cache), 1):
+        ops = stream.split()
+        assert ops.count(b"q") == ops.count(b"Q"), f"page {number}"
+
+
+@pytest.mark.parametrize(
+    "insert",
+    [
+        "| a | b |\n|---|---|\n| 1 | 2 |",
+        "```\ncode\n```",
+        "> quoted",
+    ],
+)
+def test_replay_after_edit_matches_fresh_render(insert):
+    text = _read("DOCUMENTATION.md")
+    starts = [m.start() for m in re.finditer(r"\n## ", text)]
+    cache = md_to_pdf.LayoutCache()
+    md_to_pdf._render_buffer(_parse(text), *COVER, layout_cache=cache)
+    for start in starts[2:6]:
+        edited = _parse(f"{text[:start]}\n\n{insert}\n{text[start:]}")
+        replayed = md_to_pdf._render_buffer(
+            edited, *COVER, layout_cache=cache
+        )
+        assert cache.hits
+        fresh = md_to_pdf._render_buffer(
+            edited, *COVER, layout_cache=md_to_pdf.LayoutCache()
+        )
+        assert bytes(replayed) == bytes(fresh)